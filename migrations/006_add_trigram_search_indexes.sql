@@ -0,0 +1,11 @@
+-- Migration: Add trigram indexes for document search
+-- Date: 2026-10-16
+-- Purpose: Let ILIKE '%...%' in /docs/search use an index instead of scanning every document
+
+-- pg_trgm provides the gin_trgm_ops operator class
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- CONCURRENTLY avoids locking the tables on existing databases
+-- (must not run inside a transaction block)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS prompt_docu_trgm ON prompt USING gin (docu gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS repo_name_trgm ON repo USING gin (repo_name gin_trgm_ops);
@@ -0,0 +1,8 @@
+-- Migration: Add toc column to prompt table
+-- Date: 2026-10-16
+-- Purpose: Store the table of contents when documentation is generated instead of rendering it on every read
+
+-- Add toc column to prompt table (nullable, existing documents are rendered on the fly)
+ALTER TABLE prompt ADD COLUMN IF NOT EXISTS toc TEXT;
+
+COMMENT ON COLUMN prompt.toc IS 'Table of contents rendered from the markdown headings of docu';
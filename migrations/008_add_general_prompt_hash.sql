@@ -0,0 +1,12 @@
+-- Migration: Add general_prompt_sha256 column to general_settings table
+-- Date: 2026-10-16
+-- Purpose: Detect general prompt changes by comparing hashes instead of the full prompt text
+
+ALTER TABLE general_settings ADD COLUMN IF NOT EXISTS general_prompt_sha256 VARCHAR(64);
+
+-- Fill the hash for existing rows (sha256() requires PostgreSQL 11+)
+UPDATE general_settings
+SET general_prompt_sha256 = encode(sha256(convert_to(general_prompt, 'UTF8')), 'hex')
+WHERE general_prompt_sha256 IS NULL;
+
+COMMENT ON COLUMN general_settings.general_prompt_sha256 IS 'Hex SHA-256 of general_prompt';
@@ -0,0 +1,9 @@
+-- Migration: Add partial index for prompts with documentation
+-- Date: 2026-10-16
+-- Purpose: /docs/list, /docs/search and lookups by repository only read prompts whose docu is set
+
+-- CONCURRENTLY avoids locking the table on existing databases
+-- (must not run inside a transaction block)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS prompt_docu_ready_idx
+    ON prompt (repo_id, created_at DESC)
+    WHERE docu IS NOT NULL;
@@ -0,0 +1,9 @@
+-- Migration: Make template names unique
+-- Date: 2026-10-16
+-- Purpose: Duplicate template names are rejected by the database instead of a lookup before every write
+
+-- Existing duplicate names have to be renamed before this succeeds.
+-- CONCURRENTLY avoids locking the table on existing databases
+-- (must not run inside a transaction block)
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS template_template_name_key
+    ON template (template_name);
@@ -0,0 +1,8 @@
+-- Migration: Add updated_at column to template table
+-- Date: 2026-10-16
+-- Purpose: GET /prompt-templates derives its ETag from COUNT/MAX(id)/MAX(updated_at) instead of reading all rows
+
+-- Existing templates count as updated at migration time
+ALTER TABLE template ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now();
+
+COMMENT ON COLUMN template.updated_at IS 'Last change of the template, set by the application on insert and update';
@@ -0,0 +1,9 @@
+-- Migration: Server-side defaults for creation/update timestamps
+-- Date: 2026-10-16
+-- Purpose: The models use server_default=now() instead of a Python datetime per insert,
+--          so every timestamp column has to carry a DEFAULT in existing databases too
+
+ALTER TABLE repo ALTER COLUMN date_of_version SET DEFAULT now();
+ALTER TABLE prompt ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE history ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE general_settings ALTER COLUMN updated_at SET DEFAULT now();
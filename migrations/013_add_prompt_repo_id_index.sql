@@ -0,0 +1,10 @@
+-- Migration: Add index on prompt.repo_id
+-- Date: 2026-10-16
+-- Purpose: The first prompt per repository (MCP repository tools, /repos/list) and the
+--          repo joins look prompts up by repo_id; prompt_id makes min(prompt_id) per repo an index scan.
+--          Prompts with documentation are already covered by the partial prompt_docu_ready_idx (009)
+
+-- CONCURRENTLY avoids locking the table on existing databases
+-- (must not run inside a transaction block)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS prompt_repo_id_idx
+    ON prompt (repo_id, prompt_id);
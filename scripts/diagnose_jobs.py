@@ -3,10 +3,14 @@
 Job Diagnostic Tool for CaffeineCode
 
 This script helps diagnose issues with various types of jobs in the system.
-Usage: python scripts/diagnose_jobs.py [job_id]
+Usage: python scripts/diagnose_jobs.py [job_id] [--checks db redis celery tasks]
 """
 
+import argparse
+import functools
+import io
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Add src/backend to path for imports
@@ -15,133 +19,209 @@ sys.path.insert(0, str(backend_path))
 
 # Configuration
 CELERY_TIMEOUT = 5.0  # seconds
-REDIS_TIMEOUT = 3  # seconds
-MIN_GITHUB_ACTIONS_ID_LENGTH = 10  # GitHub workflow run IDs are typically 11+ digits
+MIN_GITHUB_ACTIONS_ID = 10 ** 9  # GitHub workflow run IDs are typically 11+ digits
+INSPECT_METHODS = ("active", "scheduled", "registered")
+CHECKS = ("db", "redis", "celery", "tasks")
 
 
-def check_celery_status():
+@functools.lru_cache()
+def _celery():
+    """Import the Celery app (and with it the backend settings) only once, and only if needed"""
+    from app.worker.celery_app import celery_app
+    return celery_app
+
+
+def gather_inspect():
+    """
+    Query all workers once for active, scheduled and registered tasks.
+    The three broadcasts run in parallel, so the whole call costs one
+    CELERY_TIMEOUT round-trip instead of one per method.
+    """
+    inspect = _celery().control.inspect(timeout=CELERY_TIMEOUT)
+
+    with ThreadPoolExecutor(max_workers=len(INSPECT_METHODS)) as executor:
+        futures = {name: executor.submit(getattr(inspect, name)) for name in INSPECT_METHODS}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def check_celery_status(inspected, out):
     """Check if Celery worker is running"""
-    print("Checking Celery Status...")
+    print("\nChecking Celery Status...", file=out)
     try:
-        from app.worker.celery_app import celery_app
-        inspect = celery_app.control.inspect(timeout=CELERY_TIMEOUT)
-
         # Get active tasks
-        active = inspect.active()
+        active = inspected["active"]
         if active:
-            print("✓ Celery workers are active")
+            print("✓ Celery workers are active", file=out)
             for worker, tasks in active.items():
-                print(f"  Worker: {worker}, Active tasks: {len(tasks)}")
+                print(f"  Worker: {worker}, Active tasks: {len(tasks)}", file=out)
         else:
-            print("✗ No active Celery workers found (or connection timeout)")
+            print("✗ No active Celery workers found (or connection timeout)", file=out)
 
     except Exception as e:
-        print(f"✗ Error checking Celery: {e}")
+        print(f"✗ Error checking Celery: {e}", file=out)
 
 
-def check_redis_connection():
+def check_redis_connection(out):
     """Check if Redis is accessible"""
-    print("\nChecking Redis Connection...")
+    print("\nChecking Redis Connection...", file=out)
     try:
-        import redis
-        from app.core.config import settings
+        from app.core.redis_pool import redis_pool, get_redis
 
-        if settings.CELERY_BROKER_URL:
-            r = redis.from_url(settings.CELERY_BROKER_URL, socket_connect_timeout=REDIS_TIMEOUT)
-            r.ping()
-            print("✓ Redis is accessible")
+        if redis_pool is not None:
+            with get_redis() as r:
+                r.ping()
+            print("✓ Redis is accessible", file=out)
         else:
-            print("✗ CELERY_BROKER_URL not configured")
+            print("✗ CELERY_BROKER_URL not configured", file=out)
     except Exception as e:
-        print(f"✗ Redis connection failed: {e}")
+        print(f"✗ Redis connection failed: {e}", file=out)
 
 
-def check_database_connection():
+def check_database_connection(out):
     """Check if database is accessible"""
-    print("\nChecking Database Connection...")
+    print("\nChecking Database Connection...", file=out)
     try:
         from app.db.session import SessionLocal
         from sqlalchemy import text
 
         with SessionLocal() as db:
             db.execute(text("SELECT 1"))
-        print("✓ Database is accessible")
+        print("✓ Database is accessible", file=out)
     except Exception as e:
-        print(f"✗ Database connection failed: {e}")
+        print(f"✗ Database connection failed: {e}", file=out)
 
 
-def list_recent_tasks():
+def list_recent_tasks(inspected, out):
     """List recent Celery tasks"""
-    print("\nRecent Celery Tasks:")
+    print("\nRecent Celery Tasks:", file=out)
     try:
-        from app.worker.celery_app import celery_app
-        inspect = celery_app.control.inspect(timeout=CELERY_TIMEOUT)
-
         # Get scheduled tasks
-        scheduled = inspect.scheduled()
+        scheduled = inspected["scheduled"]
         if scheduled:
-            print("Scheduled tasks:")
+            print("Scheduled tasks:", file=out)
             for worker, tasks in scheduled.items():
                 for task in tasks:
-                    print(f"  - {task['name']} (ID: {task['id']})")
+                    print(f"  - {task['name']} (ID: {task['id']})", file=out)
         else:
-            print("  No scheduled tasks (or connection timeout)")
+            print("  No scheduled tasks (or connection timeout)", file=out)
 
         # Get registered tasks
-        registered = inspect.registered()
+        registered = inspected["registered"]
         if registered:
-            print("\nRegistered task types:")
+            print("\nRegistered task types:", file=out)
             for worker, tasks in registered.items():
                 for task in tasks:
-                    print(f"  - {task}")
+                    print(f"  - {task}", file=out)
 
     except Exception as e:
-        print(f"✗ Error listing tasks: {e}")
+        print(f"✗ Error listing tasks: {e}", file=out)
 
 
-def diagnose_job_id(job_id):
+@functools.lru_cache(maxsize=128)
+def _task_meta(job_id):
+    """
+    Fetch a task's state and result with one result backend round-trip
+    (AsyncResult.state and .info would query it once each).
+    """
+    return _celery().backend.get_task_meta(job_id)
+
+
+def diagnose_job_id(job_id, out):
     """Try to diagnose a specific job ID"""
-    print(f"\nDiagnosing Job ID: {job_id}")
+    print(f"\nDiagnosing Job ID: {job_id}", file=out)
 
     # Check if it looks like a GitHub Actions workflow run ID
     # GitHub workflow run IDs are large integers (typically 11+ digits)
-    if len(job_id) >= MIN_GITHUB_ACTIONS_ID_LENGTH and job_id.isdigit():
-        print("  This looks like it could be a GitHub Actions workflow run ID")
-        print(f"  Check: https://github.com/sep-thm/CaffeineCode/actions/runs/{job_id}")
+    try:
+        looks_like_gh = int(job_id) >= MIN_GITHUB_ACTIONS_ID
+    except ValueError:
+        looks_like_gh = False
+    if looks_like_gh:
+        print("  This looks like it could be a GitHub Actions workflow run ID", file=out)
+        print(f"  Check: https://github.com/sep-thm/CaffeineCode/actions/runs/{job_id}", file=out)
 
     # Try to find it as a Celery task
     try:
-        from celery.result import AsyncResult
-        from app.worker.celery_app import celery_app
+        meta = _task_meta(job_id)
+        # The result backend answers PENDING for every ID it has no record of
+        if meta["status"] == "PENDING":
+            print("  Unknown to the Celery result backend (still queued, expired or never existed)", file=out)
+            return
+        print(f"  Task state: {meta['status']}", file=out)
+        if meta.get("result"):
+            print(f"  Task info: {meta['result']}", file=out)
+    except Exception as e:
+        print(f"  Not found as Celery task: {e}", file=out)
 
-        result = AsyncResult(job_id, app=celery_app)
-        print(f"  Task state: {result.state}")
-        if result.info:
-            print(f"  Task info: {result.info}")
+
+def run_worker_checks(checks, out):
+    """Celery status and task listing, both served by a single inspect round-trip"""
+    try:
+        inspected = gather_inspect()
     except Exception as e:
-        print(f"  Not found as Celery task: {e}")
+        print(f"\n✗ Error querying Celery workers: {e}", file=out)
+        inspected = dict.fromkeys(INSPECT_METHODS)
+    if "celery" in checks:
+        check_celery_status(inspected, out)
+    if "tasks" in checks:
+        list_recent_tasks(inspected, out)
+
+
+def run_checks(checks, out):
+    """
+    Run the selected checks concurrently, each waits on its own network timeout.
+    Every check writes into its own buffer, copied to out as soon as the check is done.
+    """
+    jobs = []
+    if "db" in checks:
+        jobs.append(check_database_connection)
+    if "redis" in checks:
+        jobs.append(check_redis_connection)
+    if "celery" in checks or "tasks" in checks:
+        jobs.append(functools.partial(run_worker_checks, checks))
+    if not jobs:
+        return
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        buffers = {}
+        for job in jobs:
+            buffer = io.StringIO()
+            buffers[executor.submit(job, buffer)] = buffer
+        for future in as_completed(buffers):
+            future.result()
+            out.write(buffers[future].getvalue())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CaffeineCode Job Diagnostic Tool")
+    parser.add_argument("job_id", nargs="?", help="Celery task ID or GitHub Actions run ID to diagnose")
+    parser.add_argument("--checks", nargs="+", choices=CHECKS, default=list(CHECKS),
+                        help="Only run the given checks (default: all)")
+    return parser.parse_args()
 
 
 def main():
-    print("=" * 60)
-    print("CaffeineCode Job Diagnostic Tool")
-    print("=" * 60)
+    args = parse_args()
+    # The whole report is collected here and written with a single call at the end
+    out = io.StringIO()
+
+    print("=" * 60, file=out)
+    print("CaffeineCode Job Diagnostic Tool", file=out)
+    print("=" * 60, file=out)
 
-    # Run all checks
-    check_database_connection()
-    check_redis_connection()
-    check_celery_status()
-    list_recent_tasks()
+    # Run the selected checks
+    run_checks(args.checks, out)
 
     # If a job ID was provided, try to diagnose it
-    if len(sys.argv) > 1:
-        job_id = sys.argv[1]
-        diagnose_job_id(job_id)
+    if args.job_id:
+        diagnose_job_id(args.job_id, out)
     else:
-        print("\nTip: Run with a job ID to diagnose a specific job:")
-        print("  python scripts/diagnose_jobs.py <job_id>")
+        print("\nTip: Run with a job ID to diagnose a specific job:", file=out)
+        print("  python scripts/diagnose_jobs.py <job_id>", file=out)
 
-    print("\n" + "=" * 60)
+    print("\n" + "=" * 60, file=out)
+    sys.stdout.write(out.getvalue())
+    sys.stdout.flush()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, conlist, field_validator
 from typing import List
 from sqlalchemy.orm import Session
+import hashlib
+import json
+import time
+from celery import chord
+from celery.result import AsyncResult, GroupResult
+from app.worker.celery_app import celery_app
+from app.worker.tasks_ai import generate_one, aggregate, GENERATE_DEDUP_TTL, release_generation
+from app.core.redis_pool import get_redis
 from app.db.session import SessionLocal
-from app.services.ai_service import generate_docu
 from app.db.models import Repo
 import logging
 
@@ -11,6 +19,16 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
+# Seconds between result backend polls while streaming generation events
+EVENTS_POLL_INTERVAL = 1.0
+# Seconds without an event after which a keep-alive comment is sent, so disconnects surface
+EVENTS_KEEPALIVE_INTERVAL = 15.0
+# Upper bound for one event stream; results are gone after GENERATE_DEDUP_TTL anyway
+EVENTS_TIMEOUT = GENERATE_DEDUP_TTL
+
+# Upper bound for one generation request, every repository is its own LLM run
+MAX_REPOS_PER_GENERATION = 50
+
 
 # ---------------------------
 # Database Dependency
@@ -24,76 +42,196 @@ def get_db():
 
 
 class GenerateRequest(BaseModel):
-    repo_ids: List[int]
+    repo_ids: conlist(int, min_length=1, max_length=MAX_REPOS_PER_GENERATION)
+
+    @field_validator("repo_ids")
+    @classmethod
+    def _dedup_repo_ids(cls, v: List[int]) -> List[int]:
+        # Order-preserving, so a repository listed twice is only generated once
+        return list(dict.fromkeys(v))
 
 
 class GenerateEnqueueResponse(BaseModel):
     task_id: str
 
 
+class GenerateStatusResponse(BaseModel):
+    task_id: str
+    state: str
+    result: dict | None = None
+
+
+# ---------------------------
+# Idempotency
+# ---------------------------
+def _generate_dedup_key(repo_ids: List[int]) -> str:
+    """Redis key identifying a generation request by its (unordered) set of repository IDs."""
+    joined = ",".join(map(str, sorted(set(repo_ids))))
+    return "ai_generate:" + hashlib.blake2b(joined.encode(), digest_size=16).hexdigest()
+
+
+def _claim_generation(dedup_key: str) -> str | None:
+    """
+    Claims the dedup key for a new generation.
+    Returns the task_id of an identical generation that is still running, None if the key was claimed.
+    """
+    with get_redis() as r:
+        if r.set(dedup_key, "pending", nx=True, ex=GENERATE_DEDUP_TTL):
+            return None
+        existing = r.get(dedup_key)
+    if existing == "pending":
+        raise HTTPException(status_code=409, detail="Documentation generation for these repositories is already being queued")
+    return existing
+
+
+# Replaces the "pending" placeholder with the task id. If the aggregate callback already
+# released the key (fast batches), nothing is written, so no key points at a finished task
+_STORE_TASK_ID_SCRIPT = """
+if redis.call('GET', KEYS[1]) == 'pending' then
+    return redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+return nil
+"""
+
+
+def _store_task_id(dedup_key: str, task_id: str) -> None:
+    """Points a claimed dedup key at the queued task, unless it was released in the meantime."""
+    with get_redis() as r:
+        r.eval(_STORE_TASK_ID_SCRIPT, 1, dedup_key, task_id, GENERATE_DEDUP_TTL)
+
+
 # ---------------------------
 # Endpoints
 # ---------------------------
-@router.post("/generate")
+@router.post("/generate", response_model=GenerateEnqueueResponse)
 def enqueue_generate(req: GenerateRequest, db: Session = Depends(get_db)):
     """
-    Generate documentation for the specified repositories.
-    Uses prompts from the database.
+    Queues documentation generation for the specified repositories.
+    Every repository is generated by its own Celery task so they run in parallel;
+    the returned task_id is the chord callback that aggregates their results.
+    Poll GET /ai/generate/{task_id} for the result.
     """
-    results = []
-    errors = []
-    successful_count = 0
+    # Client retries for the same repositories get the task that is already running
+    dedup_key = _generate_dedup_key(req.repo_ids)
+    try:
+        existing_task_id = _claim_generation(dedup_key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.warning(f"Redis unavailable, queuing documentation generation without deduplication: {e}")
+        dedup_key = existing_task_id = None
+    if existing_task_id:
+        logger.info(f"Documentation generation already running for these repositories (task {existing_task_id})")
+        return GenerateEnqueueResponse(task_id=existing_task_id)
+
+    # Anything failing before the chord is queued must release the claim,
+    # otherwise identical requests get a 409 until the key expires
+    try:
+        # Look up all requested repositories in one query instead of one per ID
+        repo_names = dict(db.query(Repo.id, Repo.repo_name).filter(Repo.id.in_(req.repo_ids)).all())
+        missing_repo_ids = [repo_id for repo_id in req.repo_ids if repo_id not in repo_names]
+
+        header = [generate_one.s(repo_id, repo_names[repo_id]) for repo_id in req.repo_ids if repo_id in repo_names]
+        task = chord(header)(aggregate.s(len(req.repo_ids), missing_repo_ids, dedup_key))
+    except Exception:
+        release_generation(dedup_key)
+        raise
 
-    for repo_id in req.repo_ids:
+    if dedup_key:
         try:
-            # Get repository info
-            repo = db.query(Repo).filter(Repo.id == repo_id).first()
-            if not repo:
-                error_msg = f"Repository {repo_id} not found"
-                logger.error(error_msg)
-                errors.append(error_msg)
-                continue
-
-            # Generate documentation
-            result = generate_docu(db, repo_id, repo.repo_name)
-            results.append(result)
-
-            # Check if generation was successful
-            if result.get("status") == "documented":
-                successful_count += 1
-                logger.info(f"Successfully generated documentation for repository {repo.repo_name} (ID: {repo_id})")
-            else:
-                error_msg = result.get("message", f"Failed to generate documentation for repository {repo.repo_name}")
-                logger.error(f"Documentation generation failed for repository {repo.repo_name} (ID: {repo_id}): {error_msg}")
-                errors.append(error_msg)
+            _store_task_id(dedup_key, task.id)
+        except Exception as e:
+            logger.warning(f"Could not store deduplication key for task {task.id}: {e}")
+
+    # Keep the per-repository results retrievable under the chord's id for GET /ai/generate/{task_id}/events
+    try:
+        results = task.parent.results if task.parent is not None else []
+        GroupResult(task.id, results, app=celery_app).save()
+    except Exception as e:
+        logger.warning(f"Could not store per-repository results for task {task.id}: {e}")
+    logger.info(f"Queued documentation generation for {len(req.repo_ids)} repositories (task {task.id})")
+    return GenerateEnqueueResponse(task_id=task.id)
 
+
+@router.get("/generate/{task_id}", response_model=GenerateStatusResponse)
+def get_generate_status(task_id: str):
+    """
+    Returns the state of a documentation generation task.
+    Once the task succeeded, result holds the status/results/errors envelope.
+    """
+    try:
+        res: AsyncResult = AsyncResult(task_id, app=celery_app)
+        result = None
+        try:
+            if res.successful():
+                result = res.result
+            elif res.failed():
+                result = {"error": str(res.info)}
+            elif res.info:
+                result = res.info if isinstance(res.info, dict) else {"info": str(res.info)}
         except Exception as e:
-            # Log detailed error internally
-            logger.error(f"Error processing repository {repo_id}: {str(e)}", exc_info=True)
-            # Return generic error message to user without sensitive details
-            errors.append(f"Error processing repository {repo_id}")
-
-    # Determine overall status based on success count
-    if successful_count == 0:
-        return {
-            "status": "error",
-            "message": f"Failed to generate documentation for all {len(req.repo_ids)} repositories.",
-            "results": results,
-            "errors": errors,
-            "successful_count": 0
-        }
-    elif successful_count < len(req.repo_ids):
-        return {
-            "status": "partial_success",
-            "message": f"Documentation generated for {successful_count}/{len(req.repo_ids)} repositories.",
-            "results": results,
-            "errors": errors,
-            "successful_count": successful_count
-        }
-
-    return {
-        "status": "ok",
-        "message": f"Documentation generated successfully for {successful_count} repositories.",
-        "results": results,
-        "successful_count": successful_count
-    }
+            result = {"error": str(e)}
+        return GenerateStatusResponse(task_id=task_id, state=res.state, result=result)
+    except Exception as e:
+        # Celery backend not reachable - report PENDING instead of a 500
+        return GenerateStatusResponse(
+            task_id=task_id,
+            state="PENDING",
+            result={"error": f"Unable to fetch task status: {str(e)}"}
+        )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _generate_events(task_id: str):
+    """
+    Yields one "repo" event per finished repository, in completion order,
+    followed by a "done" event carrying the aggregated envelope.
+    """
+    try:
+        pending = list(GroupResult.restore(task_id, app=celery_app).results)
+    except Exception as e:
+        logger.error(f"Unable to load generation task {task_id}: {str(e)}", exc_info=True)
+        yield _sse("error", {"task_id": task_id, "error": "Unknown or expired generation task"})
+        return
+
+    final = AsyncResult(task_id, app=celery_app)
+    deadline = time.monotonic() + EVENTS_TIMEOUT
+    next_ping = time.monotonic() + EVENTS_KEEPALIVE_INTERVAL
+    while True:
+        for res in [r for r in pending if r.ready()]:
+            pending.remove(res)
+            outcome = res.result if res.successful() else {"status": "error", "message": str(res.result)}
+            yield _sse("repo", {
+                "repo_id": outcome.get("repo_id"),
+                "status": outcome.get("status"),
+                "message": outcome.get("message"),
+            })
+            next_ping = time.monotonic() + EVENTS_KEEPALIVE_INTERVAL
+        # The aggregate callback is queued as soon as the last repository finished
+        if not pending and final.ready():
+            break
+        # A lost worker, an expired result or a revoked callback stays PENDING forever
+        if time.monotonic() >= deadline:
+            yield _sse("error", {"task_id": task_id, "error": "Timed out waiting for the generation task"})
+            return
+        if time.monotonic() >= next_ping:
+            yield ": ping\n\n"
+            next_ping = time.monotonic() + EVENTS_KEEPALIVE_INTERVAL
+        time.sleep(EVENTS_POLL_INTERVAL)
+
+    if final.successful():
+        yield _sse("done", {"task_id": task_id, "state": final.state, "result": final.result})
+    else:
+        yield _sse("done", {"task_id": task_id, "state": final.state, "result": {"error": str(final.info)}})
+
+
+@router.get("/generate/{task_id}/events")
+def stream_generate_events(task_id: str):
+    """
+    Streams the progress of a documentation generation task as Server-Sent Events,
+    so clients can show each repository as soon as it is done instead of waiting for the whole batch.
+    """
+    return StreamingResponse(_generate_events(task_id), media_type="text/event-stream")
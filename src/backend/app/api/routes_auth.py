@@ -1,12 +1,9 @@
 from fastapi import FastAPI, Depends, APIRouter, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from app.auth.deps import verify_token, require_role, CurrentUser
-import os
+from app.core.config import settings
 
-# Check if mock authentication is enabled
-USE_MOCK_AUTH = os.getenv("USE_MOCK_AUTH", "false").lower() == "true"
-
-if USE_MOCK_AUTH:
+if settings.USE_MOCK_AUTH:
     from app.auth.mock_auth import (
         authenticate_user, create_session, delete_session,
         get_all_mock_users, MockLoginRequest, MockLoginResponse, MockUserResponse
@@ -26,7 +23,7 @@ def admin_only(_user: CurrentUser = Depends(require_role("Team.Admin"))):
 
 
 # Mock authentication endpoints (only available when USE_MOCK_AUTH=true)
-if USE_MOCK_AUTH:
+if settings.USE_MOCK_AUTH:
     @router.post("/login", response_model=MockLoginResponse)
     def mock_login(request: MockLoginRequest):
         """
@@ -1,18 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import Integer, String, case, cast, func, literal, or_
+from sqlalchemy.orm import Session, joinedload, raiseload
 from app.db.session import SessionLocal
-from app.db.models import Repo, Prompt, History, GeneralSettings
-from app.services.ai_service import generate_docu
+from app.core.http_cache import make_etag, etag_matches, set_etag, not_modified
+from app.db.models import Repo, Prompt, History
+from app.services.ai_service import format_table_of_contents
+from app.worker.tasks_ai import task_generate_docu
 from app.services.git_service import convert_ssh_to_https, is_ssh_url
 from datetime import datetime
 import logging
-import re
 
 router = APIRouter(prefix="/docs", tags=["docs"])
+# Diagnostic routes, create_app() only mounts them when DEBUG_ENDPOINTS is enabled
+debug_router = APIRouter(prefix="/docs", tags=["docs"])
 logger = logging.getLogger(__name__)
 
+# Characters shown before and after the first match in search snippets
+SNIPPET_CONTEXT = 150
+# Shorter queries only search titles: pg_trgm splits text into 3-character
+# trigrams, so the content index cannot serve patterns below that length
+MIN_CONTENT_QUERY_LENGTH = 3
+
 
 # ---------------------------
 # Database Dependency
@@ -70,74 +80,86 @@ class DocumentSearchResult(BaseModel):
 # ---------------------------
 
 
+def _created_at_iso(db: Session):
+    """Prompt.created_at rendered as ISO 8601 text by the database, so rows need no isoformat()."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(Prompt.created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US', type_=String).label("created_at")
+    # SQLite stores timestamps as text in the form 'YYYY-MM-DD HH:MM:SS.ffffff'
+    return func.replace(Prompt.created_at, " ", "T", type_=String).label("created_at")
+
+
 @router.get("/list", response_model=List[DocumentListItem])
-def list_documents(db: Session = Depends(get_db)):
+def list_documents(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     List all documents (prompts with generated documentation) in the database.
+    Answers 304 Not Modified if the client's ETag still matches the list.
     """
     try:
-        # Query prompts that have documentation
-        prompts = (
-            db.query(Prompt)
-            .filter(Prompt.docu.isnot(None), Prompt.repo_id.isnot(None))
-            .order_by(Prompt.created_at.desc())
+        # Query the metadata of prompts that have documentation together with
+        # their repository name, sorted alphabetically by repo_name (newest first
+        # for the same name). Only the listed columns are selected, the docu blob
+        # never leaves the database. The inner join skips prompts whose
+        # repository no longer exists.
+        rows = (
+            db.query(Prompt.id, Prompt.repo_id, _created_at_iso(db), Repo.repo_name)
+            .join(Repo, Repo.id == Prompt.repo_id)
+            .filter(Prompt.docu.isnot(None))
+            .order_by(func.lower(Repo.repo_name), Prompt.created_at.desc())
             .all()
         )
 
+        etag = make_etag(*((row.id, row.created_at, row.repo_name) for row in rows))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
         result = []
-        for prompt in prompts:
+        for row in rows:
             try:
-                repo = db.query(Repo).filter(Repo.id == prompt.repo_id).first()
-                if repo:  # Only include if repo exists
-                    result.append(
-                        DocumentListItem(
-                            id=str(prompt.id),
-                            title=repo.repo_name,
-                            repo_id=str(prompt.repo_id),
-                            repo_name=repo.repo_name,
-                            status="ready",
-                            created_at=prompt.created_at.isoformat(),
-                            updated_at=prompt.created_at.isoformat(),
-                        )
+                result.append(
+                    DocumentListItem(
+                        id=str(row.id),
+                        title=row.repo_name,
+                        repo_id=str(row.repo_id),
+                        repo_name=row.repo_name,
+                        status="ready",
+                        created_at=row.created_at,
+                        updated_at=row.created_at,
                     )
-                else:
-                    logger.warning(f"Prompt {prompt.id} references non-existent repo {prompt.repo_id}")
+                )
             except Exception as item_exc:
-                logger.error(f"Error processing prompt {prompt.id}: {str(item_exc)}")
+                logger.error(f"Error processing prompt {row.id}: {str(item_exc)}")
                 # Continue processing other prompts
 
-        # Sort alphabetically by repo_name
-        result.sort(key=lambda x: x.repo_name.lower())
-
         return result
     except Exception as e:
         logger.error(f"Error listing documents: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving documents: {str(e)}")
 
 
-@router.get("/search/debug")
+@debug_router.get("/search/debug")
 def debug_search(db: Session = Depends(get_db)):
     """
     Debug endpoint to check what documents are available.
+    Only mounted when DEBUG_ENDPOINTS is enabled, it lists every document.
     """
     try:
-        # Query all prompts that have documentation
-        all_prompts = (
-            db.query(Prompt)
+        # Query all prompts that have documentation together with their repository name
+        rows = (
+            db.query(Prompt.id, Repo.repo_name)
+            .outerjoin(Repo, Repo.id == Prompt.repo_id)
             .filter(Prompt.docu.isnot(None), Prompt.repo_id.isnot(None))
             .all()
         )
 
-        result_docs = []
-        for prompt in all_prompts:
-            repo = db.query(Repo).filter(Repo.id == prompt.repo_id).first()
-            result_docs.append(
-                {
-                    "id": str(prompt.id),
-                    "title": repo.repo_name if repo else "Unknown",
-                    "repo_name": repo.repo_name if repo else "Unknown",
-                }
-            )
+        result_docs = [
+            {
+                "id": str(row.id),
+                "title": row.repo_name or "Unknown",
+                "repo_name": row.repo_name or "Unknown",
+            }
+            for row in rows
+        ]
 
         return {
             "total_documents": len(result_docs),
@@ -155,90 +177,124 @@ def search_documents(query: str, db: Session = Depends(get_db)):
     """
     Search through document titles and content.
     Returns documents that match the search query with content snippets.
+    Queries shorter than MIN_CONTENT_QUERY_LENGTH only match titles.
     """
     if not query or len(query.strip()) == 0:
         return []
 
-    query_lower = query.lower().strip()
+    query_text = query.strip()
+    query_lower = query_text.lower()
     results = []
 
     try:
-        # Get all prompts with documentation
-        prompts = (
-            db.query(Prompt)
-            .filter(Prompt.docu.isnot(None), Prompt.repo_id.isnot(None))
+        # Let the database drop non-matching documents (and join their repository)
+        # so only candidates are shipped and checked in Python.
+        # LIKE wildcards in the user's query are matched literally.
+        escaped = query_text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+
+        # The snippet and match count are computed by the database as well,
+        # so only a window of SNIPPET_CONTEXT characters around the first match
+        # is transferred instead of the whole documentation.
+        title_filter = Repo.repo_name.ilike(pattern, escape="\\")
+        if len(query_lower) >= MIN_CONTENT_QUERY_LENGTH:
+            position = func.strpos if db.get_bind().dialect.name == "postgresql" else func.instr
+            # Lowercased by the database on both sides, so the position follows the same
+            # case folding as the ILIKE filter (Python's lower() differs for ß, İ, ...)
+            docu_lower = func.lower(Prompt.docu)
+            needle = func.lower(literal(query_text))
+            match_pos = position(docu_lower, needle)  # 1-based, 0 if not found
+            # Integer result on every backend, "/" would be NUMERIC division on PostgreSQL
+            content_match_count = cast(
+                (func.length(docu_lower) - func.length(func.replace(docu_lower, needle, "")))
+                / func.length(needle),
+                Integer,
+            )
+            text_filter = or_(title_filter, Prompt.docu.ilike(pattern, escape="\\"))
+        else:
+            # Too short for the trigram index: only titles are searched,
+            # the documentation content is not scanned at all
+            match_pos = literal(0)
+            content_match_count = literal(0)
+            text_filter = title_filter
+        window_start = case((match_pos > SNIPPET_CONTEXT + 1, match_pos - SNIPPET_CONTEXT), else_=1)
+        rows = (
+            db.query(
+                Prompt.id,
+                Prompt.repo_id,
+                _created_at_iso(db),
+                Repo.repo_name,
+                match_pos.label("match_pos"),
+                func.substr(Prompt.docu, window_start, 2 * SNIPPET_CONTEXT + len(query_lower)).label("window"),
+                func.length(Prompt.docu).label("docu_length"),
+                content_match_count.label("content_match_count"),
+            )
+            .join(Repo, Repo.id == Prompt.repo_id)
+            .filter(Prompt.docu.isnot(None))
+            .filter(text_filter)
             .all()
         )
 
-        logger.debug(f"Search query: '{query_lower}', Found {len(prompts)} prompts with documentation")
+        logger.debug(f"Search query: '{query_lower}', Found {len(rows)} candidate documents")
 
-        for prompt in prompts:
+        for row in rows:
             try:
-                repo = db.query(Repo).filter(Repo.id == prompt.repo_id).first()
-                if not repo:
-                    logger.warning(f"Prompt {prompt.id} references non-existent repo {prompt.repo_id}")
-                    continue
-
-                title = repo.repo_name
-                logger.debug(f"Checking prompt: id={prompt.id}, title='{title}'")
+                title = row.repo_name
+                logger.debug(f"Checking prompt: id={row.id}, title='{title}'")
 
                 # Check if title matches
                 title_matches = query_lower in title.lower()
-
-                # Get content from prompt.docu field
-                content = prompt.docu or ""
-                content_lower = content.lower()
-                content_matches = query_lower in content_lower
+                content_matches = row.match_pos > 0
 
                 logger.debug(f"  Title matches: {title_matches}, Content matches: {content_matches}")
 
                 # If either title or content matches, include in results
                 if title_matches or content_matches:
                     # Count matches
-                    match_count = content_lower.count(query_lower)
+                    match_count = row.content_match_count if content_matches else 0
                     if title_matches:
                         match_count += 1
 
                     # Get content snippet around first match
                     snippet = ""
                     try:
-                        if content_matches and content:
-                            # Find first occurrence
-                            match_index = content_lower.find(query_lower)
-                            # Get context around the match (150 chars before and after)
-                            start = max(0, match_index - 150)
-                            end = min(len(content), match_index + len(query) + 150)
-                            snippet = content[start:end].strip()
+                        window = row.window or ""
+                        if content_matches and window:
+                            # Context around the match (SNIPPET_CONTEXT chars before and after),
+                            # as 0-based offsets into the documentation
+                            start = max(0, row.match_pos - 1 - SNIPPET_CONTEXT)
+                            end = min(row.docu_length, row.match_pos - 1 + len(query_lower) + SNIPPET_CONTEXT)
+                            snippet = window[:end - start].strip()
 
                             # Add ellipsis if needed
                             if start > 0:
                                 snippet = "..." + snippet
-                            if end < len(content):
+                            if end < row.docu_length:
                                 snippet = snippet + "..."
-                        elif title_matches and content:
+                        elif title_matches and window:
                             # If only title matches, show start of content
-                            snippet = content[:200].strip()
-                            if len(content) > 200:
+                            snippet = window[:200].strip()
+                            if row.docu_length > 200:
                                 snippet = snippet + "..."
                     except Exception as snippet_exc:
-                        logger.warning(f"Error generating snippet for prompt {prompt.id}: {str(snippet_exc)}")
+                        logger.warning(f"Error generating snippet for prompt {row.id}: {str(snippet_exc)}")
                         snippet = ""
 
                     results.append(
                         DocumentSearchResult(
-                            id=str(prompt.id),
+                            id=str(row.id),
                             title=title,
-                            repo_id=str(prompt.repo_id),
-                            repo_name=repo.repo_name,
-                            created_at=prompt.created_at.isoformat(),
-                            updated_at=prompt.created_at.isoformat(),
+                            repo_id=str(row.repo_id),
+                            repo_name=row.repo_name,
+                            created_at=row.created_at,
+                            updated_at=row.created_at,
                             content_snippet=snippet,
                             match_count=match_count,
                         )
                     )
                     logger.debug(f"  Added to results: match_count={match_count}")
             except Exception as item_exc:
-                logger.error(f"Error processing search result for prompt {prompt.id}: {str(item_exc)}")
+                logger.error(f"Error processing search result for prompt {row.id}: {str(item_exc)}")
                 # Continue processing other prompts
 
         # Sort by match count (most matches first)
@@ -252,10 +308,16 @@ def search_documents(query: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
 
 
+def _document_etag(prompt_id: int, created_at: datetime, goal: Optional[str], repo_name: str, repo_url: str) -> str:
+    """ETag of a document. created_at is reset whenever the documentation is regenerated."""
+    return make_etag(prompt_id, created_at, goal, repo_name, repo_url)
+
+
 @router.get("/{doc_id}", response_model=DocumentDetail)
-def get_document(doc_id: str, db: Session = Depends(get_db)):
+def get_document(doc_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Get a specific document (prompt with documentation) by ID including its content.
+    Answers 304 Not Modified if the client's ETag still matches, without loading the content.
     """
     try:
         doc_int_id = int(doc_id)
@@ -263,7 +325,20 @@ def get_document(doc_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid document ID format")
 
     try:
-        prompt = db.query(Prompt).filter(Prompt.id == doc_int_id).first()
+        if request.headers.get("if-none-match"):
+            # Revalidation only needs the small columns the ETag is built from
+            meta = (
+                db.query(Prompt.created_at, Prompt.project_goal, Repo.repo_name, Repo.repo_url)
+                .join(Repo, Repo.id == Prompt.repo_id)
+                .filter(Prompt.id == doc_int_id, Prompt.docu.isnot(None))
+                .first()
+            )
+            if meta:
+                etag = _document_etag(doc_int_id, *meta)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+
+        prompt = db.get(Prompt, doc_int_id)
         if not prompt:
             raise HTTPException(status_code=404, detail="Document not found")
 
@@ -272,7 +347,7 @@ def get_document(doc_id: str, db: Session = Depends(get_db)):
                 status_code=404, detail="Document has no generated documentation"
             )
 
-        repo = db.query(Repo).filter(Repo.id == prompt.repo_id).first()
+        repo = db.get(Repo, prompt.repo_id)
         if not repo:
             logger.warning(f"Document {doc_id} references non-existent repo {prompt.repo_id}")
             raise HTTPException(status_code=404, detail="Associated repository not found")
@@ -280,14 +355,10 @@ def get_document(doc_id: str, db: Session = Depends(get_db)):
         # The documentation content is stored in the docu field
         content = prompt.docu if prompt.docu else "Documentation content not available."
 
-        # Generate a simple table of contents from markdown headings
+        # Table of contents is stored with the documentation; older rows are rendered on the fly
         try:
-            headings = re.findall(r"^(#{1,6})\s+(.+)$", content, re.MULTILINE)
-            toc_lines = []
-            for level, title in headings:
-                indent = "  " * (len(level) - 1)
-                toc_lines.append(f"{indent}- {title.strip()}")
-            toc = "\n".join(toc_lines) if toc_lines else "No headings found"
+            toc = prompt.toc if prompt.toc is not None else format_table_of_contents(content)
+            toc = toc or "No headings found"
         except Exception as toc_exc:
             logger.warning(f"Error generating table of contents for document {doc_id}: {str(toc_exc)}")
             toc = "Error generating table of contents"
@@ -302,6 +373,10 @@ def get_document(doc_id: str, db: Session = Depends(get_db)):
                 display_url = https_url
                 logger.debug(f"Converted SSH URL to HTTPS for display: {repo.repo_url} -> {display_url}")
 
+        set_etag(response, _document_etag(
+            prompt.id, prompt.created_at, prompt.project_goal, repo.repo_name, repo.repo_url
+        ))
+
         return DocumentDetail(
             id=str(prompt.id),
             title=repo.repo_name,
@@ -330,6 +405,15 @@ class UpdateDocumentsRequest(BaseModel):
     doc_ids: List[str]
 
 
+class UpdateDocumentsResponse(BaseModel):
+    # The regeneration runs asynchronously: "queued" only means the tasks were queued,
+    # poll task_ids via GET /repos/tasks?ids=... for their outcome
+    status: str  # "queued" or "error" if nothing could be queued
+    queued_count: int  # Number of queued regenerations (one per entry in task_ids)
+    task_ids: List[str]
+    errors: Optional[List[str]] = None
+
+
 class UpdateGoalRequest(BaseModel):
     goal: str
 
@@ -345,7 +429,7 @@ def update_document_goal(doc_id: str, request: UpdateGoalRequest, db: Session =
         raise HTTPException(status_code=400, detail="Invalid document ID format")
 
     try:
-        prompt = db.query(Prompt).filter(Prompt.id == doc_int_id).first()
+        prompt = db.get(Prompt, doc_int_id)
         if not prompt:
             raise HTTPException(status_code=404, detail="Document not found")
 
@@ -366,106 +450,114 @@ def update_document_goal(doc_id: str, request: UpdateGoalRequest, db: Session =
         raise HTTPException(status_code=500, detail=f"Error updating project goal: {str(e)}")
 
 
-@router.post("/update")
+def _load_prompts(db: Session, prompt_ids: List[int], with_repo: bool = False) -> dict:
+    """
+    Loads the given prompts in one query, keyed by id.
+    Relationships that are not eagerly loaded raise on access instead of
+    silently issuing one lazy SELECT per prompt.
+    """
+    options = [joinedload(Prompt.repo)] if with_repo else []
+    query = db.query(Prompt).options(*options, raiseload("*")).filter(Prompt.id.in_(prompt_ids))
+    return {prompt.id: prompt for prompt in query.all()}
+
+
+@router.post("/update", response_model=UpdateDocumentsResponse)
 def update_documents(request: UpdateDocumentsRequest, db: Session = Depends(get_db)):
     """
     Manually regenerates documentation for multiple documents.
     Before regeneration, saves the old prompt dataset to history.
+    The regeneration runs as one Celery task per document; the request returns once they are
+    queued, with the task IDs to poll via GET /repos/tasks.
     Uses the old specific_prompt with the current generic_prompt from general_settings table.
     """
     from app.api.routes_prompts import get_generic_prompt
 
-    updated_count = 0
+    queued_count = 0
     errors = []
 
+    doc_ids = []
     for doc_id_str in request.doc_ids:
         try:
             # Parse as integer ID
-            doc_int_id = int(doc_id_str)
+            doc_ids.append((doc_id_str, int(doc_id_str)))
         except ValueError:
             errors.append(f"Invalid ID format: {doc_id_str}")
+
+    # Load all requested prompts (documentations) with their repositories in one query
+    prompts = _load_prompts(db, [doc_int_id for _, doc_int_id in doc_ids], with_repo=True)
+
+    # Current generic prompt from general_settings (or the default), the same for every document
+    current_generic_prompt = get_generic_prompt(db)
+
+    to_regenerate = []
+    for doc_id_str, doc_int_id in doc_ids:
+        prompt = prompts.get(doc_int_id)
+        if not prompt:
+            errors.append(f"Document not found: {doc_id_str}")
+            continue
+
+        if not prompt.repo_id:
+            errors.append(f"Document {doc_id_str} has no associated repository")
+            continue
+
+        if not prompt.repo:
+            errors.append(f"Repository not found for document {doc_id_str}")
             continue
 
-        # Use a separate transaction for each document to ensure atomicity
-        # This prevents one document's failure from affecting others
+        repo_name = prompt.repo.repo_name
         try:
-            # Find the prompt (which represents a documentation)
-            prompt = db.query(Prompt).filter(Prompt.id == doc_int_id).first()
-            if not prompt:
-                errors.append(f"Document not found: {doc_id_str}")
-                continue
-
-            if not prompt.repo_id:
-                errors.append(f"Document {doc_id_str} has no associated repository")
-                continue
-
-            # Get repository
-            repo = db.query(Repo).filter(Repo.id == prompt.repo_id).first()
-            if not repo:
-                errors.append(f"Repository not found for document {doc_id_str}")
-                continue
-
-            # Save the old prompt dataset to history before regeneration
-            try:
-                history_entry = History(
+            # Each document gets its own SAVEPOINT, so one failing history entry
+            # only drops that document instead of the whole batch
+            with db.begin_nested():
+                # Save the old prompt dataset to history before regeneration
+                db.add(History(
                     prompt_id=prompt.id,
                     generic_prompt=prompt.generic_prompt,
                     specific_prompt=prompt.specific_prompt,
-                    created_at=datetime.now(),
                     repo_id=prompt.repo_id,
                     docu=prompt.docu,
                     project_goal=prompt.project_goal
-                )
-                db.add(history_entry)
-
-                # Get current generic prompt from general_settings table
-                settings = db.query(GeneralSettings).order_by(GeneralSettings.id.desc()).first()
-                current_generic_prompt = settings.general_prompt if settings else None
+                ))
 
-                # If no settings exist, use the default from routes_prompts
-                if not current_generic_prompt:
-                    current_generic_prompt = get_generic_prompt(db)
-
-                # Update the prompt with the current generic_prompt from general_settings
-                # and keep the old specific_prompt
+                # Update the prompt with the current generic_prompt and keep the old specific_prompt
                 if current_generic_prompt:
                     prompt.generic_prompt = current_generic_prompt
+        except Exception as history_exc:
+            logger.error(f"Error saving history for document {doc_id_str}: {str(history_exc)}", exc_info=True)
+            errors.append(f"Failed to save history for document {doc_id_str}")
+            continue
 
-                # Commit history entry and prompt update before regeneration
-                # Individual commits per document ensure that if regeneration fails for one document,
-                # the history is still saved and other documents can continue processing
-                db.commit()
-            except Exception as history_exc:
-                db.rollback()
-                logger.error(f"Error saving history for document {doc_id_str}: {str(history_exc)}")
-                errors.append(f"Failed to save history for document {doc_id_str}")
-                continue
-
-            # Regenerate documentation
-            try:
-                result = generate_docu(db, prompt.repo_id, repo.repo_name)
-
-                if result.get("status") == "documented":
-                    updated_count += 1
-                    logger.info(f"Successfully updated document {doc_id_str}")
-                else:
-                    error_msg = result.get('message', 'Unknown error')
-                    logger.warning(f"Failed to update document {doc_id_str}: {error_msg}")
-                    errors.append(f"Failed to update document {doc_id_str}: {error_msg}")
-            except Exception as gen_exc:
-                logger.error(f"Error generating documentation for {doc_id_str}: {str(gen_exc)}")
-                errors.append(f"Error generating documentation for {doc_id_str}: {str(gen_exc)}")
-
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Unexpected error updating {doc_id_str}: {str(e)}", exc_info=True)
-            errors.append(f"Error updating {doc_id_str}: {str(e)}")
+        to_regenerate.append((doc_id_str, prompt.repo_id, repo_name))
 
-    return {
-        "status": "success" if updated_count > 0 else "error",
-        "updated_count": updated_count,
-        "errors": errors if errors else None,
-    }
+    # Commit all history entries and prompt updates together before regeneration,
+    # so a failing regeneration never loses the previous documentation
+    try:
+        db.commit()
+    except Exception as history_exc:
+        db.rollback()
+        logger.error(f"Error saving history for documents: {str(history_exc)}", exc_info=True)
+        errors.extend(f"Failed to save history for document {doc_id_str}" for doc_id_str, _, _ in to_regenerate)
+        to_regenerate = []
+
+    # Queue the regeneration (the slow part) on the Celery workers, one task per repository,
+    # so the request returns right away instead of waiting for every LLM call
+    task_ids = []
+    for doc_id_str, repo_id, repo_name in to_regenerate:
+        try:
+            task = task_generate_docu.delay(repo_id, repo_name)
+            task_ids.append(task.id)
+            queued_count += 1
+            logger.info(f"Queued documentation update for document {doc_id_str}: task {task.id}")
+        except Exception as queue_exc:
+            logger.error(f"Error queueing documentation update for {doc_id_str}: {str(queue_exc)}")
+            errors.append(f"Error queueing documentation update for {doc_id_str}: {str(queue_exc)}")
+
+    return UpdateDocumentsResponse(
+        status="queued" if queued_count > 0 else "error",
+        queued_count=queued_count,
+        task_ids=task_ids,
+        errors=errors if errors else None,
+    )
 
 
 @router.post("/delete")
@@ -480,59 +572,59 @@ def delete_documents(request: DeleteDocumentsRequest, db: Session = Depends(get_
     deleted_count = 0
     errors = []
 
+    doc_ids = []
     for doc_id_str in request.doc_ids:
         try:
             # Parse as integer ID
-            doc_int_id = int(doc_id_str)
+            doc_ids.append((doc_id_str, int(doc_id_str)))
         except ValueError:
             errors.append(f"Invalid ID format: {doc_id_str}")
-            continue
 
-        # Use a separate transaction for each document to ensure atomicity
-        try:
-            # Find the prompt
-            prompt = db.query(Prompt).filter(Prompt.id == doc_int_id).first()
-            if not prompt:
-                errors.append(f"Document not found: {doc_id_str}")
-                continue
-
-            try:
-                # Only process if there's documentation to clear
-                if not prompt.docu:
-                    logger.info(f"Document {doc_id_str} already has no documentation, skipping")
-                    continue
-
-                # Save the complete prompt dataset to history table before clearing
-                history_entry = History(
-                    prompt_id=prompt.id,
-                    generic_prompt=prompt.generic_prompt,
-                    specific_prompt=prompt.specific_prompt,
-                    created_at=datetime.now(),
-                    repo_id=prompt.repo_id,
-                    docu=prompt.docu,
-                    project_goal=prompt.project_goal
-                )
-                db.add(history_entry)
-
-                # Only clear the documentation, keep the specific prompt for the repository
-                # The specific prompt should persist even when documentation is deleted
-                prompt.docu = None
+    # Load all requested prompts in one query
+    prompts = _load_prompts(db, [doc_int_id for _, doc_int_id in doc_ids])
 
-                # Commit each deletion individually to ensure atomicity per document
-                # If one deletion fails, others can still succeed
-                db.commit()
-                deleted_count += 1
-                logger.info(f"Successfully cleared documentation for {doc_id_str}, kept specific prompt")
+    history_entries = []
+    to_clear = {}
+    for doc_id_str, doc_int_id in doc_ids:
+        prompt = prompts.get(doc_int_id)
+        if not prompt:
+            errors.append(f"Document not found: {doc_id_str}")
+            continue
 
-            except Exception as delete_exc:
-                db.rollback()
-                logger.error(f"Error deleting document {doc_id_str}: {str(delete_exc)}", exc_info=True)
-                errors.append(f"Error deleting {doc_id_str}: {str(delete_exc)}")
+        # Only process if there's documentation to clear
+        if not prompt.docu or prompt.id in to_clear:
+            logger.info(f"Document {doc_id_str} already has no documentation, skipping")
+            continue
 
-        except Exception as e:
+        # Save the complete prompt dataset to history table before clearing
+        history_entries.append(History(
+            prompt_id=prompt.id,
+            generic_prompt=prompt.generic_prompt,
+            specific_prompt=prompt.specific_prompt,
+            repo_id=prompt.repo_id,
+            docu=prompt.docu,
+            project_goal=prompt.project_goal
+        ))
+        to_clear[prompt.id] = doc_id_str
+
+    if to_clear:
+        try:
+            db.add_all(history_entries)
+
+            # Only clear the documentation, keep the specific prompt for the repository
+            # The specific prompt should persist even when documentation is deleted
+            db.query(Prompt).filter(
+                Prompt.id.in_(list(to_clear)), Prompt.docu.isnot(None)
+            ).update({Prompt.docu: None, Prompt.toc: None}, synchronize_session=False)
+
+            # History entries and cleared documentation are committed together
+            db.commit()
+            deleted_count = len(to_clear)
+            logger.info(f"Successfully cleared documentation for {', '.join(to_clear.values())}, kept specific prompts")
+        except Exception as delete_exc:
             db.rollback()
-            logger.error(f"Unexpected error deleting {doc_id_str}: {str(e)}", exc_info=True)
-            errors.append(f"Error deleting {doc_id_str}: {str(e)}")
+            logger.error(f"Error deleting documents: {str(delete_exc)}", exc_info=True)
+            errors.extend(f"Error deleting {doc_id_str}: {str(delete_exc)}" for doc_id_str in to_clear.values())
 
     return {
         "status": "success" if deleted_count > 0 else "error",
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.orm import Session
-from app.db.models import Prompt, Repo, GeneralSettings
+from app.db.models import Prompt, Repo, GeneralSettings, general_prompt_sha256
 from app.db.session import SessionLocal
+from app.core.http_cache import make_etag, etag_matches, set_etag, not_modified
 from app.worker.tasks_ai import task_generate_docu
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -70,20 +72,60 @@ CONTENT STRUCTURE:
 """
 
 
+# The generic prompt is read for every generation but changes rarely.
+# Writes in this process invalidate the cache right away; other processes
+# (Celery workers, further API workers) pick up changes after the TTL.
+GENERIC_PROMPT_CACHE_TTL = 60  # seconds
+_generic_prompt_cache: dict = {"prompt": None, "expires_at": 0.0}
+
+
+def invalidate_generic_prompt_cache() -> None:
+    """Drops the cached generic prompt so the next read goes to the database."""
+    _generic_prompt_cache["prompt"] = None
+    _generic_prompt_cache["expires_at"] = 0.0
+
+
 def get_generic_prompt(db: Session) -> str:
     """Returns the current generic prompt from the most recent database record."""
-    settings = db.query(GeneralSettings).order_by(GeneralSettings.id.desc()).first()
-    if settings and settings.general_prompt:
-        return settings.general_prompt
-    return _DEFAULT_GENERIC_PROMPT
+    now = time.monotonic()
+    cached = _generic_prompt_cache["prompt"]
+    if cached is not None and now < _generic_prompt_cache["expires_at"]:
+        return cached
+
+    general_prompt = (
+        db.query(GeneralSettings.general_prompt)
+        .order_by(GeneralSettings.id.desc())
+        .limit(1)
+        .scalar()
+    )
+    prompt = general_prompt or _DEFAULT_GENERIC_PROMPT
+    _generic_prompt_cache["prompt"] = prompt
+    _generic_prompt_cache["expires_at"] = now + GENERIC_PROMPT_CACHE_TTL
+    return prompt
 
 
 def set_generic_prompt(db: Session, prompt: str) -> None:
     """Updates the generic prompt in database by creating a new record if prompt changed."""
-    settings = db.query(GeneralSettings).order_by(GeneralSettings.id.desc()).first()
+    # Only the hash of the latest prompt is fetched for the change check, not the full text
+    settings = (
+        db.query(
+            GeneralSettings.id,
+            GeneralSettings.general_prompt_sha256,
+            GeneralSettings.update_time,
+            GeneralSettings.updates_disabled,
+        )
+        .order_by(GeneralSettings.id.desc())
+        .first()
+    )
     if settings:
-        # Check if prompt has changed
-        if settings.general_prompt != prompt:
+        # Check if prompt has changed (rows from before the hash column are compared by text)
+        if settings.general_prompt_sha256 is not None:
+            prompt_changed = settings.general_prompt_sha256 != general_prompt_sha256(prompt)
+        else:
+            current = db.query(GeneralSettings.general_prompt).filter(GeneralSettings.id == settings.id).scalar()
+            prompt_changed = current != prompt
+
+        if prompt_changed:
             # Create new record, copying other settings from previous
             new_settings = GeneralSettings(
                 general_prompt=prompt,
@@ -92,12 +134,14 @@ def set_generic_prompt(db: Session, prompt: str) -> None:
             )
             db.add(new_settings)
             db.commit()
+            invalidate_generic_prompt_cache()
         # If prompt hasn't changed, do nothing (no update or commit needed)
     else:
         # First time - create new record
         settings = GeneralSettings(general_prompt=prompt)
         db.add(settings)
         db.commit()
+        invalidate_generic_prompt_cache()
 
 
 # ---------------------------
@@ -112,9 +156,9 @@ def save_specific_prompt(req: SaveRepoPromptRequest, db: Session = Depends(get_d
     Documentation generation happens asynchronously in the background.
     """
     try:
-        # Verify repository exists
-        repo = db.query(Repo).filter(Repo.id == req.repo_id).first()
-        if not repo:
+        # Verify repository exists (only its name is needed)
+        repo_name = db.query(Repo.repo_name).filter(Repo.id == req.repo_id).scalar()
+        if repo_name is None:
             raise HTTPException(status_code=404, detail="Repository not found")
 
         # Get generic prompt from database
@@ -127,7 +171,7 @@ def save_specific_prompt(req: SaveRepoPromptRequest, db: Session = Depends(get_d
             # Update existing prompt - store generic and specific separately
             existing_prompt.generic_prompt = generic_prompt
             existing_prompt.specific_prompt = req.prompt.strip() if req.prompt.strip() else None
-            logger.info(f"Updated prompts for repository {repo.repo_name} (ID: {req.repo_id})")
+            logger.info(f"Updated prompts for repository {repo_name} (ID: {req.repo_id})")
         else:
             # Create new prompt entry - store generic and specific separately
             new_prompt = Prompt(
@@ -137,17 +181,17 @@ def save_specific_prompt(req: SaveRepoPromptRequest, db: Session = Depends(get_d
                 docu=None  # Will be generated
             )
             db.add(new_prompt)
-            logger.info(f"Created new prompts for repository {repo.repo_name} (ID: {req.repo_id})")
+            logger.info(f"Created new prompts for repository {repo_name} (ID: {req.repo_id})")
 
         db.commit()
 
         # Queue documentation regeneration asynchronously
-        logger.info(f"Queueing documentation regeneration for repository {repo.repo_name} with updated prompt")
-        task = task_generate_docu.delay(req.repo_id, repo.repo_name)
+        logger.info(f"Queueing documentation regeneration for repository {repo_name} with updated prompt")
+        task = task_generate_docu.delay(req.repo_id, repo_name)
 
         return PromptResponse(
             status="ok",
-            message=f"Prompt saved successfully. Documentation regeneration queued for repository {repo.repo_name}",
+            message=f"Prompt saved successfully. Documentation regeneration queued for repository {repo_name}",
             task_id=task.id
         )
 
@@ -200,8 +244,14 @@ def save_general_prompt(req: SaveGeneralPromptRequest, db: Session = Depends(get
 
 
 @router.get("/general", response_model=GetPromptResponse)
-def get_general_prompt_endpoint(db: Session = Depends(get_db)):
+def get_general_prompt_endpoint(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Gets the current generic prompt from database.
+    Answers 304 Not Modified if the client's ETag still matches.
     """
-    return GetPromptResponse(prompt=get_generic_prompt(db))
+    prompt = get_generic_prompt(db)
+    etag = make_etag(prompt)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return GetPromptResponse(prompt=prompt)
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, HttpUrl, field_validator
 from typing import List, Optional
+from celery import states
+from celery.backends.base import BaseKeyValueStoreBackend
 from celery.result import AsyncResult
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.orm import Session, aliased
+from collections import OrderedDict
+import math
 import re
+import threading
+import time
 
 from app.worker.tasks_git import task_save_repo
 from app.worker.celery_app import celery_app
@@ -12,6 +20,23 @@ from app.db.models import Repo, Prompt
 
 router = APIRouter(prefix="/repos", tags=["repos"])
 
+# Clone progress is polled by the frontend; polls within this window are
+# answered from memory instead of asking the result backend again
+TASK_STATUS_TTL = 0.5  # seconds
+TASK_STATUS_CACHE_SIZE = 1024
+
+# Suggested poll interval (Retry-After) for unfinished tasks: starts low after
+# every state change and doubles while the state stays the same
+POLL_INTERVAL_MIN = 1  # seconds
+POLL_INTERVAL_MAX = 5  # seconds
+POLL_STATE_TTL = 600  # seconds without a poll until a task is forgotten
+
+# Upper bound for GET /tasks?ids=...
+MAX_TASK_IDS_PER_BATCH = 100
+
+# HTTP/HTTPS URLs or SSH URLs (git@host:path or ssh://git@host/path)
+_GIT_URL_RE = re.compile(r'^(?:https?://.+|(?:ssh://)?git@[\w\.-]+[:/].+)')
+
 
 # ---------------------------
 # Schemas
@@ -41,13 +66,7 @@ class CloneRequest(BaseModel):
 
         v = v.strip()
 
-        # Pattern for HTTP/HTTPS URLs
-        http_pattern = r'^https?://.+'
-
-        # Pattern for SSH URLs (git@host:path or ssh://git@host/path)
-        ssh_pattern = r'^(ssh://)?git@[\w\.-]+[:/].+'
-
-        if re.match(http_pattern, v) or re.match(ssh_pattern, v):
+        if _GIT_URL_RE.match(v):
             return v
 
         raise ValueError(
@@ -133,29 +152,145 @@ def enqueue_clone(req: CloneRequest):
     return CloneEnqueueResponse(task_id=job.id)
 
 
-@router.get("/tasks/{task_id}", response_model=TaskStatusResponse)
-def get_task_status(task_id: str):
-    try:
+_task_status_cache: "OrderedDict[str, tuple[TaskStatusResponse, float]]" = OrderedDict()
+_task_status_lock = threading.Lock()
+
+
+_poll_state: "OrderedDict[str, tuple[str, float, float]]" = OrderedDict()
+
+
+def _next_poll_interval(task_id: str, state: str) -> float | None:
+    """Seconds until the client should poll again, None once the task has finished."""
+    if state in states.READY_STATES:
+        with _task_status_lock:
+            _poll_state.pop(task_id, None)
+        return None
+
+    now = time.monotonic()
+    with _task_status_lock:
+        entry = _poll_state.get(task_id)
+        if entry is not None and entry[0] == state and entry[2] > now:
+            interval = min(POLL_INTERVAL_MAX, entry[1] * 2)
+        else:
+            interval = POLL_INTERVAL_MIN
+        _poll_state[task_id] = (state, interval, now + POLL_STATE_TTL)
+        _poll_state.move_to_end(task_id)
+        while len(_poll_state) > TASK_STATUS_CACHE_SIZE:
+            _poll_state.popitem(last=False)
+    return interval
+
+
+def _set_retry_after(response: Response, intervals) -> None:
+    intervals = [interval for interval in intervals if interval is not None]
+    if intervals:
+        response.headers["Retry-After"] = str(math.ceil(min(intervals)))
+
+
+def _task_status_response(task_id: str, state: str, info) -> TaskStatusResponse:
+    result = None
+    if state == states.SUCCESS:
+        result = info
+    elif state == states.FAILURE:
+        result = {"error": str(info)}
+    elif info:
+        result = info if isinstance(info, dict) else {"info": str(info)}
+    return TaskStatusResponse(task_id=task_id, state=state, result=result)
+
+
+def _unavailable_status(task_id: str, e: Exception) -> TaskStatusResponse:
+    # If we can't get task status (e.g., Celery backend not available),
+    # return a PENDING state with error info instead of raising 500
+    return TaskStatusResponse(
+        task_id=task_id,
+        state="PENDING",
+        result={"error": f"Unable to fetch task status: {str(e)}"}
+    )
+
+
+def _fetch_task_statuses(task_ids: List[str]) -> dict[str, TaskStatusResponse]:
+    """
+    Reads the state of several tasks from the result backend.
+    Key/value backends (Redis) answer all of them with a single MGET.
+    """
+    backend = celery_app.backend
+    if isinstance(backend, BaseKeyValueStoreBackend):
+        values = backend.mget([backend.get_key_for_task(task_id) for task_id in task_ids])
+        statuses = {}
+        for task_id, value in zip(task_ids, values):
+            if value is None:
+                # Unknown or not yet started tasks have no entry in the backend
+                statuses[task_id] = _task_status_response(task_id, states.PENDING, None)
+            else:
+                meta = backend.decode_result(value)
+                statuses[task_id] = _task_status_response(task_id, meta["status"], meta["result"])
+        return statuses
+
+    statuses = {}
+    for task_id in task_ids:
         res: AsyncResult = AsyncResult(task_id, app=celery_app)
-        result = None
+        statuses[task_id] = _task_status_response(task_id, res.state, res.info)
+    return statuses
+
+
+def _get_task_statuses(task_ids: List[str]) -> List[TaskStatusResponse]:
+    """Task states in the given order, fetching only those not polled within TASK_STATUS_TTL."""
+    now = time.monotonic()
+    statuses = {}
+    with _task_status_lock:
+        for task_id in task_ids:
+            entry = _task_status_cache.get(task_id)
+            if entry is not None and entry[1] > now:
+                statuses[task_id] = entry[0]
+
+    missing = [task_id for task_id in task_ids if task_id not in statuses]
+    if missing:
         try:
-            if res.successful():
-                result = res.result
-            elif res.failed():
-                result = {"error": str(res.info)}
-            elif res.info:
-                result = res.info if isinstance(res.info, dict) else {"info": str(res.info)}
+            fetched = _fetch_task_statuses(missing)
         except Exception as e:
-            result = {"error": str(e)}
-        return TaskStatusResponse(task_id=task_id, state=res.state, result=result)
-    except Exception as e:
-        # If we can't get task status (e.g., Celery backend not available),
-        # return a PENDING state with error info instead of raising 500
-        return TaskStatusResponse(
-            task_id=task_id,
-            state="PENDING",
-            result={"error": f"Unable to fetch task status: {str(e)}"}
+            fetched = {task_id: _unavailable_status(task_id, e) for task_id in missing}
+        else:
+            expires_at = time.monotonic() + TASK_STATUS_TTL
+            with _task_status_lock:
+                for task_id, status in fetched.items():
+                    _task_status_cache[task_id] = (status, expires_at)
+                    _task_status_cache.move_to_end(task_id)
+                while len(_task_status_cache) > TASK_STATUS_CACHE_SIZE:
+                    _task_status_cache.popitem(last=False)
+        statuses.update(fetched)
+
+    return [statuses[task_id] for task_id in task_ids]
+
+
+@router.get("/tasks", response_model=List[TaskStatusResponse])
+def get_task_statuses(ids: str, response: Response):
+    """
+    Returns the status of several tasks at once (?ids=a,b,c),
+    so clients tracking multiple clones need one request per poll.
+    Retry-After suggests when to poll again (the shortest interval of all unfinished tasks).
+    """
+    task_ids = list(dict.fromkeys(task_id.strip() for task_id in ids.split(",") if task_id.strip()))
+    if not task_ids:
+        raise HTTPException(status_code=400, detail="No task ids given")
+    if len(task_ids) > MAX_TASK_IDS_PER_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_TASK_IDS_PER_BATCH} task ids per request"
         )
+    statuses = _get_task_statuses(task_ids)
+    _set_retry_after(response, [_next_poll_interval(s.task_id, s.state) for s in statuses])
+    return statuses
+
+
+@router.get("/tasks/{task_id}", response_model=TaskStatusResponse)
+def get_task_status(task_id: str, response: Response):
+    """
+    Returns the status of a task.
+    While it is unfinished, Retry-After suggests when to poll again: the interval
+    grows while the state stays the same and starts over after a change.
+    """
+    status = _get_task_statuses([task_id])[0]
+    _set_retry_after(response, [_next_poll_interval(task_id, status.state)])
+    return status
 
 
 @router.get("/list", response_model=List[RepoInfo])
@@ -163,22 +298,36 @@ def list_repositories(db: Session = Depends(get_db)):
     """
     Liefert alle Repositories aus der Datenbank.
     """
-    repos = db.query(Repo).all()
-    result = []
-    for repo in repos:
-        # Get the specific prompt for this repository from the Prompt table
-        prompt = db.query(Prompt).filter(Prompt.repo_id == repo.id).first()
-        specific_prompt = prompt.specific_prompt if prompt and prompt.specific_prompt else None
-
-        result.append(RepoInfo(
-            id=repo.id,
-            name=repo.repo_name,
-            description=repo.description,
-            repo_url=repo.repo_url,
-            date_of_version=repo.date_of_version.isoformat() if repo.date_of_version else None,
-            specific_prompt=specific_prompt,
-        ))
-    return result
+    # The specific prompt of each repository (from its first Prompt row) is
+    # fetched by a correlated subquery in the same SELECT instead of one query per repository
+    specific_prompt_subquery = (
+        select(Prompt.specific_prompt)
+        .where(Prompt.repo_id == Repo.id)
+        .order_by(Prompt.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    rows = db.query(
+        Repo.id,
+        Repo.repo_name,
+        Repo.description,
+        Repo.repo_url,
+        Repo.date_of_version,
+        specific_prompt_subquery.label("specific_prompt"),
+    ).all()
+    # The rows come straight from the database, so the list is serialized as is
+    # instead of validating one RepoInfo per row; response_model still documents the shape
+    return JSONResponse([
+        {
+            "id": row.id,
+            "name": row.repo_name,
+            "description": row.description,
+            "repo_url": row.repo_url,
+            "date_of_version": row.date_of_version.isoformat() if row.date_of_version else None,
+            "specific_prompt": row.specific_prompt or None,
+        }
+        for row in rows
+    ])
 
 
 @router.post("/delete", response_model=DeleteResponse)
@@ -186,16 +335,15 @@ def delete_repository(body: DeleteRequest, db: Session = Depends(get_db)):
     """
     Löscht ein Repository und alle zugehörigen Prompts aus der Datenbank.
     """
-    # Find repository in database
-    repo = db.query(Repo).filter(Repo.id == body.repo_id).first()
-    if not repo:
+    # One statement instead of load + delete; prompts and history follow via ON DELETE CASCADE
+    deleted_id = db.execute(
+        delete(Repo).where(Repo.id == body.repo_id).returning(Repo.id),
+        execution_options={"synchronize_session": False},
+    ).scalar()
+    if deleted_id is None:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Repository not found")
 
-    # Delete associated prompts first (CASCADE should handle this, but being explicit)
-    db.query(Prompt).filter(Prompt.repo_id == body.repo_id).delete(synchronize_session=False)
-
-    # Delete repository from database
-    db.delete(repo)
     db.commit()
 
     return DeleteResponse(status="ok", message="Repository and associated prompts deleted", target_dir=None)
@@ -206,30 +354,35 @@ def update_repository(body: UpdateRepoRequest, db: Session = Depends(get_db)):
     """
     Updates repository information (name and/or description).
     """
-    # Find repository in database
-    repo = db.query(Repo).filter(Repo.id == body.repo_id).first()
-    if not repo:
-        raise HTTPException(status_code=404, detail="Repository not found")
-
-    # Check if new name already exists (if name is being updated)
-    if body.name is not None and body.name != repo.repo_name:
-        existing_repo_with_name = db.query(Repo).filter(
-            Repo.repo_name == body.name,
-            Repo.id != body.repo_id
-        ).first()
-
-        if existing_repo_with_name:
+    values = {}
+    if body.name is not None:
+        values[Repo.repo_name] = body.name
+    if body.description is not None:
+        values[Repo.description] = body.description
+
+    if values:
+        # The name check is part of the UPDATE itself instead of a SELECT beforehand
+        stmt = update(Repo).where(Repo.id == body.repo_id)
+        if body.name is not None:
+            other = aliased(Repo)
+            stmt = stmt.where(~exists().where(other.repo_name == body.name, other.id != body.repo_id))
+        updated_id = db.execute(
+            stmt.values(values).returning(Repo.id),
+            execution_options={"synchronize_session": False},
+        ).scalar()
+    else:
+        updated_id = None
+
+    if updated_id is None:
+        # Nothing updated: either the repository is missing or the name is taken
+        if not db.query(exists().where(Repo.id == body.repo_id)).scalar():
+            raise HTTPException(status_code=404, detail="Repository not found")
+        if values:
             raise HTTPException(
                 status_code=400,
                 detail=f"Repository with name '{body.name}' already exists"
             )
 
-    # Update fields if provided
-    if body.name is not None:
-        repo.repo_name = body.name
-    if body.description is not None:
-        repo.description = body.description
-
     try:
         db.commit()
         return UpdateRepoResponse(status="ok", message="Repository updated successfully")
@@ -246,19 +399,19 @@ def regenerate_documentation(body: RegenerateDocRequest, db: Session = Depends(g
     """
     from app.services.ai_service import generate_docu
 
-    # Find repository in database
-    repo = db.query(Repo).filter(Repo.id == body.repo_id).first()
-    if not repo:
+    # Only the name of the repository is needed
+    repo_name = db.query(Repo.repo_name).filter(Repo.id == body.repo_id).scalar()
+    if repo_name is None:
         raise HTTPException(status_code=404, detail="Repository not found")
 
     try:
         # Generate documentation (this will also update the generic prompt)
-        result = generate_docu(db, body.repo_id, repo.repo_name)
+        result = generate_docu(db, body.repo_id, repo_name)
 
         if result.get("status") == "documented":
             return RegenerateDocResponse(
                 status="ok",
-                message=f"Documentation regenerated successfully for repository {repo.repo_name}"
+                message=f"Documentation regenerated successfully for repository {repo_name}"
             )
         else:
             return RegenerateDocResponse(
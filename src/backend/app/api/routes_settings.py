@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from pydantic import BaseModel
 from typing import Optional
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 from app.db.models import GeneralSettings
 from app.db.session import SessionLocal
+from app.api.routes_prompts import invalidate_generic_prompt_cache
+from app.core.http_cache import make_etag, etag_matches, set_etag, not_modified
 from datetime import timedelta
 import logging
 
@@ -43,15 +46,34 @@ class GeneralSettingsResponse(BaseModel):
 # Endpoints
 # ---------------------------
 
+def _settings_etag(settings) -> str:
+    # A record's prompt never changes (a new prompt creates a new record),
+    # so id, interval and disabled flag identify the response
+    if settings is None:
+        return make_etag(None)
+    return make_etag(settings.id, settings.update_time, settings.updates_disabled)
+
+
 @router.get("/general", response_model=GeneralSettingsResponse)
-def get_general_settings(db: Session = Depends(get_db)):
+def get_general_settings(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Gets the general settings including prompt and check interval.
     Returns the most recent settings record (by id).
     The check_interval is stored as PostgreSQL interval type (timedelta).
+    Answers 304 Not Modified if the client's ETag still matches.
     """
     try:
+        if request.headers.get("if-none-match"):
+            # Revalidation only needs the small columns, not the prompt text
+            latest = db.query(
+                GeneralSettings.id, GeneralSettings.update_time, GeneralSettings.updates_disabled
+            ).order_by(GeneralSettings.id.desc()).first()
+            etag = _settings_etag(latest)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
         settings = db.query(GeneralSettings).order_by(GeneralSettings.id.desc()).first()
+        set_etag(response, _settings_etag(settings))
 
         if not settings:
             # Return default values if no settings exist
@@ -91,9 +113,6 @@ def save_general_settings(req: GeneralSettingsRequest, db: Session = Depends(get
     The check_interval (minutes) is stored as PostgreSQL interval type (timedelta).
     """
     try:
-        # Get the most recent settings
-        settings = db.query(GeneralSettings).order_by(GeneralSettings.id.desc()).first()
-
         logger.info(
             f"PUT /general - Request: prompt='{req.prompt[:50]}...', checkInterval={req.checkInterval}, disabled={req.disabled}")
 
@@ -107,39 +126,51 @@ def save_general_settings(req: GeneralSettingsRequest, db: Session = Depends(get
             update_time_obj = timedelta(minutes=req.checkInterval)
             logger.info(f"Converted checkInterval={req.checkInterval} to timedelta={update_time_obj}")
 
-        if settings:
-            # Check if the general_prompt has changed
-            prompt_changed = settings.general_prompt != req.prompt
-
-            if prompt_changed:
-                # Create new settings record, copying unchanged settings from previous
+        # Common case: the prompt is unchanged, so the most recent record is updated
+        # in place. A single UPDATE ... RETURNING matches it only if the prompt is equal.
+        values = {"updates_disabled": req.disabled}
+        if req.checkInterval is not None:
+            values["update_time"] = update_time_obj
+        latest_id = select(func.max(GeneralSettings.id)).scalar_subquery()
+        settings = db.execute(
+            update(GeneralSettings)
+            .where(GeneralSettings.id == latest_id, GeneralSettings.general_prompt == req.prompt)
+            .values(**values)
+            .returning(
+                GeneralSettings.id,
+                GeneralSettings.general_prompt,
+                GeneralSettings.update_time,
+                GeneralSettings.updates_disabled,
+            ),
+            execution_options={"synchronize_session": False},
+        ).first()
+
+        if settings is not None:
+            logger.info("Updated general settings (no prompt change)")
+            db.commit()
+        else:
+            previous = db.query(GeneralSettings.update_time).order_by(GeneralSettings.id.desc()).first()
+            if previous:
+                # Prompt changed: create new settings record, copying unchanged settings from previous
                 # Note: If checkInterval is not provided in request (None), copy from previous settings
-                new_settings = GeneralSettings(
+                settings = GeneralSettings(
                     general_prompt=req.prompt,
-                    update_time=update_time_obj if req.checkInterval is not None else settings.update_time,
+                    update_time=update_time_obj if req.checkInterval is not None else previous.update_time,
                     updates_disabled=req.disabled
                 )
-                db.add(new_settings)
-                settings = new_settings
                 logger.info("Created new general settings record due to prompt change")
             else:
-                # Update existing settings (only check_interval or updates_disabled changed)
-                if req.checkInterval is not None:
-                    settings.update_time = update_time_obj
-                settings.updates_disabled = req.disabled
-                logger.info("Updated general settings (no prompt change)")
-        else:
-            # Create new settings record (first time)
-            settings = GeneralSettings(
-                general_prompt=req.prompt,
-                update_time=update_time_obj or timedelta(minutes=60),  # Default: 60 minutes
-                updates_disabled=req.disabled
-            )
+                # Create new settings record (first time)
+                settings = GeneralSettings(
+                    general_prompt=req.prompt,
+                    update_time=update_time_obj or timedelta(minutes=60),  # Default: 60 minutes
+                    updates_disabled=req.disabled
+                )
+                logger.info("Created first general settings record")
             db.add(settings)
-            logger.info("Created first general settings record")
+            db.commit()
 
-        db.commit()
-        db.refresh(settings)
+        invalidate_generic_prompt_cache()
 
         # Convert timedelta back to interval in minutes for response
         check_interval = None
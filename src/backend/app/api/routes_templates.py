@@ -1,15 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.db.models import Template
 from app.db.session import SessionLocal
+from app.core.http_cache import make_etag, etag_matches, set_etag, not_modified
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/prompt-templates", tags=["templates"])
 
+# Upper bound for ?limit= when listing templates
+MAX_TEMPLATES_PER_PAGE = 500
+
+# Rows per fetch while iterating over the template list
+TEMPLATE_FETCH_BATCH_SIZE = 500
+
 
 # ---------------------------
 # Database Dependency
@@ -63,22 +73,21 @@ def create_template(template: TemplateCreate, db: Session = Depends(get_db)):
     Create a new prompt template.
     """
     try:
-        # Check if template with same name already exists
-        existing = db.query(Template).filter(Template.name == template.name).first()
-        if existing:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Template with name '{template.name}' already exists"
-            )
-
         new_template = Template(
             name=template.name,
             prompt_text=template.content,
             description=template.description
         )
         db.add(new_template)
-        db.commit()
-        db.refresh(new_template)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Names are unique in the database, no separate lookup needed
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Template with name '{template.name}' already exists"
+            )
 
         logger.info(f"Created template: {template.name}")
 
@@ -97,21 +106,44 @@ def create_template(template: TemplateCreate, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=List[TemplateResponse])
-def list_templates(db: Session = Depends(get_db)):
+def list_templates(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_TEMPLATES_PER_PAGE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
     """
-    Get all prompt templates.
+    Get all prompt templates, or one page of them with limit/offset.
+    Answers 304 Not Modified if the client's ETag still matches.
     """
     try:
-        templates = db.query(Template).all()
-        return [
-            TemplateResponse(
-                id=t.id,
-                name=t.name,
-                description=t.description,
-                content=t.prompt_text
-            )
-            for t in templates
-        ]
+        # Any insert, update or delete changes one of these aggregates,
+        # so a single small query decides whether the list has changed
+        count, max_id, last_update = db.query(
+            func.count(Template.id), func.max(Template.id), func.max(Template.updated_at)
+        ).one()
+        etag = make_etag(count, max_id, last_update, limit, offset)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        query = db.query(
+            Template.id, Template.name, Template.description, Template.prompt_text
+        ).order_by(Template.id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        # Rows are fetched in batches instead of one large result list and
+        # serialized as is, without validating one TemplateResponse per row
+        response = JSONResponse([
+            {
+                "id": row.id,
+                "name": row.name,
+                "description": row.description,
+                "content": row.prompt_text,
+            }
+            for row in query.yield_per(TEMPLATE_FETCH_BATCH_SIZE)
+        ])
+        set_etag(response, etag)
+        return response
     except Exception as e:
         logger.error(f"Error listing templates: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to list templates: {str(e)}")
@@ -123,7 +155,7 @@ def get_template(template_id: int, db: Session = Depends(get_db)):
     Get a specific prompt template by ID.
     """
     try:
-        template = db.query(Template).filter(Template.id == template_id).first()
+        template = db.get(Template, template_id)
         if not template:
             raise HTTPException(status_code=404, detail="Template not found")
 
@@ -146,22 +178,10 @@ def update_template(template_id: int, template: TemplateUpdate, db: Session = De
     Update an existing prompt template.
     """
     try:
-        existing_template = db.query(Template).filter(Template.id == template_id).first()
+        existing_template = db.get(Template, template_id)
         if not existing_template:
             raise HTTPException(status_code=404, detail="Template not found")
 
-        # Check if name is being changed to an existing name
-        if template.name and template.name != existing_template.name:
-            name_exists = db.query(Template).filter(
-                Template.name == template.name,
-                Template.id != template_id
-            ).first()
-            if name_exists:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Template with name '{template.name}' already exists"
-                )
-
         # Update fields
         if template.name is not None:
             existing_template.name = template.name
@@ -170,8 +190,15 @@ def update_template(template_id: int, template: TemplateUpdate, db: Session = De
         if template.content is not None:
             existing_template.prompt_text = template.content
 
-        db.commit()
-        db.refresh(existing_template)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Renamed to the name of another template
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Template with name '{template.name}' already exists"
+            )
 
         logger.info(f"Updated template: {existing_template.name}")
 
@@ -195,7 +222,7 @@ def delete_template(template_id: int, db: Session = Depends(get_db)):
     Delete a prompt template.
     """
     try:
-        template = db.query(Template).filter(Template.id == template_id).first()
+        template = db.get(Template, template_id)
         if not template:
             raise HTTPException(status_code=404, detail="Template not found")
 
@@ -1,28 +1,105 @@
+from collections import OrderedDict
 from typing import Optional, List
-from functools import lru_cache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from authlib.jose import JsonWebToken
+from authlib.jose import JsonWebKey, JsonWebToken
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
 import httpx
-import os
 from app.core.azure_config import AZ_CLIENT_ID, AZ_ISSUER, AZ_JWKS_URL
+from app.core.config import settings
+from app.auth.mock_auth import get_session
 
-# Check if mock authentication is enabled
-USE_MOCK_AUTH = os.getenv("USE_MOCK_AUTH", "false").lower() == "true"
-
-if USE_MOCK_AUTH:
-    from app.auth.mock_auth import get_session
+logger = logging.getLogger(__name__)
 
 bearer_scheme = HTTPBearer(auto_error=False)
 jwt = JsonWebToken(["RS256", "RS512"])
 
 
-@lru_cache(maxsize=1)
-def _fetch_jwks():
-    with httpx.Client(timeout=5) as client:
-        resp = client.get(AZ_JWKS_URL)
-        resp.raise_for_status()
-        return resp.json()
+# Signing keys are cached for JWKS_TTL and re-validated with the ETag afterwards.
+# A token signed with an unknown kid (key rotation) triggers an early refresh,
+# at most once per JWKS_MIN_REFRESH so bogus tokens can't hammer the endpoint.
+JWKS_TTL = 3600  # seconds
+JWKS_MIN_REFRESH = 60  # seconds
+# Interval of the background refresh started by the API process
+JWKS_REFRESH_INTERVAL = 600  # seconds
+
+# Persistent client, so refreshes reuse the TCP/TLS connection. Only one host
+# is ever contacted; idle connections are kept for a while after a refresh so
+# a forced refresh on key rotation doesn't pay for a new TLS handshake
+_jwks_http = httpx.Client(
+    timeout=5,
+    limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=300),
+)
+_jwks_lock = threading.Lock()
+_jwks_cache = {"jwks": None, "keys_by_kid": {}, "etag": None, "fetched_at": 0.0}
+
+
+def _index_keys(jwks: dict) -> dict:
+    """Imports the signing keys once per fetch, indexed by kid."""
+    keys_by_kid = {}
+    for jwk in jwks.get("keys", []):
+        if "kid" not in jwk or "kty" not in jwk:
+            continue
+        try:
+            keys_by_kid[jwk["kid"]] = JsonWebKey.import_key(jwk)
+        except (KeyError, ValueError):
+            # Unsupported or malformed key, tokens signed with it fail verification
+            continue
+    return keys_by_kid
+
+
+def _fetch_jwks(force: bool = False) -> dict:
+    """Returns the cached JWKS, refreshing it when it is stale (or forced)."""
+    max_age = JWKS_MIN_REFRESH if force else JWKS_TTL
+    if _jwks_cache["jwks"] is not None and time.monotonic() - _jwks_cache["fetched_at"] < max_age:
+        return _jwks_cache["jwks"]
+
+    with _jwks_lock:
+        # Another thread may have refreshed the keys while we were waiting
+        if _jwks_cache["jwks"] is not None and time.monotonic() - _jwks_cache["fetched_at"] < max_age:
+            return _jwks_cache["jwks"]
+
+        headers = {}
+        if _jwks_cache["jwks"] is not None and _jwks_cache["etag"]:
+            headers["If-None-Match"] = _jwks_cache["etag"]
+        resp = _jwks_http.get(AZ_JWKS_URL, headers=headers)
+        if resp.status_code != 304:
+            resp.raise_for_status()
+            _jwks_cache["jwks"] = resp.json()
+            _jwks_cache["keys_by_kid"] = _index_keys(_jwks_cache["jwks"])
+            _jwks_cache["etag"] = resp.headers.get("ETag")
+        _jwks_cache["fetched_at"] = time.monotonic()
+        return _jwks_cache["jwks"]
+
+
+async def refresh_jwks_periodically() -> None:
+    """
+    Keeps the signing keys warm so no request has to wait for the download.
+    Runs as a background task for the lifetime of the API process.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(_fetch_jwks, True)
+        except Exception as e:
+            # verify_token still fetches on demand if the keys are missing or stale
+            logger.warning(f"Background JWKS refresh failed: {e}")
+        await asyncio.sleep(JWKS_REFRESH_INTERVAL)
+
+
+def _token_kid(token: str) -> Optional[str]:
+    """Reads the key id from the (unverified) JWT header."""
+    try:
+        segment = token.split(".", 1)[0]
+        header = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+        return header.get("kid") if isinstance(header, dict) else None
+    except ValueError:
+        return None
 
 
 class CurrentUser:
@@ -33,6 +110,38 @@ class CurrentUser:
         self.roles = roles or []
 
 
+# Verified tokens are remembered by a hash of the token (never the token itself),
+# so repeated requests skip the RSA signature check. Entries expire after
+# TOKEN_CACHE_TTL or at the token's exp, whichever comes first.
+TOKEN_CACHE_TTL = 300  # seconds
+TOKEN_CACHE_SIZE = 10_000
+
+_token_cache: "OrderedDict[bytes, tuple[CurrentUser, float]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _cached_user(token_hash: bytes) -> Optional[CurrentUser]:
+    with _token_cache_lock:
+        entry = _token_cache.get(token_hash)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if time.time() >= expires_at:
+            del _token_cache[token_hash]
+            return None
+        _token_cache.move_to_end(token_hash)
+        return user
+
+
+def _cache_user(token_hash: bytes, user: CurrentUser, exp: float) -> None:
+    expires_at = min(time.time() + TOKEN_CACHE_TTL, exp)
+    with _token_cache_lock:
+        _token_cache[token_hash] = (user, expires_at)
+        _token_cache.move_to_end(token_hash)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
 def verify_token(creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> CurrentUser:
     if not creds or creds.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
@@ -40,7 +149,7 @@ def verify_token(creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer_
     token = creds.credentials
 
     # If mock authentication is enabled and token is a mock token
-    if USE_MOCK_AUTH and token.startswith("mock-session-"):
+    if settings.USE_MOCK_AUTH and token.startswith("mock-session-"):
         user_data = get_session(token)
         if not user_data:
             raise HTTPException(status_code=401, detail="Invalid or expired session")
@@ -54,10 +163,22 @@ def verify_token(creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer_
         )
 
     # Otherwise, use real Entra ID authentication
+    token_hash = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _cached_user(token_hash)
+    if cached is not None:
+        return cached
+
     jwks = _fetch_jwks()
+    kid = _token_kid(token)
+    if kid and kid not in _jwks_cache["keys_by_kid"]:
+        # Signing key not known yet, Entra ID may have rotated its keys
+        jwks = _fetch_jwks(force=True)
+    # Verify against the one pre-imported key instead of letting authlib search
+    # and parse the key set on every call; tokens without known kid get the whole set
+    key = _jwks_cache["keys_by_kid"].get(kid) or jwks
 
     try:
-        claims = jwt.decode(token, jwks)
+        claims = jwt.decode(token, key)
         claims.validate()  # exp/nbf/iat
         if claims.get("iss") != AZ_ISSUER:
             raise HTTPException(status_code=401, detail="Invalid issuer")
@@ -73,12 +194,15 @@ def verify_token(creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer_
 
     email = claims.get("preferred_username") or claims.get("email")
     roles = claims.get("roles", []) or []  # App Roles wie "Team.Admin"
-    return CurrentUser(
+    user = CurrentUser(
         sub=claims.get("sub"),
         name=claims.get("name"),
         email=email,
         roles=roles,
     )
+    if claims.get("exp"):
+        _cache_user(token_hash, user, claims["exp"])
+    return user
 
 
 def require_role(role: str):
@@ -8,15 +8,17 @@ when the team hasn't been added to the actual Entra ID tenant yet.
 - Passwords are stored in plain text
 - No real token encryption
 - No protection against brute-force attacks
-- Sessions stored in memory (lost on restart)
+- Sessions stored in Redis (or in memory if no broker is configured)
 
 For production, use real Entra ID authentication!
 """
 
+import hmac
 import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 from pydantic import BaseModel
+from app.core.redis_pool import redis_pool, get_redis
 
 # Mock user data
 MOCK_USERS = [
@@ -43,7 +45,19 @@ MOCK_USERS = [
     }
 ]
 
-# In-memory session storage (will be lost on restart)
+# Lookup table for logins, built once at import
+_USERS_BY_EMAIL = {user["email"]: user for user in MOCK_USERS}
+
+SESSION_LIFETIME = timedelta(hours=8)
+
+# Sessions live in a Redis hash per token so every worker process sees them;
+# Redis expires them after SESSION_LIFETIME
+SESSION_KEY_PREFIX = "mock_session:"
+
+# User fields kept in a session, everything verify_token needs - never the password
+SESSION_FIELDS = ("email", "display_name", "entra_object_id", "role")
+
+# In-memory fallback when no Redis is configured (will be lost on restart)
 # Format: {token: {user_data, expires_at}}
 _sessions: Dict[str, dict] = {}
 
@@ -72,9 +86,10 @@ def authenticate_user(username: str, password: str) -> Optional[dict]:
 
     Returns user data if credentials are valid, None otherwise.
     """
-    for user in MOCK_USERS:
-        if user["email"] == username and user["password"] == password:
-            return user.copy()
+    user = _USERS_BY_EMAIL.get(username)
+    # Constant-time comparison, so response times don't reveal password prefixes
+    if user and hmac.compare_digest(user["password"].encode(), password.encode()):
+        return user.copy()
     return None
 
 
@@ -85,7 +100,18 @@ def create_session(user_data: dict) -> str:
     Returns a session token.
     """
     token = f"mock-session-{uuid.uuid4()}"
-    expires_at = datetime.utcnow() + timedelta(hours=8)
+    user_data = {field: user_data[field] for field in SESSION_FIELDS if field in user_data}
+
+    if redis_pool is not None:
+        key = SESSION_KEY_PREFIX + token
+        with get_redis() as r:
+            pipe = r.pipeline()
+            pipe.hset(key, mapping=user_data)
+            pipe.expire(key, SESSION_LIFETIME)
+            pipe.execute()
+        return token
+
+    expires_at = datetime.utcnow() + SESSION_LIFETIME
 
     _sessions[token] = {
         "user": user_data,
@@ -105,6 +131,10 @@ def get_session(token: str) -> Optional[dict]:
     if not token.startswith("mock-session-"):
         return None
 
+    if redis_pool is not None:
+        with get_redis() as r:
+            return r.hgetall(SESSION_KEY_PREFIX + token) or None
+
     session = _sessions.get(token)
     if not session:
         return None
@@ -123,6 +153,10 @@ def delete_session(token: str) -> bool:
 
     Returns True if session was deleted, False if it didn't exist.
     """
+    if redis_pool is not None:
+        with get_redis() as r:
+            return r.unlink(SESSION_KEY_PREFIX + token) > 0
+
     if token in _sessions:
         del _sessions[token]
         return True
@@ -151,6 +185,7 @@ def cleanup_expired_sessions():
     Clean up expired sessions from memory.
 
     Should be called periodically to prevent memory leaks.
+    Sessions in Redis expire on their own.
     """
     now = datetime.utcnow()
     expired = [token for token, session in _sessions.items() if now > session["expires_at"]]
@@ -1,15 +1,21 @@
 # app/core/config.py
 import os
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings  # ab Pydantic v2 korrekt!
 # (falls du noch Pydantic v1 nutzt, stattdessen: from pydantic import BaseSettings)
 
 # Explicitly load .env file from project root
-# This ensures environment variables are loaded regardless of working directory
+# This ensures environment variables are loaded regardless of working directory.
+# Settings reads only os.environ, as does code outside Settings
+# (OPENAI_API_KEY for langchain, AZURE_CLIENT_SECRET, POSTGRES_PASSWORD)
 # Path: config.py -> core -> app -> backend -> src -> CaffeineCode (repo root)
+# Only loaded when the file exists (in containers the variables come from
+# docker-compose env_file); load_dotenv never overrides variables that are already set
 env_path = Path(__file__).parent.parent.parent.parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
+if env_path.exists():
+    load_dotenv(dotenv_path=env_path)
 
 
 class Settings(BaseSettings):
@@ -22,11 +28,38 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str | None = None
     CELERY_RESULT_BACKEND: str | None = None
 
+    # Mock-Login statt Entra ID (nur Entwicklung/Demo)
+    USE_MOCK_AUTH: bool = False
+
+    # Diagnose-Endpunkte wie /docs/search/debug (nur Entwicklung, in Produktion aus)
+    DEBUG_ENDPOINTS: bool = False
+
+    # Connection-Pool der Datenbank (pro Prozess, an die Anzahl der Worker anpassen)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE: int = 1800  # Sekunden
+    DB_POOL_TIMEOUT: int = 30  # Sekunden Wartezeit auf eine freie Verbindung, danach Fehler statt Hänger
+    # statement_timeout pro Verbindung in Sekunden, 0 = kein Limit. Standardmäßig aus,
+    # weil init_db beim Start Indizes (CONCURRENTLY) auf großen Tabellen bauen kann
+    DB_STATEMENT_TIMEOUT: int = 0
+
+    # Threads für synchrone Endpunkte (Starlette-Standard: 40). Passend zu
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW, damit jede Pool-Verbindung genutzt werden kann
+    API_THREADPOOL_SIZE: int = 60
+
+    # Parallele Doku-Generierungen im MCP-Tool generate_documentation_for_repos
+    # (jede hält eine DB-Verbindung und wartet auf Git/LLM)
+    AI_CONCURRENCY: int = 4
+
     class Config:
-        env_file = ".env"        # Damit FastAPI sie beim Start lädt
-        env_file_encoding = "utf-8"
         extra = "ignore"         # Ignore extra fields from .env that aren't defined in Settings
 
 
-# Globale Settings-Instanz
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Liefert die Settings-Instanz, die Umgebung wird nur einmal gelesen."""
+    return Settings()
+
+
+# Globale Settings-Instanz (dieselbe wie get_settings())
+settings = get_settings()
@@ -0,0 +1,42 @@
+# app/core/http_cache.py
+"""
+ETag based conditional GET support for read endpoints.
+Clients send the ETag back in If-None-Match and get an empty 304 when the
+resource is unchanged, so the payload is neither rebuilt nor transferred again.
+"""
+import hashlib
+
+from fastapi import Request, Response
+
+# Responses depend on the logged-in user, so only the browser may cache them,
+# and it has to revalidate every time
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Builds a strong ETag from the values that determine a response."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Checks the If-None-Match header of the request against an ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison as required for If-None-Match (RFC 9110)
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Adds the validator headers to a full response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching If-None-Match."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,51 @@
+# app/core/logging_config.py
+"""
+Non-blocking logging for the API process.
+Loggers of the app package only put their records on a queue; a background
+QueueListener hands them to the root logger's handlers, so formatting and
+writing (including exc_info tracebacks) happen off the request thread.
+"""
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+APP_LOGGER_NAME = "app"
+
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
+
+
+class _RootForwarder(logging.Handler):
+    """Passes records on to the root logger, just like propagation would."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger().handle(record)
+
+
+def start_queue_logging() -> None:
+    """Routes the app loggers through the queue. Safe to call more than once."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_queue = queue.Queue(-1)
+    _queue_handler = QueueHandler(log_queue)
+    app_logger = logging.getLogger(APP_LOGGER_NAME)
+    app_logger.addHandler(_queue_handler)
+    app_logger.propagate = False
+
+    _listener = QueueListener(log_queue, _RootForwarder())
+    _listener.start()
+
+
+def stop_queue_logging() -> None:
+    """Flushes pending records and restores direct propagation to the root logger."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+
+    _listener.stop()
+    app_logger = logging.getLogger(APP_LOGGER_NAME)
+    app_logger.removeHandler(_queue_handler)
+    app_logger.propagate = True
+    _listener = _queue_handler = None
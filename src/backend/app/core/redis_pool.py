@@ -0,0 +1,44 @@
+# app/core/redis_pool.py
+"""
+Shared connection pool for the Redis instance behind CELERY_BROKER_URL.
+All direct Redis access (caches, health checks, diagnostics) should borrow
+connections from here instead of dialing a new client per call.
+"""
+from contextlib import contextmanager
+
+import redis
+
+from app.core.config import settings
+
+# One connection per API worker thread, the pool is shared by every request
+REDIS_MAX_CONNECTIONS = settings.API_THREADPOOL_SIZE
+REDIS_TIMEOUT = 3  # seconds
+
+
+def create_pool(url: str) -> redis.BlockingConnectionPool:
+    """
+    Builds the bounded pool for a Redis URL.
+    When every connection is checked out, callers wait up to REDIS_TIMEOUT for a free one
+    instead of failing immediately with "Too many connections".
+    """
+    return redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_TIMEOUT,
+        socket_connect_timeout=REDIS_TIMEOUT,
+        decode_responses=True,
+    )
+
+
+redis_pool = create_pool(settings.CELERY_BROKER_URL) if settings.CELERY_BROKER_URL else None
+
+
+@contextmanager
+def get_redis():
+    """
+    Yields a Redis client backed by the shared pool.
+    Connections go back to the pool after every command, nothing is closed here.
+    """
+    if redis_pool is None:
+        raise RuntimeError("CELERY_BROKER_URL not configured")
+    yield redis.Redis(connection_pool=redis_pool)
@@ -12,11 +12,23 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Bump with every model change or new migration (matches the latest file in
+# /migrations), otherwise init_db() skips the schema setup on existing databases
+SCHEMA_VERSION = 13
 
-def table_exists(session: Session, table_name: str) -> bool:
-    """Check if a table exists in the database."""
-    inspector = inspect(session.bind)
-    return table_name in inspector.get_table_names()
+
+def _drop_invalid_indexes(conn, *names: str):
+    """
+    Drop indexes an interrupted or failed CREATE INDEX CONCURRENTLY left behind as INVALID.
+    IF NOT EXISTS would skip them forever, so they are rebuilt on the next run instead.
+    """
+    invalid = conn.execute(text("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = ANY(:names) AND NOT i.indisvalid;
+    """), {"names": list(names)}).scalars().all()
+    for name in invalid:
+        logger.warning(f"Dropping invalid index {name} left by an earlier failed build...")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name};"))
 
 
 def drop_old_tables(session: Session):
@@ -25,13 +37,17 @@ def drop_old_tables(session: Session):
         old_tables = ['repo_clones', 'user_repo_roles', 'document_files', 'documents',
                       'prompt_runs', 'prompts', 'repositories']
 
-        for table in old_tables:
-            if table_exists(session, table):
-                logger.info(f"Dropping old table '{table}'...")
-                session.execute(text(f"DROP TABLE IF EXISTS {table} CASCADE;"))
+        # One catalog lookup and one DROP statement for all leftover tables
+        existing_tables = set(inspect(session.bind).get_table_names())
+        tables_to_drop = [table for table in old_tables if table in existing_tables]
+
+        if tables_to_drop:
+            logger.info(f"Dropping old tables {', '.join(tables_to_drop)}...")
+            session.execute(text(f"DROP TABLE IF EXISTS {', '.join(tables_to_drop)} CASCADE;"))
 
         session.commit()
         logger.info("Successfully dropped old tables.")
+        return True
     except Exception as e:
         logger.error(f"Error dropping old tables: {e}")
         session.rollback()
@@ -40,35 +56,53 @@ def drop_old_tables(session: Session):
 
 def apply_cascade_delete_migration(session: Session):
     """Apply migration to change foreign key constraint to CASCADE delete."""
+    if session.bind.dialect.name != "postgresql":
+        return True
+
     try:
         logger.info("Applying cascade delete migration for prompt table...")
 
-        # Drop the existing foreign key constraint
-        session.execute(text("ALTER TABLE prompt DROP CONSTRAINT IF EXISTS prompt_repo_id_fkey;"))
+        # Databases created from the models already have the CASCADE constraint
+        if session.execute(text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'prompt_repo_id_fkey' AND confdeltype = 'c';"
+        )).scalar():
+            logger.info("Cascade delete migration already applied.")
+            return True
 
-        # Add the foreign key constraint with CASCADE delete
+        # Replace the foreign key constraint with a CASCADE delete one in a single statement
         session.execute(text("""
-            ALTER TABLE prompt ADD CONSTRAINT prompt_repo_id_fkey
-            FOREIGN KEY (repo_id) REFERENCES repo(id) ON DELETE CASCADE;
+            ALTER TABLE prompt
+                DROP CONSTRAINT IF EXISTS prompt_repo_id_fkey,
+                ADD CONSTRAINT prompt_repo_id_fkey
+                    FOREIGN KEY (repo_id) REFERENCES repo(id) ON DELETE CASCADE;
         """))
 
         session.commit()
         logger.info("Successfully applied cascade delete migration.")
+        return True
     except Exception as e:
         logger.error(f"Error applying cascade delete migration: {e}")
         session.rollback()
         # Don't raise - migration might already be applied
         logger.warning("Continuing despite migration error (may already be applied)")
+        return False
 
 
 def apply_prompt_columns_migration(session: Session):
     """Add generic_prompt and specific_prompt columns and migrate data from text column."""
+    if session.bind.dialect.name != "postgresql":
+        return True
+
     try:
         logger.info("Applying prompt columns migration...")
 
-        # Check if columns already exist
-        inspector = inspect(session.bind)
-        columns = [col['name'] for col in inspector.get_columns('prompt')]
+        # Check if columns already exist (one catalog query instead of reflection)
+        columns = {
+            row[0] for row in session.execute(text("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_schema = 'public' AND table_name = 'prompt';
+            """))
+        }
 
         if 'generic_prompt' not in columns:
             logger.info("Adding generic_prompt column...")
@@ -78,40 +112,44 @@ def apply_prompt_columns_migration(session: Session):
             logger.info("Adding specific_prompt column...")
             session.execute(text("ALTER TABLE prompt ADD COLUMN specific_prompt TEXT;"))
 
-        # Migrate existing data from text column
-        # For repo-specific prompts (repo_id IS NOT NULL), extract specific part
-        logger.info("Migrating existing prompt data...")
-
-        # Extract specific prompts from combined text using the marker
-        session.execute(text("""
-            UPDATE prompt
-            SET specific_prompt = TRIM(SPLIT_PART(text, 'REPOSITORY-SPECIFIC INSTRUCTIONS:', 2)),
-                generic_prompt = TRIM(SPLIT_PART(text, 'REPOSITORY-SPECIFIC INSTRUCTIONS:', 1))
-            WHERE repo_id IS NOT NULL
-              AND text LIKE '%REPOSITORY-SPECIFIC INSTRUCTIONS:%'
-              AND specific_prompt IS NULL;
-        """))
-
-        # For prompts without the marker but with repo_id, keep text as generic
-        session.execute(text("""
-            UPDATE prompt
-            SET generic_prompt = text
-            WHERE repo_id IS NOT NULL
-              AND text NOT LIKE '%REPOSITORY-SPECIFIC INSTRUCTIONS:%'
-              AND generic_prompt IS NULL;
-        """))
-
-        # Make text column nullable
-        logger.info("Making text column nullable...")
-        session.execute(text("ALTER TABLE prompt ALTER COLUMN text DROP NOT NULL;"))
+        # Only databases from before the split still have the old text column
+        if 'text' in columns:
+            # Migrate existing data from text column
+            # For repo-specific prompts (repo_id IS NOT NULL), extract specific part
+            logger.info("Migrating existing prompt data...")
+
+            # One pass over the table: split prompts containing the marker into
+            # generic/specific part, keep the whole text as generic otherwise
+            session.execute(text("""
+                UPDATE prompt
+                SET specific_prompt = CASE
+                        WHEN text LIKE '%REPOSITORY-SPECIFIC INSTRUCTIONS:%'
+                        THEN TRIM(SPLIT_PART(text, 'REPOSITORY-SPECIFIC INSTRUCTIONS:', 2))
+                        ELSE specific_prompt
+                    END,
+                    generic_prompt = CASE
+                        WHEN text LIKE '%REPOSITORY-SPECIFIC INSTRUCTIONS:%'
+                        THEN TRIM(SPLIT_PART(text, 'REPOSITORY-SPECIFIC INSTRUCTIONS:', 1))
+                        ELSE text
+                    END
+                WHERE repo_id IS NOT NULL
+                  AND ((text LIKE '%REPOSITORY-SPECIFIC INSTRUCTIONS:%' AND specific_prompt IS NULL)
+                       OR (text NOT LIKE '%REPOSITORY-SPECIFIC INSTRUCTIONS:%' AND generic_prompt IS NULL));
+            """))
+
+            # Make text column nullable
+            logger.info("Making text column nullable...")
+            session.execute(text("ALTER TABLE prompt ALTER COLUMN text DROP NOT NULL;"))
 
         session.commit()
         logger.info("Successfully applied prompt columns migration.")
+        return True
     except Exception as e:
         logger.error(f"Error applying prompt columns migration: {e}")
         session.rollback()
         # Don't raise - migration might already be applied
         logger.warning("Continuing despite migration error (may already be applied)")
+        return False
 
 
 def apply_project_goal_columns_migration(session: Session):
@@ -124,47 +162,40 @@ def apply_project_goal_columns_migration(session: Session):
     connection = session.connection()
     
     try:
-        # Allowed table names - security safeguard
-        allowed_tables = {'prompt', 'history'}
-        
-        for table_name in ['prompt', 'history']:
-            logger.info(f"Processing table: {table_name}")
-            
-            # Validate table name for security
-            if table_name not in allowed_tables:
-                logger.warning(f"Skipping invalid table name: {table_name}")
-                continue
-            
-            # Use DO block to check and add column in a single atomic operation
-            # This is more reliable than separate check and alter statements
-            sql = f"""
-            DO $$
-            BEGIN
+        # Single DO block for both tables: one round-trip and one commit
+        # instead of a check and ALTER per table
+        sql = """
+        DO $$
+        DECLARE
+            tbl TEXT;
+        BEGIN
+            FOREACH tbl IN ARRAY ARRAY['prompt', 'history'] LOOP
                 -- Check if column exists
                 IF NOT EXISTS (
-                    SELECT 1 
-                    FROM information_schema.columns 
+                    SELECT 1
+                    FROM information_schema.columns
                     WHERE table_schema = 'public'
-                    AND table_name = '{table_name}'
+                    AND table_name = tbl
                     AND column_name = 'project_goal'
                 ) THEN
                     -- Add the column if it doesn't exist
-                    ALTER TABLE {table_name} ADD COLUMN project_goal TEXT;
-                    RAISE NOTICE 'Added project_goal column to % table', '{table_name}';
+                    EXECUTE format('ALTER TABLE %I ADD COLUMN project_goal TEXT', tbl);
+                    RAISE NOTICE 'Added project_goal column to % table', tbl;
                 ELSE
-                    RAISE NOTICE 'Column project_goal already exists in % table', '{table_name}';
+                    RAISE NOTICE 'Column project_goal already exists in % table', tbl;
                 END IF;
-            END $$;
-            """
-            
-            logger.info(f"Executing DO block for {table_name} table...")
-            connection.execute(text(sql))
-            connection.commit()  # Commit immediately after each table
-            logger.info(f"✓ Completed processing {table_name} table")
+            END LOOP;
+        END $$;
+        """
+
+        logger.info("Executing DO block for prompt and history tables...")
+        connection.execute(text(sql))
+        connection.commit()
 
         logger.info("=" * 80)
         logger.info("✓ Successfully applied project_goal columns migration")
         logger.info("=" * 80)
+        return True
     except Exception as e:
         logger.error("=" * 80)
         logger.error(f"✗ Error applying project_goal columns migration: {e}", exc_info=True)
@@ -174,20 +205,226 @@ def apply_project_goal_columns_migration(session: Session):
         raise
 
 
-def run_migrations(session: Session):
-    """Run all pending migrations."""
-    logger.info("Running database migrations...")
+def apply_trigram_indexes_migration(session: Session):
+    """Add pg_trgm GIN indexes so the ILIKE substring search on docu and repo_name can use an index."""
+    if session.bind.dialect.name != "postgresql":
+        return True
+
+    try:
+        logger.info("Applying trigram search indexes migration...")
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with session.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+            _drop_invalid_indexes(conn, "prompt_docu_trgm", "repo_name_trgm")
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS prompt_docu_trgm ON prompt USING gin (docu gin_trgm_ops);"
+            ))
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS repo_name_trgm ON repo USING gin (repo_name gin_trgm_ops);"
+            ))
+
+        logger.info("Successfully applied trigram search indexes migration.")
+        return True
+    except Exception as e:
+        logger.error(f"Error applying trigram search indexes migration: {e}")
+        # Don't raise - search still works without the indexes, just slower
+        logger.warning("Continuing without trigram indexes (pg_trgm may not be available)")
+        return False
+
+
+def apply_prompt_toc_column_migration(session: Session):
+    """Add toc column to prompt table so the table of contents is stored with the documentation."""
+    if session.bind.dialect.name != "postgresql":
+        return True
+
+    try:
+        logger.info("Applying prompt toc column migration...")
+        session.execute(text("ALTER TABLE prompt ADD COLUMN IF NOT EXISTS toc TEXT;"))
+        session.commit()
+        logger.info("Successfully applied prompt toc column migration.")
+        return True
+    except Exception as e:
+        logger.error(f"Error applying prompt toc column migration: {e}")
+        session.rollback()
+        # Don't raise - documents without a stored toc are rendered on the fly
+        logger.warning("Continuing despite prompt toc column migration error")
+        return False
+
+
+def apply_template_updated_at_migration(session: Session):
+    """Add updated_at column to template table so list responses can be revalidated cheaply."""
+    if session.bind.dialect.name != "postgresql":
+        return True
+
+    try:
+        logger.info("Applying template updated_at migration...")
+        session.execute(text("ALTER TABLE template ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now();"))
+        session.commit()
+        logger.info("Successfully applied template updated_at migration.")
+        return True
+    except Exception as e:
+        logger.error(f"Error applying template updated_at migration: {e}")
+        session.rollback()
+        logger.warning("Continuing despite template updated_at migration error")
+        return False
 
-    # Drop old tables if they exist (moving to new schema)
-    drop_old_tables(session)
 
-    # Apply cascade delete migration
-    apply_cascade_delete_migration(session)
+def apply_timestamp_server_defaults_migration(session: Session):
+    """Set DEFAULT now() on the timestamp columns the models no longer fill from Python."""
+    if session.bind.dialect.name != "postgresql":
+        return True
 
-    # Apply prompt columns migration
-    apply_prompt_columns_migration(session)
+    try:
+        logger.info("Applying timestamp server defaults migration...")
+        session.execute(text("""
+            ALTER TABLE repo ALTER COLUMN date_of_version SET DEFAULT now();
+            ALTER TABLE prompt ALTER COLUMN created_at SET DEFAULT now();
+            ALTER TABLE history ALTER COLUMN created_at SET DEFAULT now();
+            ALTER TABLE general_settings ALTER COLUMN updated_at SET DEFAULT now();
+        """))
+        session.commit()
+        logger.info("Successfully applied timestamp server defaults migration.")
+        return True
+    except Exception as e:
+        logger.error(f"Error applying timestamp server defaults migration: {e}")
+        session.rollback()
+        logger.warning("Continuing despite timestamp server defaults migration error")
+        return False
+
+
+def apply_general_prompt_hash_migration(session: Session):
+    """Add general_prompt_sha256 column to general_settings and fill it for existing rows."""
+    if session.bind.dialect.name != "postgresql":
+        return True
+
+    try:
+        logger.info("Applying general prompt hash migration...")
+        session.execute(text(
+            "ALTER TABLE general_settings ADD COLUMN IF NOT EXISTS general_prompt_sha256 VARCHAR(64);"
+        ))
+        session.execute(text(
+            "UPDATE general_settings "
+            "SET general_prompt_sha256 = encode(sha256(convert_to(general_prompt, 'UTF8')), 'hex') "
+            "WHERE general_prompt_sha256 IS NULL;"
+        ))
+        session.commit()
+        logger.info("Successfully applied general prompt hash migration.")
+        return True
+    except Exception as e:
+        logger.error(f"Error applying general prompt hash migration: {e}")
+        session.rollback()
+        # Don't raise - rows without a hash are compared by their full text
+        logger.warning("Continuing despite general prompt hash migration error")
+        return False
+
+
+def apply_prompt_docu_ready_index_migration(session: Session):
+    """Add a partial index over the prompts that have documentation (list, search, lookups by repo)."""
+    if session.bind.dialect.name != "postgresql":
+        return True
 
-    # Apply project_goal columns migration
-    apply_project_goal_columns_migration(session)
+    try:
+        logger.info("Applying prompt docu ready index migration...")
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with session.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            _drop_invalid_indexes(conn, "prompt_docu_ready_idx")
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS prompt_docu_ready_idx "
+                "ON prompt (repo_id, created_at DESC) WHERE docu IS NOT NULL;"
+            ))
+
+        logger.info("Successfully applied prompt docu ready index migration.")
+        return True
+    except Exception as e:
+        logger.error(f"Error applying prompt docu ready index migration: {e}")
+        # Don't raise - queries still work without the index, just slower
+        logger.warning("Continuing without prompt docu ready index")
+        return False
+
+
+def apply_prompt_repo_id_index_migration(session: Session):
+    """Add an index on prompt (repo_id, prompt_id) for the per-repo prompt lookups and joins."""
+    if session.bind.dialect.name != "postgresql":
+        return True
+
+    try:
+        logger.info("Applying prompt repo_id index migration...")
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with session.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            _drop_invalid_indexes(conn, "prompt_repo_id_idx")
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS prompt_repo_id_idx "
+                "ON prompt (repo_id, prompt_id);"
+            ))
+
+        logger.info("Successfully applied prompt repo_id index migration.")
+        return True
+    except Exception as e:
+        logger.error(f"Error applying prompt repo_id index migration: {e}")
+        # Don't raise - queries still work without the index, just slower
+        logger.warning("Continuing without prompt repo_id index")
+        return False
+
+
+def apply_template_name_unique_migration(session: Session):
+    """Make template names unique so duplicates are rejected by the database."""
+    if session.bind.dialect.name != "postgresql":
+        return True
+
+    try:
+        logger.info("Applying template name unique migration...")
+
+        # Same name as the constraint create_all() generates for unique=True,
+        # so fresh databases skip this. CONCURRENTLY cannot run inside a transaction block
+        with session.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            _drop_invalid_indexes(conn, "template_template_name_key")
+            conn.execute(text(
+                "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS template_template_name_key "
+                "ON template (template_name);"
+            ))
+
+        logger.info("Successfully applied template name unique migration.")
+        return True
+    except Exception as e:
+        logger.error(f"Error applying template name unique migration: {e}")
+        # Don't raise - fails if duplicate names already exist, which need manual cleanup
+        logger.warning("Continuing without unique template names")
+        return False
+
+
+def run_migrations(session: Session) -> bool:
+    """
+    Run all pending migrations.
+    Returns False if one of them failed and was skipped, so the caller can retry on the next start.
+    """
+    logger.info("Running database migrations...")
 
+    migrations = (
+        # Drop old tables if they exist (moving to new schema)
+        drop_old_tables,
+        apply_cascade_delete_migration,
+        apply_prompt_columns_migration,
+        apply_project_goal_columns_migration,
+        apply_prompt_toc_column_migration,
+        apply_general_prompt_hash_migration,
+        apply_template_updated_at_migration,
+        apply_timestamp_server_defaults_migration,
+        apply_trigram_indexes_migration,
+        apply_prompt_docu_ready_index_migration,
+        apply_prompt_repo_id_index_migration,
+        apply_template_name_unique_migration,
+    )
+    # Every migration runs even if an earlier one failed; the failed ones are retried next start
+    failed = []
+    for migration in migrations:
+        if not migration(session):
+            failed.append(migration.__name__)
+
+    if failed:
+        logger.warning(f"Database migrations completed with failures: {', '.join(failed)}")
+        return False
     logger.info("Database migrations completed.")
+    return True
@@ -1,8 +1,9 @@
+import hashlib
 from datetime import datetime, time, timedelta
 from sqlalchemy import (
-    Column, Integer, String, Text, TIMESTAMP, ForeignKey, Boolean, Time, Interval
+    Column, Integer, String, Text, TIMESTAMP, ForeignKey, Boolean, Time, Interval, func
 )
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 # --- Tables matching external database schema ---
@@ -20,6 +21,8 @@ class User(Base):
 class Repo(Base):
     """Repo table - stores repository information"""
     __tablename__ = "repo"
+    # Server-side timestamps come back via RETURNING in the INSERT/UPDATE itself
+    __mapper_args__ = {"eager_defaults": True}
     id: Mapped[int] = mapped_column(
         "repo_id", Integer, primary_key=True, autoincrement=True
     )
@@ -27,7 +30,7 @@ class Repo(Base):
     repo_url: Mapped[str] = mapped_column(Text, nullable=False)
     description: Mapped[str | None] = mapped_column("repo_description", Text)
     date_of_version: Mapped[datetime] = mapped_column(
-        TIMESTAMP, nullable=False, default=datetime.now
+        TIMESTAMP, nullable=False, server_default=func.now()
     )
     # Authentication columns for accessing private repositories
     ssh_key_path: Mapped[str | None] = mapped_column(Text)
@@ -40,43 +43,62 @@ class Repo(Base):
 class Prompt(Base):
     """Prompt table - stores prompts and generated documentation"""
     __tablename__ = "prompt"
+    __mapper_args__ = {"eager_defaults": True}
     id: Mapped[int] = mapped_column("prompt_id", Integer, primary_key=True, autoincrement=True)
     generic_prompt: Mapped[str] = mapped_column(Text, nullable=False)  # Generic/template prompt
     specific_prompt: Mapped[str | None] = mapped_column(Text)  # Repository-specific prompt
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, default=datetime.now)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, server_default=func.now())
     repo_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("repo.repo_id", ondelete="CASCADE"))
     docu: Mapped[str | None] = mapped_column(Text)
+    toc: Mapped[str | None] = mapped_column(Text)  # Table of contents rendered from docu
     project_goal: Mapped[str | None] = mapped_column(Text)  # Project goal description
 
+    repo: Mapped["Repo | None"] = relationship()
+
 
 class Template(Base):
     """Template table - stores prompt templates"""
     __tablename__ = "template"
     id: Mapped[int] = mapped_column("template_id", Integer, primary_key=True, autoincrement=True)
-    name: Mapped[str] = mapped_column("template_name", Text, nullable=False)
+    name: Mapped[str] = mapped_column("template_name", Text, nullable=False, unique=True)
     prompt_text: Mapped[str] = mapped_column(Text, nullable=False)
     description: Mapped[str | None] = mapped_column("template_description", Text)
+    updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP, default=datetime.now, onupdate=datetime.now)
 
 
 class History(Base):
     """History table - stores historical prompt data"""
     __tablename__ = "history"
+    __mapper_args__ = {"eager_defaults": True}
     id: Mapped[int] = mapped_column("history_id", Integer, primary_key=True, autoincrement=True)
     prompt_id: Mapped[int | None] = mapped_column(Integer)
     generic_prompt: Mapped[str] = mapped_column(Text, nullable=False)
     specific_prompt: Mapped[str | None] = mapped_column(Text)
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, default=datetime.now)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, server_default=func.now())
     repo_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("repo.repo_id", ondelete="CASCADE"))
     docu: Mapped[str | None] = mapped_column(Text)
     project_goal: Mapped[str | None] = mapped_column(Text)  # Project goal description
 
 
+def general_prompt_sha256(prompt: str) -> str:
+    """Hex SHA-256 of a general prompt, used to detect changes without comparing the full text."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _general_prompt_sha256_default(context) -> str:
+    return general_prompt_sha256(context.get_current_parameters()["general_prompt"])
+
+
 class GeneralSettings(Base):
     """General settings table - stores general prompt and update timer configuration"""
     __tablename__ = "general_settings"
+    __mapper_args__ = {"eager_defaults": True}
     id: Mapped[int] = mapped_column("settings_id", Integer, primary_key=True, autoincrement=True)
     general_prompt: Mapped[str] = mapped_column(Text, nullable=False)
+    general_prompt_sha256: Mapped[str | None] = mapped_column(
+        String(64), default=_general_prompt_sha256_default)  # Filled from general_prompt on insert
     update_time: Mapped[timedelta | None] = mapped_column(
         "update_timer", Interval)  # Maps to 'update_timer' column in DB as interval
     updates_disabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
-    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, default=datetime.now, onupdate=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
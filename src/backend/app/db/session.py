@@ -1,20 +1,85 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+import logging
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
 
 # Fail-fast mit klarer Meldung
 if not getattr(settings, "DATABASE_URL", None):
     raise RuntimeError("DATABASE_URL ist nicht gesetzt. Prüfe .env und docker-compose.yml")
 
+# Pool-Größen nur für Server-Datenbanken, SQLite (Tests) nutzt die Standard-Pools
+pool_args = {}
+if not settings.DATABASE_URL.startswith("sqlite"):
+    pool_args = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        # LIFO hält wenige Verbindungen warm, überzählige laufen per pool_recycle aus
+        "pool_use_lifo": True,
+    }
+
+# pool_pre_ping prüft jede Verbindung beim Checkout, so bekommen API-Routen und
+# Celery-Tasks nach einem DB-Neustart/Failover keine tote Verbindung aus dem Pool
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
     future=True,
+    **pool_args,
 )
 
+if not settings.DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _configure_connection(dbapi_connection, connection_record):
+        # Einmal pro physischer Verbindung statt pro Session/Query. Autocommit,
+        # damit das Rollback beim Zurückgeben in den Pool die SETs nicht verwirft
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        try:
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(
+                    f"SET statement_timeout = {settings.DB_STATEMENT_TIMEOUT * 1000}; "
+                    "SET search_path TO public"
+                )
+        finally:
+            dbapi_connection.autocommit = autocommit
+
+
+# expire_on_commit=False: Objekte bleiben nach dem Commit lesbar, ohne dass jeder
+# Attributzugriff ein neues SELECT auslöst. Wer danach DB-seitige Änderungen
+# sehen muss, ruft session.refresh(obj) explizit auf.
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
+    expire_on_commit=False,
     bind=engine,
     future=True,
 )
+
+# Session des laufenden Aufrufs (z.B. MCP-Tool), damit verschachtelte Aufrufe
+# dieselbe Session und Verbindung nutzen statt eine weitere auszuchecken
+current_session: ContextVar[Session | None] = ContextVar("current_session", default=None)
+
+
+def run_with_reconnect(fn, *args, **kwargs):
+    """
+    Führt fn aus und wiederholt den Aufruf genau einmal, wenn die Verbindung
+    währenddessen abgerissen ist (pool_pre_ping deckt nur den Checkout ab).
+    SQLAlchemy verwirft die Verbindung in dem Fall selbst, der zweite Versuch
+    bekommt eine frische.
+    fn muss eine eigene Session öffnen und gefahrlos wiederholbar sein.
+    """
+    try:
+        return fn(*args, **kwargs)
+    except DBAPIError as e:
+        if not e.connection_invalidated:
+            raise
+        logger.warning("Database connection was invalidated, retrying once", exc_info=True)
+        return fn(*args, **kwargs)
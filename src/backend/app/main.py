@@ -1,31 +1,59 @@
 # app/main.py
+import asyncio
+import os
 from contextlib import asynccontextmanager
 
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
-from app.db.init_db import init_db
-from app.db.session import SessionLocal
+from app.core.config import get_settings
+from app.core.logging_config import start_queue_logging, stop_queue_logging
+from app.auth.deps import refresh_jwks_periodically
+from app.db.session import engine, run_with_reconnect
 from sqlalchemy import text
 
-from app.api.routes_health import router as health_router
-from app.api.routes_repo import router as repo_router
-from app.api.routes_auth import router as auth_router
+# Einmal gebaut, SQLAlchemy cached die kompilierte Form für jeden Health-Probe
+_HEALTH_SQL = text("SELECT 1")
 
-from app.api.routes_ai import router as ai_router
-from app.api.routes_prompts import router as prompts_router
-from app.api.routes_docs import router as docs_router
-from app.api.routes_templates import router as templates_router
-from app.api.routes_settings import router as settings_router
+
+def _check_db():
+    # Direkt über eine Pool-Verbindung, ohne ORM-Session
+    with engine.connect() as conn:
+        conn.execute(_HEALTH_SQL)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    from app.db.init_db import init_db
+
+    start_queue_logging()
+    # Sync routes run in this thread pool while they wait on the database
+    anyio.to_thread.current_default_thread_limiter().total_tokens = get_settings().API_THREADPOOL_SIZE
     init_db()
+    jwks_refresher = None
+    if os.getenv("TESTING") != "true":
+        # Entra ID signing keys are downloaded in the background, not by the first request
+        jwks_refresher = asyncio.create_task(refresh_jwks_periodically())
     yield
+    if jwks_refresher is not None:
+        jwks_refresher.cancel()
+    stop_queue_logging()
 
 
 def create_app() -> FastAPI:
+    # Router-Module erst hier importieren, damit "import app.main" nicht die komplette
+    # API (Models, Schemas, Services) lädt, solange keine App gebaut wird
+    from app.api.routes_health import router as health_router
+    from app.api.routes_repo import router as repo_router
+    from app.api.routes_auth import router as auth_router
+
+    from app.api.routes_ai import router as ai_router
+    from app.api.routes_prompts import router as prompts_router
+    from app.api.routes_docs import router as docs_router, debug_router as docs_debug_router
+    from app.api.routes_templates import router as templates_router
+    from app.api.routes_settings import router as settings_router
+
+    settings = get_settings()
     app = FastAPI(
         title=settings.app_name,
         debug=settings.debug,
@@ -57,8 +85,7 @@ def create_app() -> FastAPI:
 
     @app.get("/health/db")
     def health_db():
-        with SessionLocal() as db:
-            db.execute(text("SELECT 1"))
+        run_with_reconnect(_check_db)
         return {"db": "ok"}
 
     @app.get("/health")
@@ -71,6 +98,9 @@ def create_app() -> FastAPI:
     app.include_router(auth_router)
     app.include_router(ai_router)
     app.include_router(prompts_router)
+    if settings.DEBUG_ENDPOINTS:
+        # Diagnose-Endpunkte listen alle Dokumente, daher nur auf Wunsch
+        app.include_router(docs_debug_router)
     app.include_router(docs_router)
     app.include_router(templates_router)
     app.include_router(settings_router)
@@ -78,4 +108,9 @@ def create_app() -> FastAPI:
     return app
 
 
-app = create_app()
+def __getattr__(name: str):
+    # "app.main:app" (uvicorn) baut die App beim ersten Zugriff
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
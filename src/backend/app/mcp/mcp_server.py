@@ -14,55 +14,95 @@ Er nutzt:
 - FastMCP als MCP-Framework
 - deine bestehenden DB-Modelle & Services
 """
+import asyncio
+import functools
+import inspect
 from typing import List, Dict, Any
+from sqlalchemy.orm import Session
 from fastmcp import FastMCP  # High-Level MCP-Server :contentReference[oaicite:18]{index=18}
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, current_session, run_with_reconnect
 from app.mcp import mcp_tools_repos, mcp_tools_docs
 
 
 # Instanz des MCP-Servers mit einem sprechenden Namen
 mcp = FastMCP("DokuPropmpt MCP Server")
 
+# Tool-Implementierungen einmal beim Import auflösen statt pro Aufruf
+_list_repos = mcp_tools_repos.list_repositories
+_get_repo = mcp_tools_repos.get_repository_by_id
+_list_docs = mcp_tools_docs.list_documents
+_get_doc = mcp_tools_docs.get_document
+_gen_docs = mcp_tools_docs.generate_documentation_for_repos
+
 
 # ------------- Hilfsfunktion für DB-Session -------------
 
 
-def with_db(fn):
+def with_db(fn=None, *, reconnect: bool = True):
     """
     Dekorator, der in MCP-Tools eine DB-Session erstellt und wieder schließt.
 
+    Das Tool läuft samt Session in einem Worker-Thread, damit die blockierenden
+    DB-Zugriffe den Event-Loop von FastMCP nicht anhalten und parallele
+    Tool-Aufrufe sich überlappen können.
+
+    Mit reconnect=True wird das Tool bei einer abgerissenen Verbindung einmal
+    wiederholt; nur für Tools, die gefahrlos wiederholbar sind (lesend).
+
     Usage:
         @with_db
         def my_tool(db: Session, ...):
             ...
+
+        @with_db(reconnect=False)
+        def my_writing_tool(db: Session, ...):
+            ...
     """
+    if fn is None:
+        return functools.partial(with_db, reconnect=reconnect)
+
+    def run_with_session(*args, **kwargs):
+        # Innerhalb eines Aufrufs, der schon eine Session hat, diese weiterverwenden
+        db = current_session.get()
+        if db is not None:
+            return fn(db, *args, **kwargs)
 
-    def wrapper(*args, **kwargs):
         db = SessionLocal()
+        token = current_session.set(db)
         try:
             return fn(db, *args, **kwargs)
         finally:
+            current_session.reset(token)
             db.close()
 
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if reconnect:
+            return await asyncio.to_thread(run_with_reconnect, run_with_session, *args, **kwargs)
+        return await asyncio.to_thread(run_with_session, *args, **kwargs)
+
+    # FastMCP baut das Tool-Schema aus Signatur und Annotationen,
+    # der db-Parameter gehört nicht dazu
+    signature = inspect.signature(fn)
+    wrapper.__signature__ = signature.replace(parameters=list(signature.parameters.values())[1:])
+    wrapper.__annotations__ = {name: hint for name, hint in fn.__annotations__.items() if name != "db"}
     return wrapper
 
 
 # ------------- MCP-Tools: Repositories -------------
 
 @mcp.tool()
-def list_repositories() -> List[Dict[str, Any]]:
+@with_db
+def list_repositories(db: Session) -> List[Dict[str, Any]]:
     """
     Liste alle Repositories im CodeDoc-System.
     """
-    db = SessionLocal()
-    try:
-        return mcp_tools_repos.list_repositories(db)
-    finally:
-        db.close()
+    return _list_repos(db)
 
 
 @mcp.tool()
-def get_repository(repo_id: int) -> Dict[str, Any]:
+@with_db
+def get_repository(db: Session, repo_id: int) -> Dict[str, Any]:
     """
     Hole Details zu einem einzelnen Repository.
 
@@ -72,48 +112,43 @@ def get_repository(repo_id: int) -> Dict[str, Any]:
     Rückgabe:
         Repository-Infos oder {"error": "..."}.
     """
-    db = SessionLocal()
-    try:
-        repo = mcp_tools_repos.get_repository_by_id(db, repo_id)
-        if not repo:
-            return {"error": f"Repository with id {repo_id} not found"}
-        return repo
-    finally:
-        db.close()
+    repo = _get_repo(db, repo_id)
+    if not repo:
+        return {"error": f"Repository with id {repo_id} not found"}
+    return repo
 
 
 # ------------- MCP-Tools: Dokumentationen -------------
 
 
 @mcp.tool()
-def list_documents() -> List[Dict[str, Any]]:
+@with_db
+def list_documents(db: Session, page: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
     """
-    Liste alle existierenden Dokumentationen.
+    Liste die existierenden Dokumentationen, alphabetisch nach Repository.
+
+    Args:
+        page: Seite, beginnend bei 0
+        limit: Einträge pro Seite (maximal 500)
     """
-    db = SessionLocal()
-    try:
-        return mcp_tools_docs.list_documents(db)
-    finally:
-        db.close()
+    return _list_docs(db, page, limit)
 
 
 @mcp.tool()
-def get_document(doc_id: int) -> Dict[str, Any]:
+@with_db
+def get_document(db: Session, doc_id: int) -> Dict[str, Any]:
     """
     Hole eine einzelne Dokumentation inklusive Markdown-Content.
     """
-    db = SessionLocal()
-    try:
-        doc = mcp_tools_docs.get_document(db, doc_id)
-        if not doc:
-            return {"error": f"Document with id {doc_id} not found or has no content"}
-        return doc
-    finally:
-        db.close()
+    doc = _get_doc(db, doc_id)
+    if not doc:
+        return {"error": f"Document with id {doc_id} not found or has no content"}
+    return doc
 
 
 @mcp.tool()
-def generate_documentation_for_repos(repo_ids: List[int]) -> Dict[str, Any]:
+@with_db(reconnect=False)  # klont, ruft das LLM auf und committet - nicht wiederholen
+def generate_documentation_for_repos(db: Session, repo_ids: List[int]) -> Dict[str, Any]:
     """
     Generiere Dokumentation für eine Liste von Repositories.
 
@@ -127,11 +162,7 @@ def generate_documentation_for_repos(repo_ids: List[int]) -> Dict[str, Any]:
         - errors: Fehlermeldungen
         - successful_count: Anzahl erfolgreicher Repos
     """
-    db = SessionLocal()
-    try:
-        return mcp_tools_docs.generate_documentation_for_repos(db, repo_ids)
-    finally:
-        db.close()
+    return _gen_docs(db, repo_ids)
 
 
 if __name__ == "__main__":
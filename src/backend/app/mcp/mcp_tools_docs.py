@@ -1,47 +1,85 @@
 # src/backend/app/mcp/mcp_tools_docs.py
 
 from __future__ import annotations
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.db.session import SessionLocal
 from app.db.models import Repo, Prompt, History, GeneralSettings  # :contentReference[oaicite:9]{index=9}
-from app.services.ai_service import generate_docu  # Doku-Generierung :contentReference[oaicite:10]{index=10}
+from app.services.ai_service import generate_docu, format_table_of_contents  # Doku-Generierung :contentReference[oaicite:10]{index=10}
 from datetime import datetime
 
+# Seitengröße von list_documents
+DEFAULT_DOCUMENTS_PER_PAGE = 100
+MAX_DOCUMENTS_PER_PAGE = 500
 
-def list_documents(db: Session) -> List[Dict[str, Any]]:
+# TOC pro (Dokument, Version). created_at wird bei jeder Neugenerierung gesetzt,
+# ein neuer Stand bekommt also automatisch einen neuen Eintrag
+TOC_CACHE_SIZE = 1024
+_toc_cache: "OrderedDict[tuple[int, str], str]" = OrderedDict()
+_toc_cache_lock = threading.Lock()
+
+
+def _cached_toc(doc_id: int, version: str, content: str) -> str:
+    key = (doc_id, version)
+    with _toc_cache_lock:
+        toc = _toc_cache.get(key)
+        if toc is not None:
+            _toc_cache.move_to_end(key)
+            return toc
+
+    toc = format_table_of_contents(content)
+    with _toc_cache_lock:
+        _toc_cache[key] = toc
+        if len(_toc_cache) > TOC_CACHE_SIZE:
+            _toc_cache.popitem(last=False)
+    return toc
+
+
+def list_documents(
+    db: Session, page: int = 0, limit: int = DEFAULT_DOCUMENTS_PER_PAGE
+) -> List[Dict[str, Any]]:
     """
-    Liste alle generierten Dokumentationen.
+    Liste die generierten Dokumentationen seitenweise.
 
     Orientiert sich eng an /docs/list, liefert aber einfache Dicts.
+    page beginnt bei 0, limit wird auf MAX_DOCUMENTS_PER_PAGE begrenzt.
     """
-    prompts = (
-        db.query(Prompt)
-        .filter(Prompt.docu.isnot(None), Prompt.repo_id.isnot(None))
-        .order_by(Prompt.created_at.desc())
+    limit = max(1, min(limit, MAX_DOCUMENTS_PER_PAGE))
+    page = max(0, page)
+
+    # Ein JOIN statt db.get(Repo) pro Prompt, sortiert wird in SQL
+    rows = (
+        db.query(Prompt.id, Prompt.repo_id, Prompt.created_at, Repo.repo_name)
+        .join(Repo, Repo.id == Prompt.repo_id)
+        .filter(Prompt.docu.isnot(None))
+        # Prompt.id als letzter Schlüssel hält die Seitengrenzen stabil
+        .order_by(func.lower(Repo.repo_name), Prompt.created_at.desc(), Prompt.id)
+        .limit(limit)
+        .offset(page * limit)
         .all()
     )
 
     result: List[Dict[str, Any]] = []
-
-    for prompt in prompts:
-        repo = db.query(Repo).filter(Repo.id == prompt.repo_id).first()
-        repo_name = repo.repo_name if repo else "Unknown"
-
+    for row in rows:
+        # created_at dient auch als updated_at, nur einmal formatieren
+        created_at = row.created_at.isoformat()
         result.append(
             {
-                "id": str(prompt.id),
-                "title": repo_name,
-                "repo_id": str(prompt.repo_id),
-                "repo_name": repo_name,
+                "id": str(row.id),
+                "title": row.repo_name,
+                "repo_id": str(row.repo_id),
+                "repo_name": row.repo_name,
                 "status": "ready",
-                "created_at": prompt.created_at.isoformat(),
-                "updated_at": prompt.created_at.isoformat(),
+                "created_at": created_at,
+                "updated_at": created_at,
             }
         )
 
-    # Alphabetisch nach repo_name sortieren
-    result.sort(key=lambda x: x["repo_name"].lower())
-
     return result
 
 
@@ -51,38 +89,57 @@ def get_document(db: Session, doc_id: int) -> Dict[str, Any] | None:
 
     Entspricht inhaltlich /docs/{doc_id} in deinen Routen. :contentReference[oaicite:11]{index=11}
     """
-    prompt = db.query(Prompt).filter(Prompt.id == doc_id).first()
-    if not prompt or not prompt.docu:
+    # Erst die Metadaten ohne den (großen) Markdown-Text, der 404-Fall
+    # überträgt so nie den Doku-Inhalt
+    prompt = (
+        db.query(
+            Prompt.id,
+            Prompt.repo_id,
+            Prompt.created_at,
+            Prompt.toc,
+            Repo.repo_name,
+            Repo.repo_url,
+        )
+        .outerjoin(Repo, Repo.id == Prompt.repo_id)
+        .filter(Prompt.id == doc_id, Prompt.docu.isnot(None))
+        .first()
+    )
+    if not prompt:
         return None
 
-    repo = db.query(Repo).filter(Repo.id == prompt.repo_id).first()
-
-    content = prompt.docu or "Documentation content not available."
+    content = db.query(Prompt.docu).filter(Prompt.id == doc_id).scalar()
+    if not content:
+        return None
 
-    # Einfache TOC-Erzeugung aus Markdown-Überschriften
-    import re
+    created_at = prompt.created_at.isoformat()
 
-    headings = re.findall(r"^(#{1,6})\s+(.+)$", content, re.MULTILINE)
-    toc_lines = []
-    for level, title in headings:
-        indent = "  " * (len(level) - 1)
-        toc_lines.append(f"{indent}- {title.strip()}")
-    toc = "\n".join(toc_lines) if toc_lines else "No headings found"
+    # Gespeicherte TOC verwenden, ältere Dokus ohne TOC-Spalte über den Cache
+    toc = prompt.toc if prompt.toc is not None else _cached_toc(prompt.id, created_at, content)
+    toc = toc or "No headings found"
 
     return {
         "id": str(prompt.id),
-        "title": repo.repo_name if repo else "Unknown",
+        "title": prompt.repo_name or "Unknown",
         "repo_id": str(prompt.repo_id),
-        "repo_name": repo.repo_name if repo else "Unknown",
-        "repo_url": repo.repo_url if repo else "",
+        "repo_name": prompt.repo_name or "Unknown",
+        "repo_url": prompt.repo_url or "",
         "status": "ready",
-        "created_at": prompt.created_at.isoformat(),
-        "updated_at": prompt.created_at.isoformat(),
+        "created_at": created_at,
+        "updated_at": created_at,
         "content": content,
         "table_of_contents": toc,
     }
 
 
+def _generate_with_own_session(repo_id: int, repo_name: str) -> Dict[str, Any]:
+    # Sessions sind nicht thread-safe, jeder Worker-Thread bekommt eine eigene
+    db = SessionLocal()
+    try:
+        return generate_docu(db, repo_id, repo_name)
+    finally:
+        db.close()
+
+
 def generate_documentation_for_repos(
     db: Session, repo_ids: List[int]
 ) -> Dict[str, Any]:
@@ -97,14 +154,25 @@ def generate_documentation_for_repos(
     errors: List[str] = []
     successful_count = 0
 
+    # Alle Repo-Namen mit einer IN-Abfrage statt einer Abfrage pro ID
+    repo_names = dict(
+        db.query(Repo.id, Repo.repo_name).filter(Repo.id.in_(repo_ids)).all()
+    ) if repo_ids else {}
+
+    found = []
     for repo_id in repo_ids:
         # passendes Repo suchen
-        repo = db.query(Repo).filter(Repo.id == repo_id).first()
-        if not repo:
+        if repo_id not in repo_names:
             errors.append(f"Repository {repo_id} not found")
             continue
+        found.append((repo_id, repo_names[repo_id]))
+
+    # Git-Clone und LLM-Aufruf warten fast nur auf I/O, daher parallel.
+    # map() liefert die Ergebnisse in der Reihenfolge der repo_ids
+    with ThreadPoolExecutor(max_workers=get_settings().AI_CONCURRENCY) as executor:
+        outcomes = list(executor.map(lambda item: _generate_with_own_session(*item), found))
 
-        result = generate_docu(db, repo_id, repo.repo_name)
+    for (repo_id, repo_name), result in zip(found, outcomes):
         results.append(result)
 
         if result.get("status") == "documented":
@@ -113,7 +181,7 @@ def generate_documentation_for_repos(
             errors.append(
                 result.get(
                     "message",
-                    f"Failed to generate documentation for repository {repo.repo_name}",
+                    f"Failed to generate documentation for repository {repo_name}",
                 )
             )
 
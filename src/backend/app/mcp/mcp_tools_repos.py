@@ -4,10 +4,37 @@ from __future__ import annotations
 
 from typing import List, Dict, Any
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.db.models import Repo, Prompt  # Repo- und Prompt-Tabellen :contentReference[oaicite:6]{index=6}
 
+# Spalten, aus denen das Repo-Dict gebaut wird (Tupel-Abfragen statt ORM-Objekten)
+_REPO_COLUMNS = (Repo.id, Repo.repo_name, Repo.description, Repo.repo_url, Repo.date_of_version)
+
+# specific_prompt des ersten Prompts eines Repos, korreliert zur äußeren Repo-Abfrage
+_FIRST_SPECIFIC_PROMPT = (
+    select(Prompt.specific_prompt)
+    .where(Prompt.repo_id == Repo.id)
+    .order_by(Prompt.id)
+    .limit(1)
+    .correlate(Repo)
+    .scalar_subquery()
+)
+
+
+def _repo_to_dict(row, specific_prompt: str | None) -> Dict[str, Any]:
+    """MCP-Dict eines Repos aus einer Zeile mit den _REPO_COLUMNS."""
+    repo_id, name, description, repo_url, date_of_version = row[:5]
+    return {
+        "id": repo_id,
+        "name": name,
+        "description": description,
+        "repo_url": repo_url,
+        "date_of_version": date_of_version.isoformat() if date_of_version else None,
+        "specific_prompt": specific_prompt or None,
+    }
+
 
 def list_repositories(db: Session) -> List[Dict[str, Any]]:
     """
@@ -16,31 +43,11 @@ def list_repositories(db: Session) -> List[Dict[str, Any]]:
     Diese Funktion orientiert sich an der FastAPI-Route /repos/list,
     gibt aber ein „MCP-freundliches“ Dict-Format zurück.
     """
-    repos = db.query(Repo).all()
-
-    result: List[Dict[str, Any]] = []
-
-    for repo in repos:
-        # Spezifischen Prompt zu diesem Repo (falls vorhanden) ermitteln
-        prompt = db.query(Prompt).filter(Prompt.repo_id == repo.id).first()
-        specific_prompt = (
-            prompt.specific_prompt if prompt and prompt.specific_prompt else None
-        )
+    # Spezifischer Prompt des ersten Prompts je Repo als korrelierte Unterabfrage
+    # im selben SELECT (wie /repos/list), liest nur die Spalte specific_prompt
+    rows = db.query(*_REPO_COLUMNS, _FIRST_SPECIFIC_PROMPT.label("specific_prompt")).all()
 
-        repo_dict = {
-            "id": repo.id,
-            "name": repo.repo_name,
-            "description": repo.description,
-            "repo_url": repo.repo_url,
-            "date_of_version": (
-                repo.date_of_version.isoformat() if repo.date_of_version else None
-            ),
-            "specific_prompt": specific_prompt,
-        }
-
-        result.append(repo_dict)
-
-    return result
+    return [_repo_to_dict(row, row.specific_prompt) for row in rows]
 
 
 def get_repository_by_id(db: Session, repo_id: int) -> Dict[str, Any] | None:
@@ -49,22 +56,13 @@ def get_repository_by_id(db: Session, repo_id: int) -> Dict[str, Any] | None:
 
     Gibt ein Dictionary zurück oder None, wenn das Repo nicht existiert.
     """
-    repo = db.query(Repo).filter(Repo.id == repo_id).first()
+    # Nur die benötigten Spalten, keine ORM-Objekte, Prompt im selben SELECT
+    repo = (
+        db.query(*_REPO_COLUMNS, _FIRST_SPECIFIC_PROMPT.label("specific_prompt"))
+        .filter(Repo.id == repo_id)
+        .first()
+    )
     if not repo:
         return None
 
-    prompt = db.query(Prompt).filter(Prompt.repo_id == repo.id).first()
-    specific_prompt = (
-        prompt.specific_prompt if prompt and prompt.specific_prompt else None
-    )
-
-    return {
-        "id": repo.id,
-        "name": repo.repo_name,
-        "description": repo.description,
-        "repo_url": repo.repo_url,
-        "date_of_version": repo.date_of_version.isoformat()
-        if repo.date_of_version
-        else None,
-        "specific_prompt": specific_prompt,
-    }
+    return _repo_to_dict(repo, repo.specific_prompt)
@@ -6,15 +6,14 @@ import tempfile
 import subprocess
 import shutil
 
+import httpx
 from langchain_openai import ChatOpenAI
-from dotenv import load_dotenv
 from sqlalchemy.orm import Session
+from app.core import config  # noqa: F401  (lädt .env, falls die Umgebung leer ist)
 from app.db.models import Prompt, Repo
 from datetime import datetime
 from pathlib import Path
 
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
 DOCS_STORAGE_DIR = os.getenv("DOCS_STORAGE_DIR", "/app/docs_storage")
@@ -28,20 +27,37 @@ TRUNCATE_LINES_TAIL = 25  # Lines to include from file end when truncating
 # Directory filtering
 SKIP_DIRECTORIES = ['.git', 'node_modules', '__pycache__', 'venv', '.venv', 'dist', 'build', 'target', 'bin', 'obj']
 
+# Shared HTTP client for all LLM requests of this process, so TCP/TLS connections
+# are reused across prompts instead of being set up again by every ChatOpenAI instance
+_llm_http_client = httpx.Client(
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+    timeout=httpx.Timeout(300.0, connect=5.0),  # 5 minutes timeout for LLM requests
+)
+
+
+# Markdown headings (# to ######) used for the table of contents. [ \t] instead of \s so
+# a line break is never a separator; the title starts with \S, so separator and title
+# cannot overlap and every line is matched in one pass without backtracking
+_TOC_RE = re.compile(r"^(#{1,6})[ \t]+(\S.*)$", re.MULTILINE)
+
+
+def format_table_of_contents(content: str) -> str:
+    """Render markdown headings as an indented bullet list (empty string if there are none)."""
+    return "\n".join(
+        f"{'  ' * (len(m.group(1)) - 1)}- {m.group(2).strip()}"
+        for m in _TOC_RE.finditer(content)
+    )
+
 
 def generate_table_of_contents(content: str) -> dict:
     """Generate a table of contents from markdown headings as a structured JSON object."""
-    headings = re.findall(r'^(#{1,6})\s+(.+)$', content, re.MULTILINE)
-    if not headings:
+    toc_entries = [
+        {"level": len(m.group(1)), "title": m.group(2).strip()}
+        for m in _TOC_RE.finditer(content)
+    ]
+    if not toc_entries:
         return {"headings": [], "message": "No headings found"}
 
-    toc_entries = []
-    for level, title in headings:
-        toc_entries.append({
-            "level": len(level),
-            "title": title.strip()
-        })
-
     return {"headings": toc_entries}
 
 
@@ -349,7 +365,7 @@ def generate_docu(
 
     try:
         # Check if repository exists
-        repo = db.query(Repo).filter(Repo.id == repo_id).first()
+        repo = db.get(Repo, repo_id)
         if not repo:
             error_msg = f"Repository not found: {repo_id}"
             logger.error(error_msg)
@@ -464,6 +480,7 @@ def generate_docu(
             if existing_prompt:
                 # Update existing prompt - update documentation
                 existing_prompt.docu = docu_content
+                existing_prompt.toc = format_table_of_contents(docu_content)
                 existing_prompt.created_at = datetime.now()
                 prompt_id = existing_prompt.id
                 logger.info(f"Updating documentation for existing prompt: {prompt_id} for repository: {repo_name}")
@@ -473,9 +490,9 @@ def generate_docu(
                 new_prompt = Prompt(
                     generic_prompt=current_generic_prompt,
                     specific_prompt=None,
-                    created_at=datetime.now(),
                     repo_id=repo_id,
-                    docu=docu_content
+                    docu=docu_content,
+                    toc=format_table_of_contents(docu_content)
                 )
                 db.add(new_prompt)
                 db.flush()
@@ -628,7 +645,8 @@ def get_model(model_name: str):
             base_url="https://llm.srvext.ncoindev.net/v1",
             temperature=0,  # Set temperature to 0 for deterministic output
             request_timeout=300,  # 5 minutes timeout for LLM requests
-            max_retries=2  # Retry up to 2 times on failure
+            max_retries=2,  # Retry up to 2 times on failure
+            http_client=_llm_http_client
         )
     else:
         raise ValueError(f"Unbekanntes Modell: {model_name}")
@@ -11,6 +11,10 @@ celery_app = Celery(
 celery_app.conf.update(
     task_track_started=True,
     result_expires=3600,
+    # Documentation generation runs for minutes per task: acknowledge only after
+    # completion and don't let a busy worker prefetch tasks a sibling could take
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
     # Beat schedule for periodic repository checking
     # The task runs every minute and checks if it should actually perform the check
     # based on the dynamic update interval configured in the database (1 min - 7 days)
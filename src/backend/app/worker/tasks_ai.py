@@ -1,6 +1,26 @@
+from typing import List
+import logging
+
 from app.worker.celery_app import celery_app
 from app.services.ai_service import generate_docu
 from app.db.session import SessionLocal
+from app.core.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Lifetime of the /ai/generate deduplication key, matches Celery's result_expires
+GENERATE_DEDUP_TTL = 3600  # seconds
+
+
+def release_generation(dedup_key: str | None):
+    """Deletes the /ai/generate deduplication key so the same repositories can be generated again."""
+    if not dedup_key:
+        return
+    try:
+        with get_redis() as r:
+            r.delete(dedup_key)
+    except Exception as e:
+        logger.warning(f"Could not release deduplication key {dedup_key}: {e}")
 
 
 @celery_app.task(bind=True)
@@ -23,3 +43,84 @@ def task_generate_docu(self, repo_id: int, repo_name: str):
         return result
     finally:
         db.close()
+
+
+@celery_app.task
+def generate_one(repo_id: int, repo_name: str):
+    """
+    Celery task to generate documentation for a single repository.
+    Runs as one member of the chord queued by POST /ai/generate.
+
+    Args:
+        repo_id: Integer ID of the repository
+        repo_name: Name of the repository
+
+    Returns:
+        Dictionary with status, message, repo_id and the generate_docu result
+        (None if generation was never attempted)
+    """
+    db = SessionLocal()
+    try:
+        # Generate documentation
+        result = generate_docu(db, repo_id, repo_name)
+
+        # Check if generation was successful
+        if result.get("status") == "documented":
+            logger.info(f"Successfully generated documentation for repository {repo_name} (ID: {repo_id})")
+            message = f"Documentation generated for repository {repo_name}"
+        else:
+            message = result.get("message", f"Failed to generate documentation for repository {repo_name}")
+            logger.error(f"Documentation generation failed for repository {repo_name} (ID: {repo_id}): {message}")
+        return {"status": result.get("status"), "message": message, "repo_id": repo_id, "result": result}
+
+    except Exception as e:
+        # Log detailed error internally
+        logger.error(f"Error processing repository {repo_id}: {str(e)}", exc_info=True)
+        # Return generic error message to user without sensitive details
+        return {"status": "error", "message": f"Error processing repository {repo_id}", "repo_id": repo_id, "result": None}
+    finally:
+        db.close()
+
+
+@celery_app.task
+def aggregate(outcomes: List[dict], total: int, missing_repo_ids: List[int] | None = None,
+              dedup_key: str | None = None):
+    """
+    Chord callback that combines the generate_one outcomes into the
+    status/results/errors envelope returned by GET /ai/generate/{task_id}.
+
+    Args:
+        outcomes: Return values of the generate_one tasks
+        total: Number of requested repositories
+        missing_repo_ids: Requested IDs that don't exist (no task was queued for them)
+        dedup_key: Redis deduplication key of the request, released once the batch is done
+
+    Returns:
+        Dictionary with overall status, per-repository results and errors
+    """
+    release_generation(dedup_key)
+
+    for repo_id in missing_repo_ids or []:
+        error_msg = f"Repository {repo_id} not found"
+        logger.error(error_msg)
+        outcomes.append({"status": "error", "message": error_msg, "repo_id": repo_id, "result": None})
+
+    results = [o["result"] for o in outcomes if o.get("result") is not None]
+    errors = [o["message"] for o in outcomes if o.get("status") != "documented"]
+    successful_count = len(outcomes) - len(errors)
+
+    # Determine overall status based on success count
+    if successful_count == 0:
+        status, message = "error", f"Failed to generate documentation for all {total} repositories."
+    elif successful_count < total:
+        status, message = "partial_success", f"Documentation generated for {successful_count}/{total} repositories."
+    else:
+        status, message = "ok", f"Documentation generated successfully for {successful_count} repositories."
+
+    return {
+        "status": status,
+        "message": message,
+        "results": results,
+        "errors": errors,
+        "successful_count": successful_count
+    }
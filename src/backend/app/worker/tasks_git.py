@@ -3,7 +3,6 @@ from app.services.git_service import validate_repo_url, normalize_repo_url, is_s
 from app.db.session import SessionLocal
 from app.db.models import Repo
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -72,7 +71,6 @@ def task_save_repo(self, repo_url: str, branch: str | None = None, depth: int |
                 repo_name=repo_name,
                 repo_url=repo_url,
                 description=None,
-                date_of_version=datetime.now(),
                 auth_type=auth_type,
             )
 
@@ -7,7 +7,7 @@ from app.worker.celery_app import celery_app
 from app.db.session import SessionLocal
 from app.db.models import Repo, GeneralSettings
 from app.services.ai_service import generate_docu
-from app.core.config import settings
+from app.core.redis_pool import redis_pool
 import logging
 import git
 from datetime import datetime, timedelta
@@ -15,8 +15,8 @@ import redis
 
 logger = logging.getLogger(__name__)
 
-# Redis client for caching commit hashes and last check time
-redis_client = redis.from_url(settings.CELERY_BROKER_URL, decode_responses=True)
+# Redis client for caching commit hashes and last check time (shared connection pool)
+redis_client = redis.Redis(connection_pool=redis_pool)
 
 # Redis key for storing last check timestamp
 LAST_CHECK_KEY = "repo_check:last_run_timestamp"
@@ -9,7 +9,9 @@ import sys
 from pathlib import Path
 
 import pytest
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from sqlalchemy.dialects.postgresql import CITEXT, JSONB
@@ -60,6 +62,14 @@ engine = create_engine(
     future=True,
 )
 
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # SQLite prüft Foreign Keys nur mit diesem Pragma, sonst greift ON DELETE CASCADE nicht
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 TestingSessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -97,6 +107,9 @@ def db_session():
         with engine.begin() as conn:
             for table in reversed(Base.metadata.sorted_tables):
                 conn.execute(table.delete())
+        # Gecachten Generic Prompt verwerfen, er gehört zu den gelöschten Daten
+        from app.api.routes_prompts import invalidate_generic_prompt_cache
+        invalidate_generic_prompt_cache()
 
 
 @pytest.fixture(scope="function")
@@ -122,3 +135,79 @@ def client(db_session):
         yield test_client
 
     app.dependency_overrides.clear()
+
+
+# ---------------------------------------------------------------------------
+# Redis-Attrappe für Dedup-Keys (routes_ai) und Mock-Sessions (mock_auth)
+# ---------------------------------------------------------------------------
+class FakePipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.commands = []
+
+    def hset(self, key, mapping):
+        self.commands.append(lambda: self.redis_client.hset(key, mapping=mapping))
+
+    def expire(self, key, ttl):
+        self.commands.append(lambda: self.redis_client.expire(key, ttl))
+
+    def execute(self):
+        return [command() for command in self.commands]
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the Redis commands the app uses"""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def delete(self, key):
+        return 1 if self.store.pop(key, None) is not None else 0
+
+    def unlink(self, key):
+        return self.delete(key)
+
+    def hset(self, key, mapping):
+        self.store.setdefault(key, {}).update(mapping)
+
+    def hgetall(self, key):
+        return dict(self.store.get(key, {}))
+
+    def expire(self, key, ttl):
+        self.ttls[key] = ttl
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def eval(self, script, numkeys, key, value, ttl):
+        # Einziges Skript der App: Compare-and-set "pending" -> task_id (routes_ai)
+        if self.store.get(key) == "pending":
+            return self.set(key, value, ex=ttl)
+        return None
+
+
+@pytest.fixture
+def fake_redis():
+    """Leitet alle get_redis()-Aufrufe der App auf eine FakeRedis-Instanz um."""
+    redis_client = FakeRedis()
+
+    @contextmanager
+    def get_redis():
+        yield redis_client
+
+    with patch("app.api.routes_ai.get_redis", get_redis), \
+            patch("app.worker.tasks_ai.get_redis", get_redis), \
+            patch("app.auth.mock_auth.get_redis", get_redis), \
+            patch("app.auth.mock_auth.redis_pool", MagicMock()):
+        yield redis_client
@@ -2,7 +2,6 @@
 Tests for authentication dependencies module
 """
 import pytest
-import os
 from unittest.mock import patch, MagicMock
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
@@ -55,7 +54,7 @@ class TestCurrentUser:
 class TestVerifyTokenMock:
     """Tests for verify_token with mock authentication"""
     
-    @patch.dict(os.environ, {"USE_MOCK_AUTH": "true"})
+    @patch("app.auth.deps.settings.USE_MOCK_AUTH", True)
     def test_verify_token_missing_credentials(self):
         """Test verify_token with missing credentials"""
         with pytest.raises(HTTPException) as exc_info:
@@ -64,7 +63,7 @@ class TestVerifyTokenMock:
         assert exc_info.value.status_code == 401
         assert "Missing bearer token" in exc_info.value.detail
     
-    @patch.dict(os.environ, {"USE_MOCK_AUTH": "true"})
+    @patch("app.auth.deps.settings.USE_MOCK_AUTH", True)
     def test_verify_token_wrong_scheme(self):
         """Test verify_token with wrong scheme"""
         creds = HTTPAuthorizationCredentials(
@@ -78,7 +77,7 @@ class TestVerifyTokenMock:
         assert exc_info.value.status_code == 401
         assert "Missing bearer token" in exc_info.value.detail
     
-    @patch.dict(os.environ, {"USE_MOCK_AUTH": "true"})
+    @patch("app.auth.deps.settings.USE_MOCK_AUTH", True)
     @patch("app.auth.deps.get_session")
     def test_verify_token_mock_valid_session(self, mock_get_session):
         """Test verify_token with valid mock session"""
@@ -102,7 +101,7 @@ class TestVerifyTokenMock:
         assert user.email == "admin@test.com"
         assert user.roles == ["admin"]
     
-    @patch.dict(os.environ, {"USE_MOCK_AUTH": "true"})
+    @patch("app.auth.deps.settings.USE_MOCK_AUTH", True)
     @patch("app.auth.deps.get_session")
     def test_verify_token_mock_invalid_session(self, mock_get_session):
         """Test verify_token with invalid mock session"""
@@ -120,6 +119,179 @@ class TestVerifyTokenMock:
         assert "Invalid or expired session" in exc_info.value.detail
 
 
+class TestVerifyTokenCache:
+    """Tests for the verified token cache"""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        from app.auth import deps
+        deps._token_cache.clear()
+        yield
+        deps._token_cache.clear()
+
+    @staticmethod
+    def _claims(exp):
+        from app.core.azure_config import AZ_CLIENT_ID, AZ_ISSUER
+
+        data = {"iss": AZ_ISSUER, "aud": AZ_CLIENT_ID, "sub": "user-1", "name": "User", "roles": ["Team.Admin"], "exp": exp}
+        claims = MagicMock()
+        claims.get.side_effect = lambda key, default=None: data.get(key, default)
+        claims.__getitem__.side_effect = data.__getitem__
+        return claims
+
+    @patch("app.auth.deps._fetch_jwks", return_value={"keys": []})
+    @patch("app.auth.deps.jwt")
+    def test_verified_token_is_cached(self, mock_jwt, mock_fetch):
+        """Test that a verified token is not decoded again"""
+        import time
+
+        mock_jwt.decode.return_value = self._claims(time.time() + 3600)
+        creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials="header.payload.signature")
+
+        first = verify_token(creds)
+        second = verify_token(creds)
+
+        assert second is first
+        assert first.roles == ["Team.Admin"]
+        assert mock_jwt.decode.call_count == 1
+
+    @patch("app.auth.deps._fetch_jwks", return_value={"keys": []})
+    @patch("app.auth.deps.jwt")
+    def test_cache_entry_ends_at_token_expiry(self, mock_jwt, mock_fetch):
+        """Test that a cached token is verified again once it has expired"""
+        import time
+
+        mock_jwt.decode.return_value = self._claims(time.time() - 1)
+        creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials="header.payload.signature")
+
+        verify_token(creds)
+        verify_token(creds)
+
+        assert mock_jwt.decode.call_count == 2
+
+
+class TestFetchJwks:
+    """Tests for the JWKS cache"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self):
+        from app.auth import deps
+        deps._jwks_cache.update(jwks=None, keys_by_kid={}, etag=None, fetched_at=0.0)
+        yield
+        deps._jwks_cache.update(jwks=None, keys_by_kid={}, etag=None, fetched_at=0.0)
+
+    @staticmethod
+    def _response(status_code=200, keys=None, etag='"v1"'):
+        resp = MagicMock(status_code=status_code, headers={"ETag": etag})
+        resp.json.return_value = {"keys": keys or []}
+        return resp
+
+    @patch("app.auth.deps._jwks_http")
+    def test_fetch_jwks_is_cached(self, mock_http):
+        """Test that the keys are fetched once within the TTL"""
+        from app.auth.deps import _fetch_jwks
+
+        mock_http.get.return_value = self._response(keys=[{"kid": "a"}])
+
+        assert _fetch_jwks() == {"keys": [{"kid": "a"}]}
+        assert _fetch_jwks() == {"keys": [{"kid": "a"}]}
+        assert mock_http.get.call_count == 1
+
+    @patch("app.auth.deps._jwks_http")
+    def test_fetch_jwks_revalidates_with_etag(self, mock_http):
+        """Test that a stale cache is revalidated and a 304 keeps the keys"""
+        from app.auth import deps
+
+        mock_http.get.return_value = self._response(keys=[{"kid": "a"}])
+        deps._fetch_jwks()
+        deps._jwks_cache["fetched_at"] -= deps.JWKS_TTL + 1
+
+        mock_http.get.return_value = self._response(status_code=304)
+        assert deps._fetch_jwks() == {"keys": [{"kid": "a"}]}
+        assert mock_http.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+    @patch("app.auth.deps._jwks_http")
+    def test_forced_refresh_is_rate_limited(self, mock_http):
+        """Test that an unknown kid refreshes the keys at most once per JWKS_MIN_REFRESH"""
+        from app.auth import deps
+
+        mock_http.get.return_value = self._response(keys=[{"kid": "a"}])
+        deps._fetch_jwks()
+        deps._fetch_jwks(force=True)
+        assert mock_http.get.call_count == 1
+
+        deps._jwks_cache["fetched_at"] -= deps.JWKS_MIN_REFRESH + 1
+        mock_http.get.return_value = self._response(keys=[{"kid": "b"}], etag='"v2"')
+        assert deps._fetch_jwks(force=True) == {"keys": [{"kid": "b"}]}
+        assert mock_http.get.call_count == 2
+
+    @patch("app.auth.deps._jwks_http")
+    def test_fetch_jwks_indexes_keys_by_kid(self, mock_http):
+        """Test that usable keys are imported once and indexed by kid"""
+        from authlib.jose import RSAKey
+        from app.auth import deps
+
+        jwk = RSAKey.generate_key(2048, is_private=True).as_dict(is_private=False, kid="key-1")
+        mock_http.get.return_value = self._response(keys=[jwk, {"kid": "no-kty"}])
+
+        deps._fetch_jwks()
+
+        assert list(deps._jwks_cache["keys_by_kid"]) == ["key-1"]
+        assert isinstance(deps._jwks_cache["keys_by_kid"]["key-1"], RSAKey)
+
+    @patch("app.auth.deps.jwt")
+    @patch("app.auth.deps._fetch_jwks")
+    def test_verify_token_uses_indexed_key(self, mock_fetch, mock_jwt):
+        """Test that the token is decoded with the key matching its kid"""
+        import base64
+        import json
+        from app.auth import deps
+
+        signing_key = MagicMock()
+        deps._jwks_cache["keys_by_kid"] = {"key-1": signing_key}
+        mock_jwt.decode.side_effect = Exception("stop")
+        header = base64.urlsafe_b64encode(json.dumps({"alg": "RS256", "kid": "key-1"}).encode()).rstrip(b"=")
+        creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=header.decode() + ".payload.signature")
+
+        with pytest.raises(HTTPException):
+            verify_token(creds)
+
+        assert mock_jwt.decode.call_args.args[1] is signing_key
+        mock_fetch.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_background_refresh_keeps_running_after_errors(self):
+        """Test that the periodic refresher forces a fetch and survives failures"""
+        import asyncio
+        from app.auth import deps
+
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                raise asyncio.CancelledError
+
+        with patch("app.auth.deps._fetch_jwks", side_effect=[Exception("offline"), {"keys": []}]) as mock_fetch, \
+                patch("app.auth.deps.asyncio.sleep", fake_sleep):
+            with pytest.raises(asyncio.CancelledError):
+                await deps.refresh_jwks_periodically()
+
+        assert mock_fetch.call_count == 2
+        mock_fetch.assert_called_with(True)
+        assert sleeps == [deps.JWKS_REFRESH_INTERVAL] * 2
+
+    def test_token_kid(self):
+        """Test reading the key id from the token header"""
+        import base64
+        import json
+        from app.auth.deps import _token_kid
+
+        header = base64.urlsafe_b64encode(json.dumps({"alg": "RS256", "kid": "key-1"}).encode()).rstrip(b"=")
+        assert _token_kid(header.decode() + ".payload.signature") == "key-1"
+        assert _token_kid("not-a-jwt") is None
+
+
 class TestRequireRole:
     """Tests for require_role decorator"""
     
@@ -3,6 +3,7 @@ Tests for mock authentication module
 """
 import pytest
 from datetime import datetime, timedelta
+from unittest.mock import patch
 from app.auth.mock_auth import (
     authenticate_user,
     create_session,
@@ -11,10 +12,18 @@ from app.auth.mock_auth import (
     get_all_mock_users,
     cleanup_expired_sessions,
     _sessions,
-    MOCK_USERS
+    MOCK_USERS,
+    SESSION_KEY_PREFIX
 )
 
 
+@pytest.fixture(autouse=True)
+def in_memory_sessions():
+    """Keep the session tests independent of a configured Redis"""
+    with patch("app.auth.mock_auth.redis_pool", None):
+        yield
+
+
 def test_authenticate_user_valid_credentials():
     """Test authentication with valid credentials"""
     user = authenticate_user("admin@caffeinecode.com", "admin123")
@@ -46,6 +55,14 @@ def test_authenticate_user_all_mock_users():
         assert user["role"] == mock_user["role"]
 
 
+def test_authenticate_user_returns_copy():
+    """Test that callers can't modify the mock user table through the result"""
+    user = authenticate_user("admin@caffeinecode.com", "admin123")
+    user["role"] = "changed"
+
+    assert authenticate_user("admin@caffeinecode.com", "admin123")["role"] == "admin"
+
+
 def test_create_session():
     """Test session creation"""
     _sessions.clear()
@@ -207,3 +224,42 @@ def test_cleanup_expired_sessions_no_expired():
     
     assert cleaned_count == 0
     assert len(_sessions) == 2
+
+
+def test_redis_session_roundtrip(fake_redis):
+    """Test that sessions are stored in an expiring Redis hash when Redis is configured"""
+    _sessions.clear()
+    user_data = {"email": "test@example.com", "role": "admin"}
+
+    token = create_session(user_data)
+
+    key = SESSION_KEY_PREFIX + token
+    assert fake_redis.store[key] == user_data
+    assert fake_redis.ttls[key] == timedelta(hours=8)
+    assert token not in _sessions
+    assert get_session(token) == user_data
+
+
+def test_redis_session_delete(fake_redis):
+    """Test logout against the Redis session store"""
+    token = create_session({"email": "test@example.com", "role": "admin"})
+
+    assert delete_session(token) is True
+    assert get_session(token) is None
+    assert delete_session(token) is False
+
+
+def test_redis_session_without_password(fake_redis):
+    """Test that the password of an authenticated user is not stored in Redis"""
+    user = authenticate_user("admin@caffeinecode.com", "admin123")
+
+    token = create_session(user)
+
+    stored = fake_redis.store[SESSION_KEY_PREFIX + token]
+    assert "password" not in stored
+    assert stored == {
+        "email": "admin@caffeinecode.com",
+        "display_name": "Romy Becker",
+        "entra_object_id": "mock-admin-001",
+        "role": "admin",
+    }
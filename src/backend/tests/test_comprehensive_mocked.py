@@ -1,6 +1,7 @@
 """
 Additional mocked tests for AI service to reach 80% coverage
 """
+import os
 import pytest
 from unittest.mock import patch, MagicMock
 from app.db.models import Repo, Prompt
@@ -118,6 +119,18 @@ class TestSendPromptWithRetry:
         
         assert result == "Generated response"
 
+    @patch('app.services.ai_service.ChatOpenAI')
+    def test_get_model_reuses_shared_http_client(self, mock_llm_class):
+        """Test that every model instance shares the module-level HTTP client"""
+        from app.services.ai_service import get_model, _llm_http_client
+
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test-key"}):
+            get_model("eu.anthropic.test-model")
+            get_model("eu.anthropic.test-model")
+
+        clients = [call.kwargs["http_client"] for call in mock_llm_class.call_args_list]
+        assert clients == [_llm_http_client, _llm_http_client]
+
 
 class TestValidateRepoUrlComprehensive:
     """Comprehensive tests for validate_repo_url"""
@@ -0,0 +1,39 @@
+"""
+Tests for the queue based logging setup
+"""
+import logging
+from logging.handlers import QueueHandler
+from app.core.logging_config import start_queue_logging, stop_queue_logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_queue_logging_forwards_records_to_root():
+    """Test that app records reach the root handlers through the queue"""
+    root = logging.getLogger()
+    app_logger = logging.getLogger("app")
+    handler = ListHandler()
+    root.addHandler(handler)
+    try:
+        start_queue_logging()
+        start_queue_logging()  # second call is a no-op
+
+        assert sum(isinstance(h, QueueHandler) for h in app_logger.handlers) == 1
+        assert app_logger.propagate is False
+
+        logging.getLogger("app.api.routes_ai").error("queued message")
+        stop_queue_logging()
+
+        assert [r.getMessage() for r in handler.records] == ["queued message"]
+        assert not any(isinstance(h, QueueHandler) for h in app_logger.handlers)
+        assert app_logger.propagate is True
+    finally:
+        stop_queue_logging()
+        root.removeHandler(handler)
@@ -0,0 +1,34 @@
+"""
+Tests for the shared Redis connection pool
+"""
+import pytest
+import redis
+from unittest.mock import patch, MagicMock
+from app.core import redis_pool
+
+
+def test_get_redis_uses_shared_pool():
+    """Test that clients borrow connections from the module-level pool"""
+    pool = MagicMock()
+
+    with patch.object(redis_pool, "redis_pool", pool):
+        with redis_pool.get_redis() as r1, redis_pool.get_redis() as r2:
+            assert r1.connection_pool is pool
+            assert r2.connection_pool is pool
+
+
+def test_get_redis_not_configured():
+    """Test that a missing CELERY_BROKER_URL is reported"""
+    with patch.object(redis_pool, "redis_pool", None):
+        with pytest.raises(RuntimeError, match="CELERY_BROKER_URL"):
+            with redis_pool.get_redis():
+                pass
+
+
+def test_create_pool_blocks_when_exhausted():
+    """Test that the pool waits for a free connection instead of failing"""
+    pool = redis_pool.create_pool("redis://localhost:6379/0")
+
+    assert isinstance(pool, redis.BlockingConnectionPool)
+    assert pool.max_connections == redis_pool.REDIS_MAX_CONNECTIONS
+    assert pool.timeout == redis_pool.REDIS_TIMEOUT
@@ -20,12 +20,16 @@ def test_init_extensions_not_in_test_mode():
     with patch.dict(os.environ, {"TESTING": ""}, clear=True):
         with patch('app.db.init_db.engine') as mock_engine:
             mock_conn = Mock()
-            mock_engine.connect.return_value.__enter__.return_value = mock_conn
+            mock_engine.begin.return_value.__enter__.return_value = mock_conn
 
             init_extensions()
 
-            # Verify extensions were created
-            assert mock_conn.execute.call_count == 3
+            # Verify all extensions were created in one round-trip
+            assert mock_conn.execute.call_count == 1
+            script = str(mock_conn.execute.call_args.args[0])
+            for extension in ("pgcrypto", "citext", "vector"):
+                assert f"CREATE EXTENSION IF NOT EXISTS {extension}" in script
+            assert script.count("EXCEPTION WHEN others") == 3
 
 
 def test_init_schema():
@@ -41,7 +45,9 @@ def test_init_db():
     with patch('app.db.init_db.init_extensions') as mock_extensions:
         with patch('app.db.init_db.init_schema') as mock_schema:
             with patch('app.db.init_db.run_migrations') as mock_migrations:
-                with patch('app.db.init_db.SessionLocal') as mock_session_local:
+                with patch('app.db.init_db.SessionLocal') as mock_session_local, \
+                     patch('app.db.init_db.schema_is_current', return_value=False), \
+                     patch('app.db.init_db.mark_schema_current') as mock_mark:
                     mock_session = Mock()
                     mock_session_local.return_value.__enter__.return_value = mock_session
 
@@ -50,6 +56,50 @@ def test_init_db():
                     mock_extensions.assert_called_once()
                     mock_schema.assert_called_once()
                     mock_migrations.assert_called_once_with(mock_session)
+                    mock_mark.assert_called_once()
+
+
+def test_init_db_keeps_marker_when_migrations_failed():
+    """Test that a partially migrated schema is not marked, so the migrations are retried"""
+    with patch('app.db.init_db.init_extensions'), \
+         patch('app.db.init_db.init_schema'), \
+         patch('app.db.init_db.SessionLocal'), \
+         patch('app.db.init_db.run_migrations', return_value=False), \
+         patch('app.db.init_db.schema_is_current', return_value=False), \
+         patch('app.db.init_db.mark_schema_current') as mock_mark:
+        init_db()
+
+    mock_mark.assert_not_called()
+
+
+def test_init_db_skips_schema_setup_when_marker_is_current():
+    """Test that a matching schema marker skips create_all and migrations"""
+    with patch('app.db.init_db.init_extensions') as mock_extensions, \
+         patch('app.db.init_db.init_schema') as mock_schema, \
+         patch('app.db.init_db.run_migrations') as mock_migrations, \
+         patch('app.db.init_db.schema_is_current', return_value=True):
+        init_db()
+
+    mock_extensions.assert_not_called()
+    mock_schema.assert_not_called()
+    mock_migrations.assert_not_called()
+
+
+def test_schema_marker_roundtrip():
+    """Test that the schema marker is written and recognized"""
+    from sqlalchemy import text
+    from app.db.init_db import engine, schema_is_current, mark_schema_current
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS _schema_marker"))
+    assert schema_is_current() is False
+
+    mark_schema_current()
+    mark_schema_current()  # rewrites the single row
+    assert schema_is_current() is True
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM _schema_marker")).scalar() == 1
 
 
 def test_run_migrations_empty_db(db_session):
@@ -76,3 +126,207 @@ def test_run_migrations_with_existing_data(db_session):
     # Verify repository still exists
     repos = db_session.query(Repo).all()
     assert len(repos) >= 1
+
+
+def test_trigram_indexes_migration_skipped_on_sqlite(db_session):
+    """Test that the pg_trgm migration only runs on PostgreSQL"""
+    from app.db.migrations import apply_trigram_indexes_migration
+
+    # Should not raise errors
+    apply_trigram_indexes_migration(db_session)
+
+
+def test_trigram_indexes_migration_on_postgres():
+    """Test that the trigram indexes are created outside a transaction"""
+    from app.db.migrations import apply_trigram_indexes_migration
+
+    mock_session = MagicMock()
+    mock_session.bind.dialect.name = "postgresql"
+    autocommit = mock_session.bind.connect.return_value.execution_options
+    mock_conn = autocommit.return_value.__enter__.return_value
+
+    apply_trigram_indexes_migration(mock_session)
+
+    autocommit.assert_called_once_with(isolation_level="AUTOCOMMIT")
+    statements = [str(call.args[0]) for call in mock_conn.execute.call_args_list]
+    assert "pg_trgm" in statements[0]
+    assert any("prompt_docu_trgm" in sql for sql in statements)
+    assert any("repo_name_trgm" in sql for sql in statements)
+
+
+def test_prompt_docu_ready_index_migration_on_postgres():
+    """Test that the partial index is created concurrently outside a transaction"""
+    from app.db.migrations import apply_prompt_docu_ready_index_migration
+
+    mock_session = MagicMock()
+    mock_session.bind.dialect.name = "postgresql"
+    autocommit = mock_session.bind.connect.return_value.execution_options
+    mock_conn = autocommit.return_value.__enter__.return_value
+
+    apply_prompt_docu_ready_index_migration(mock_session)
+
+    autocommit.assert_called_once_with(isolation_level="AUTOCOMMIT")
+    sql = str(mock_conn.execute.call_args.args[0])
+    assert "CONCURRENTLY" in sql
+    assert "WHERE docu IS NOT NULL" in sql
+
+
+def test_project_goal_columns_migration_single_round_trip():
+    """Test that both tables are handled by one DO block and one commit"""
+    from app.db.migrations import apply_project_goal_columns_migration
+
+    mock_session = MagicMock()
+    mock_conn = mock_session.connection.return_value
+
+    apply_project_goal_columns_migration(mock_session)
+
+    mock_conn.execute.assert_called_once()
+    mock_conn.commit.assert_called_once()
+    sql = str(mock_conn.execute.call_args.args[0])
+    assert "ARRAY['prompt', 'history']" in sql
+
+
+def test_prompt_columns_migration_uses_information_schema():
+    """Test that existing columns are looked up with one information_schema query"""
+    from app.db.migrations import apply_prompt_columns_migration
+
+    mock_session = MagicMock()
+    mock_session.bind.dialect.name = "postgresql"
+    mock_session.execute.return_value = [("generic_prompt",), ("specific_prompt",), ("text",)]
+
+    with patch('app.db.migrations.inspect') as mock_inspect:
+        apply_prompt_columns_migration(mock_session)
+
+    mock_inspect.assert_not_called()
+    statements = [str(call.args[0]) for call in mock_session.execute.call_args_list]
+    assert "information_schema.columns" in statements[0]
+    assert not any("ADD COLUMN" in sql for sql in statements)
+    assert sum("UPDATE prompt" in sql for sql in statements) == 1
+    mock_session.commit.assert_called_once()
+
+
+def test_prompt_columns_migration_without_text_column():
+    """Test that databases created from the models have nothing to migrate"""
+    from app.db.migrations import apply_prompt_columns_migration
+
+    mock_session = MagicMock()
+    mock_session.bind.dialect.name = "postgresql"
+    mock_session.execute.return_value = [("generic_prompt",), ("specific_prompt",)]
+
+    assert apply_prompt_columns_migration(mock_session) is True
+
+    mock_session.execute.assert_called_once()
+    mock_session.commit.assert_called_once()
+
+
+def test_template_name_unique_migration_reports_failure():
+    """Test that a failed index build is reported and its invalid leftover dropped on retry"""
+    from app.db.migrations import apply_template_name_unique_migration
+
+    mock_session = MagicMock()
+    mock_session.bind.dialect.name = "postgresql"
+    autocommit = mock_session.bind.connect.return_value.execution_options
+    mock_conn = autocommit.return_value.__enter__.return_value
+    invalid = MagicMock()
+    invalid.scalars.return_value.all.return_value = ["template_template_name_key"]
+    mock_conn.execute.side_effect = [invalid, None, Exception("could not create unique index")]
+
+    assert apply_template_name_unique_migration(mock_session) is False
+
+    statements = [str(call.args[0]) for call in mock_conn.execute.call_args_list]
+    assert "indisvalid" in statements[0]
+    assert statements[1] == "DROP INDEX CONCURRENTLY IF EXISTS template_template_name_key;"
+    assert "CREATE UNIQUE INDEX CONCURRENTLY" in statements[2]
+
+
+def test_run_migrations_reports_failed_migrations():
+    """Test that run_migrations returns False when a migration was skipped after an error"""
+    with patch('app.db.migrations.drop_old_tables', lambda session: True), \
+         patch('app.db.migrations.apply_project_goal_columns_migration', lambda session: True), \
+         patch('app.db.migrations.apply_trigram_indexes_migration', lambda session: False):
+        assert run_migrations(MagicMock()) is False
+
+
+def test_ensure_database_role_creates_role_in_do_block():
+    """Test that the role is created by one DO block without a Python side existence check"""
+    from sqlalchemy.exc import OperationalError
+    from app.db.init_db import ensure_database_role
+
+    missing_role = OperationalError("SELECT 1", {}, Exception('role "doku" does not exist'))
+    with patch('app.db.init_db.engine') as mock_engine, \
+         patch('app.db.init_db.create_engine') as mock_create_engine, \
+         patch('app.db.init_db.get_settings') as mock_get_settings:
+        mock_engine.connect.side_effect = missing_role
+        mock_get_settings.return_value.DATABASE_URL = "postgresql+psycopg://doku:secret@db:5432/dokudb"
+        admin_conn = mock_create_engine.return_value.connect.return_value.__enter__.return_value
+
+        ensure_database_role()
+
+    statements = [str(call.args[0]) for call in admin_conn.execute.call_args_list]
+    assert not any("secret" in sql for sql in statements)
+    assert any("DO $$" in sql and "pg_roles" in sql for sql in statements)
+    assert not any(sql.startswith("SELECT 1 FROM pg_database") for sql in statements)
+    assert "CREATE DATABASE dokudb" in statements
+
+
+def test_drop_old_tables_inspects_once():
+    """Test that the table names are fetched once and all old tables dropped together"""
+    from app.db.migrations import drop_old_tables
+
+    mock_session = MagicMock()
+    with patch('app.db.migrations.inspect') as mock_inspect:
+        mock_inspect.return_value.get_table_names.return_value = ["repo", "prompts", "documents"]
+        drop_old_tables(mock_session)
+
+    mock_inspect.assert_called_once_with(mock_session.bind)
+    mock_session.execute.assert_called_once()
+    assert str(mock_session.execute.call_args.args[0]) == "DROP TABLE IF EXISTS documents, prompts CASCADE;"
+
+
+def test_engine_pings_connections_on_checkout():
+    """Test that API routes and Celery tasks never get a dead pooled connection"""
+    from app.db.session import engine
+
+    assert engine.pool._pre_ping is True
+
+
+def test_run_with_reconnect_retries_invalidated_connection():
+    """Test that a call is retried once when the pooled connection was dead"""
+    from sqlalchemy.exc import DBAPIError
+    from app.db.session import run_with_reconnect
+
+    dead = DBAPIError("SELECT 1", {}, Exception("server closed the connection"), connection_invalidated=True)
+    fn = Mock(side_effect=[dead, "ok"])
+
+    assert run_with_reconnect(fn, 1, key="value") == "ok"
+    assert fn.call_count == 2
+    fn.assert_called_with(1, key="value")
+
+
+def test_run_with_reconnect_does_not_retry_other_errors():
+    """Test that regular database errors are raised without a retry"""
+    from sqlalchemy.exc import DBAPIError
+    from app.db.session import run_with_reconnect
+
+    fn = Mock(side_effect=DBAPIError("SELECT 1", {}, Exception("syntax error")))
+
+    with pytest.raises(DBAPIError):
+        run_with_reconnect(fn)
+    fn.assert_called_once()
+
+
+def test_prompt_repo_id_index_migration_on_postgres():
+    """Test that the repo_id index is created concurrently outside a transaction"""
+    from app.db.migrations import apply_prompt_repo_id_index_migration
+
+    mock_session = MagicMock()
+    mock_session.bind.dialect.name = "postgresql"
+    autocommit = mock_session.bind.connect.return_value.execution_options
+    mock_conn = autocommit.return_value.__enter__.return_value
+
+    apply_prompt_repo_id_index_migration(mock_session)
+
+    autocommit.assert_called_once_with(isolation_level="AUTOCOMMIT")
+    sql = str(mock_conn.execute.call_args.args[0])
+    assert "CONCURRENTLY" in sql
+    assert "(repo_id, prompt_id)" in sql
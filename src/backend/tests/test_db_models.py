@@ -2,6 +2,8 @@
 Tests for database models - Updated for new schema
 """
 from datetime import datetime
+import pytest
+from sqlalchemy.exc import IntegrityError
 from app.db.models import User, Repo, Prompt, Template, History
 
 
@@ -73,6 +75,17 @@ def test_template_model(db_session):
     assert template.prompt_text == "This is a template prompt"
 
 
+def test_template_name_is_unique(db_session):
+    """Test that two templates cannot share a name"""
+    db_session.add(Template(name="same-name", prompt_text="First"))
+    db_session.commit()
+
+    db_session.add(Template(name="same-name", prompt_text="Second"))
+    with pytest.raises(IntegrityError):
+        db_session.commit()
+    db_session.rollback()
+
+
 def test_history_model(db_session):
     """Test History model creation"""
     # Create a repo first for the foreign key
@@ -94,3 +107,36 @@ def test_history_model(db_session):
     assert history.id is not None
     assert history.generic_prompt == "Historical prompt"
     assert history.repo_id == repo.id
+
+
+def test_timestamps_filled_by_database(db_session):
+    """Test that creation timestamps come from the server default"""
+    from sqlalchemy import insert
+
+    repo = Repo(repo_name="test-repo", repo_url="https://github.com/test/repo")
+    db_session.add(repo)
+    db_session.commit()
+
+    # Bulk insert without a created_at value relies on the column DEFAULT
+    db_session.execute(insert(History), [
+        {"generic_prompt": "First", "repo_id": repo.id},
+        {"generic_prompt": "Second", "repo_id": repo.id},
+    ])
+    db_session.commit()
+
+    assert repo.date_of_version is not None
+    assert all(h.created_at is not None for h in db_session.query(History).all())
+
+
+def test_server_defaults_loaded_on_insert(db_session):
+    """Test that server generated timestamps are populated without a refresh"""
+    from sqlalchemy import inspect as sa_inspect
+
+    repo = Repo(repo_name="test-repo", repo_url="https://github.com/test/repo")
+    db_session.add(repo)
+    db_session.flush()
+
+    # eager_defaults fetches date_of_version together with the INSERT
+    assert "date_of_version" not in sa_inspect(repo).expired_attributes
+    assert repo.date_of_version is not None
+    db_session.rollback()
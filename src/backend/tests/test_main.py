@@ -38,3 +38,11 @@ def test_openapi_schema(client):
     assert "openapi" in data
     assert "info" in data
     assert data["info"]["title"] == "CodeDoc Backend"
+
+
+def test_app_is_built_lazily():
+    """Test that the module level app is only created on first access"""
+    import app.main as main_module
+
+    assert main_module.app is main_module.app
+    assert any(route.path == "/repos/list" for route in main_module.app.routes)
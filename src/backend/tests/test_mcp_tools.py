@@ -0,0 +1,173 @@
+"""
+Tests for the database helpers behind the MCP tools
+"""
+import pytest
+from unittest.mock import ANY, patch
+from app.db.models import Repo, Prompt
+from app.mcp import mcp_tools_docs, mcp_tools_repos
+
+
+@pytest.fixture(autouse=True)
+def clear_toc_cache():
+    mcp_tools_docs._toc_cache.clear()
+    yield
+    mcp_tools_docs._toc_cache.clear()
+
+
+def test_list_documents_sorted_by_repo_name(db_session):
+    """Test that documents come back in one query, sorted case-insensitively by repo name"""
+    beta = Repo(repo_name="beta", repo_url="https://github.com/test/beta")
+    alpha = Repo(repo_name="Alpha", repo_url="https://github.com/test/alpha")
+    db_session.add_all([beta, alpha])
+    db_session.commit()
+    db_session.add_all([
+        Prompt(repo_id=beta.id, generic_prompt="Generic", docu="# Beta"),
+        Prompt(repo_id=alpha.id, generic_prompt="Generic", docu="# Alpha"),
+        Prompt(repo_id=alpha.id, generic_prompt="Generic"),  # no documentation yet
+    ])
+    db_session.commit()
+
+    docs = mcp_tools_docs.list_documents(db_session)
+
+    assert [doc["repo_name"] for doc in docs] == ["Alpha", "beta"]
+    assert docs[0]["repo_id"] == str(alpha.id)
+    assert docs[0]["created_at"] == docs[0]["updated_at"]
+
+
+def test_list_repositories_with_first_specific_prompt(db_session):
+    """Test that each repo appears once with the specific prompt of its first prompt"""
+    with_prompt = Repo(repo_name="with-prompt", repo_url="https://github.com/test/a")
+    without_prompt = Repo(repo_name="without-prompt", repo_url="https://github.com/test/b")
+    db_session.add_all([with_prompt, without_prompt])
+    db_session.commit()
+    db_session.add_all([
+        Prompt(repo_id=with_prompt.id, generic_prompt="Generic", specific_prompt="First"),
+        Prompt(repo_id=with_prompt.id, generic_prompt="Generic", specific_prompt="Second"),
+    ])
+    db_session.commit()
+
+    repos = {repo["name"]: repo for repo in mcp_tools_repos.list_repositories(db_session)}
+
+    assert len(repos) == 2
+    assert repos["with-prompt"]["specific_prompt"] == "First"
+    assert repos["without-prompt"]["specific_prompt"] is None
+    assert repos["with-prompt"]["date_of_version"] is not None
+
+
+def test_get_repository_by_id(db_session):
+    """Test the single repository lookup including its specific prompt"""
+    repo = Repo(repo_name="single", repo_url="https://github.com/test/single", description="Desc")
+    db_session.add(repo)
+    db_session.commit()
+    db_session.add(Prompt(repo_id=repo.id, generic_prompt="Generic", specific_prompt="Specific"))
+    db_session.commit()
+
+    result = mcp_tools_repos.get_repository_by_id(db_session, repo.id)
+
+    assert result["name"] == "single"
+    assert result["description"] == "Desc"
+    assert result["specific_prompt"] == "Specific"
+    assert mcp_tools_repos.get_repository_by_id(db_session, 999999) is None
+
+
+def test_get_document(db_session):
+    """Test that a document is returned with repo data and a table of contents"""
+    repo = Repo(repo_name="documented", repo_url="https://github.com/test/documented")
+    db_session.add(repo)
+    db_session.commit()
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Generic", docu="# Title\n\n## Section\ntext")
+    empty = Prompt(repo_id=repo.id, generic_prompt="Generic")
+    db_session.add_all([prompt, empty])
+    db_session.commit()
+
+    doc = mcp_tools_docs.get_document(db_session, prompt.id)
+
+    assert doc["repo_name"] == "documented"
+    assert doc["repo_url"] == "https://github.com/test/documented"
+    assert doc["content"] == "# Title\n\n## Section\ntext"
+    assert doc["table_of_contents"] == "- Title\n  - Section"
+    assert mcp_tools_docs.get_document(db_session, empty.id) is None
+    assert mcp_tools_docs.get_document(db_session, 999999) is None
+
+
+def test_get_document_uses_stored_toc(db_session):
+    """Test that the table of contents stored with the documentation is returned as is"""
+    repo = Repo(repo_name="stored", repo_url="https://github.com/test/stored")
+    db_session.add(repo)
+    db_session.commit()
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Generic", docu="# Title", toc="- Stored")
+    db_session.add(prompt)
+    db_session.commit()
+
+    with patch.object(mcp_tools_docs, "format_table_of_contents") as mock_build:
+        doc = mcp_tools_docs.get_document(db_session, prompt.id)
+
+    assert doc["table_of_contents"] == "- Stored"
+    mock_build.assert_not_called()
+
+
+def test_get_document_caches_toc_per_version(db_session):
+    """Test that a TOC rendered on the fly is reused for the same document version"""
+    repo = Repo(repo_name="cached", repo_url="https://github.com/test/cached")
+    db_session.add(repo)
+    db_session.commit()
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Generic", docu="# Title")
+    db_session.add(prompt)
+    db_session.commit()
+
+    with patch.object(mcp_tools_docs, "format_table_of_contents",
+                      wraps=mcp_tools_docs.format_table_of_contents) as mock_build:
+        first = mcp_tools_docs.get_document(db_session, prompt.id)
+        second = mcp_tools_docs.get_document(db_session, prompt.id)
+
+    assert first["table_of_contents"] == second["table_of_contents"] == "- Title"
+    mock_build.assert_called_once()
+
+
+@patch("app.mcp.mcp_tools_docs.generate_docu")
+def test_generate_documentation_for_repos(mock_generate, db_session):
+    """Test that existing repos are generated and missing ones reported"""
+    repo = Repo(repo_name="to-document", repo_url="https://github.com/test/doc")
+    db_session.add(repo)
+    db_session.commit()
+    mock_generate.return_value = {"status": "documented"}
+
+    result = mcp_tools_docs.generate_documentation_for_repos(db_session, [repo.id, 999999])
+
+    # Generated in a worker thread with its own session
+    mock_generate.assert_called_once_with(ANY, repo.id, "to-document")
+    assert result["status"] == "partial_success"
+    assert result["successful_count"] == 1
+    assert result["errors"] == ["Repository 999999 not found"]
+
+
+@patch("app.mcp.mcp_tools_docs.generate_docu")
+def test_generate_documentation_for_repos_keeps_order(mock_generate, db_session):
+    """Test that parallel generation returns the results in request order"""
+    repos = [Repo(repo_name=f"repo-{i}", repo_url=f"https://github.com/test/{i}") for i in range(5)]
+    db_session.add_all(repos)
+    db_session.commit()
+    mock_generate.side_effect = lambda db, repo_id, repo_name: {"status": "documented", "repo_name": repo_name}
+
+    result = mcp_tools_docs.generate_documentation_for_repos(db_session, [r.id for r in reversed(repos)])
+
+    assert result["status"] == "ok"
+    assert [r["repo_name"] for r in result["results"]] == [f"repo-{i}" for i in reversed(range(5))]
+
+
+def test_list_documents_paginated(db_session):
+    """Test that list_documents pages through the sorted documents in SQL"""
+    repos = [Repo(repo_name=f"repo-{i}", repo_url=f"https://github.com/test/{i}") for i in range(3)]
+    db_session.add_all(repos)
+    db_session.commit()
+    db_session.add_all([Prompt(repo_id=r.id, generic_prompt="Generic", docu="# Doc") for r in repos])
+    db_session.commit()
+
+    first = mcp_tools_docs.list_documents(db_session, page=0, limit=2)
+    second = mcp_tools_docs.list_documents(db_session, page=1, limit=2)
+
+    assert [d["repo_name"] for d in first] == ["repo-0", "repo-1"]
+    assert [d["repo_name"] for d in second] == ["repo-2"]
+    # Out of range limits are clamped
+    assert len(mcp_tools_docs.list_documents(db_session, limit=0)) == 1
+
@@ -6,190 +6,392 @@ from unittest.mock import patch, MagicMock
 from app.db.models import Repo
 
 
+# Dedup keys go to the in-memory FakeRedis from conftest
+pytestmark = pytest.mark.usefixtures("fake_redis")
+
+
+@pytest.fixture(autouse=True)
+def mock_group_result():
+    with patch("app.api.routes_ai.GroupResult") as mock_group:
+        yield mock_group
+
+
+def _run_batch(client, db_session, repo_ids):
+    """
+    Posts to /ai/generate and runs the queued chord synchronously:
+    every generate_one signature of the header, then the aggregate callback.
+    """
+    with patch("app.api.routes_ai.chord") as mock_chord, \
+            patch("app.worker.tasks_ai.SessionLocal", return_value=db_session):
+        mock_chord.return_value.return_value = MagicMock(id="gen-123")
+        response = client.post("/ai/generate", json={"repo_ids": repo_ids})
+        assert response.status_code == 200
+
+        header = mock_chord.call_args.args[0]
+        callback = mock_chord.return_value.call_args.args[0]
+        outcomes = [sig.type.run(*sig.args) for sig in header]
+        return callback.type.run(outcomes, *callback.args)
+
+
+def _create_repos(db_session, count):
+    repos = []
+    for i in range(count):
+        repo = Repo(
+            repo_name=f"test-repo-{i}",
+            repo_url=f"https://github.com/user/test-repo-{i}.git"
+        )
+        db_session.add(repo)
+        repos.append(repo)
+    db_session.commit()
+    return repos
+
+
 def test_enqueue_generate_no_repos(client, db_session):
     """Test documentation generation with empty repo list"""
     response = client.post("/ai/generate", json={"repo_ids": []})
-    
+
+    assert response.status_code == 422
+
+
+def test_enqueue_generate_too_many_repos(client, db_session):
+    """Test that requests above the per-request limit are rejected"""
+    response = client.post("/ai/generate", json={"repo_ids": list(range(1, 52))})
+
+    assert response.status_code == 422
+
+
+@patch("app.api.routes_ai.chord")
+def test_enqueue_generate_deduplicates_repo_ids(mock_chord, client, db_session):
+    """Test that a repository listed twice is only queued once"""
+    repo = _create_repos(db_session, 1)[0]
+    mock_chord.return_value.return_value = MagicMock(id="gen-123")
+
+    response = client.post("/ai/generate", json={"repo_ids": [repo.id, repo.id]})
+
     assert response.status_code == 200
-    data = response.json()
-    assert data["successful_count"] == 0
-    assert "status" in data
+    assert [sig.args for sig in mock_chord.call_args.args[0]] == [(repo.id, "test-repo-0")]
+    callback = mock_chord.return_value.call_args.args[0]
+    assert callback.args[:2] == (1, [])
 
 
-def test_enqueue_generate_nonexistent_repo(client, db_session):
-    """Test documentation generation with nonexistent repository"""
+@patch("app.api.routes_ai.chord")
+def test_enqueue_generate_returns_task_id(mock_chord, client, db_session):
+    """Test that one task per repository is queued and the chord id is returned"""
+    repos = _create_repos(db_session, 2)
+    mock_chord.return_value.return_value = MagicMock(id="gen-123")
+
+    response = client.post("/ai/generate", json={"repo_ids": [repos[0].id, repos[1].id]})
+
+    assert response.status_code == 200
+    assert response.json() == {"task_id": "gen-123"}
+    header = mock_chord.call_args.args[0]
+    assert [sig.args for sig in header] == [(repos[0].id, "test-repo-0"), (repos[1].id, "test-repo-1")]
+    callback = mock_chord.return_value.call_args.args[0]
+    assert callback.args[:2] == (2, [])
+
+
+@patch("app.api.routes_ai.chord")
+def test_enqueue_generate_skips_missing_repos(mock_chord, client, db_session):
+    """Test that no task is queued for unknown repositories"""
+    mock_chord.return_value.return_value = MagicMock(id="gen-123")
+
     response = client.post("/ai/generate", json={"repo_ids": [99999]})
-    
+
+    assert response.status_code == 200
+    assert mock_chord.call_args.args[0] == []
+    callback = mock_chord.return_value.call_args.args[0]
+    assert callback.args[:2] == (1, [99999])
+
+
+@patch("app.api.routes_ai.chord")
+def test_enqueue_generate_deduplicates_running_batch(mock_chord, client, db_session):
+    """Test that a retried request returns the task that is already running"""
+    repos = _create_repos(db_session, 2)
+    mock_chord.return_value.return_value = MagicMock(id="gen-123")
+
+    first = client.post("/ai/generate", json={"repo_ids": [repos[0].id, repos[1].id]})
+    second = client.post("/ai/generate", json={"repo_ids": [repos[1].id, repos[0].id]})
+
+    assert first.json() == {"task_id": "gen-123"}
+    assert second.json() == {"task_id": "gen-123"}
+    assert mock_chord.return_value.call_count == 1
+
+
+@patch("app.api.routes_ai.chord")
+def test_enqueue_generate_after_batch_finished(mock_chord, client, db_session, fake_redis):
+    """Test that the aggregate callback releases the dedup key"""
+    repo = _create_repos(db_session, 1)[0]
+    mock_chord.return_value.return_value = MagicMock(id="gen-123")
+
+    client.post("/ai/generate", json={"repo_ids": [repo.id]})
+    callback = mock_chord.return_value.call_args.args[0]
+    callback.type.run([], *callback.args)
+
+    assert fake_redis.store == {}
+    client.post("/ai/generate", json={"repo_ids": [repo.id]})
+    assert mock_chord.return_value.call_count == 2
+
+
+@patch("app.api.routes_ai.chord")
+def test_enqueue_generate_batch_finished_before_task_id_stored(mock_chord, client, db_session, fake_redis):
+    """Test that a batch finishing before the route stores its task id leaves no stale key"""
+    repo = _create_repos(db_session, 1)[0]
+
+    def run_chord(callback):
+        callback.type.run([], *callback.args)
+        return MagicMock(id="gen-123")
+
+    mock_chord.return_value.side_effect = run_chord
+
+    response = client.post("/ai/generate", json={"repo_ids": [repo.id]})
+
+    assert response.json() == {"task_id": "gen-123"}
+    assert fake_redis.store == {}
+
+
+@patch("app.api.routes_ai.generate_one")
+def test_enqueue_generate_releases_claim_on_error(mock_generate_one, client, db_session, fake_redis):
+    """Test that a failure before the chord is queued releases the dedup key"""
+    repo = _create_repos(db_session, 1)[0]
+    mock_generate_one.s.side_effect = RuntimeError("broker down")
+
+    with pytest.raises(RuntimeError):
+        client.post("/ai/generate", json={"repo_ids": [repo.id]})
+
+    assert fake_redis.store == {}
+
+
+@patch("app.api.routes_ai.get_redis", side_effect=Exception("redis down"))
+@patch("app.api.routes_ai.chord")
+def test_enqueue_generate_without_redis(mock_chord, mock_get_redis, client, db_session):
+    """Test that generation is still queued when Redis is unavailable"""
+    repo = _create_repos(db_session, 1)[0]
+    mock_chord.return_value.return_value = MagicMock(id="gen-123")
+
+    response = client.post("/ai/generate", json={"repo_ids": [repo.id]})
+
+    assert response.status_code == 200
+    assert response.json() == {"task_id": "gen-123"}
+    callback = mock_chord.return_value.call_args.args[0]
+    assert callback.args == (1, [], None)
+
+
+@patch("app.api.routes_ai.AsyncResult")
+def test_get_generate_status_success(mock_async_result, client):
+    """Test polling a finished generation task"""
+    envelope = {"status": "ok", "successful_count": 1, "results": []}
+    mock_async_result.return_value = MagicMock(
+        state="SUCCESS",
+        successful=MagicMock(return_value=True),
+        result=envelope,
+    )
+
+    response = client.get("/ai/generate/gen-123")
+
     assert response.status_code == 200
     data = response.json()
+    assert data["task_id"] == "gen-123"
+    assert data["state"] == "SUCCESS"
+    assert data["result"] == envelope
+
+
+@patch("app.api.routes_ai.AsyncResult")
+def test_get_generate_status_backend_unavailable(mock_async_result, client):
+    """Test that an unreachable result backend is reported as PENDING"""
+    mock_async_result.side_effect = Exception("backend down")
+
+    response = client.get("/ai/generate/gen-123")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["state"] == "PENDING"
+    assert "backend down" in data["result"]["error"]
+
+
+@patch("app.api.routes_ai.AsyncResult")
+def test_stream_generate_events(mock_async_result, mock_group_result, client):
+    """Test that every finished repository is streamed, followed by the envelope"""
+    first = MagicMock(ready=MagicMock(return_value=True), successful=MagicMock(return_value=True),
+                      result={"status": "documented", "message": "Documentation generated", "repo_id": 1})
+    second = MagicMock(ready=MagicMock(side_effect=[False, True]), successful=MagicMock(return_value=False),
+                       result=Exception("worker lost"))
+    mock_group_result.restore.return_value = MagicMock(results=[first, second])
+    envelope = {"status": "partial_success", "successful_count": 1}
+    mock_async_result.return_value = MagicMock(
+        ready=MagicMock(return_value=True),
+        successful=MagicMock(return_value=True),
+        state="SUCCESS",
+        result=envelope,
+    )
+
+    with patch("app.api.routes_ai.EVENTS_POLL_INTERVAL", 0):
+        response = client.get("/ai/generate/gen-123/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in events] == ["event: repo", "event: repo", "event: done"]
+    assert '"repo_id": 1' in events[0][1]
+    assert "worker lost" in events[1][1]
+    assert '"partial_success"' in events[2][1]
+
+
+@patch("app.api.routes_ai.AsyncResult")
+def test_stream_generate_events_keepalive(mock_async_result, mock_group_result, client):
+    """Test that a keep-alive comment is sent while no repository is finished"""
+    slow = MagicMock(ready=MagicMock(side_effect=[False, True]), successful=MagicMock(return_value=True),
+                     result={"status": "documented", "message": "Documentation generated", "repo_id": 1})
+    mock_group_result.restore.return_value = MagicMock(results=[slow])
+    mock_async_result.return_value = MagicMock(
+        ready=MagicMock(return_value=True),
+        successful=MagicMock(return_value=True),
+        state="SUCCESS",
+        result={"status": "ok"},
+    )
+
+    with patch("app.api.routes_ai.EVENTS_POLL_INTERVAL", 0), \
+            patch("app.api.routes_ai.EVENTS_KEEPALIVE_INTERVAL", 0):
+        response = client.get("/ai/generate/gen-123/events")
+
+    blocks = response.text.strip().split("\n\n")
+    assert blocks[0] == ": ping"
+    assert [block.split("\n")[0] for block in blocks[1:]] == ["event: repo", "event: done"]
+
+
+@patch("app.api.routes_ai.AsyncResult")
+def test_stream_generate_events_timeout(mock_async_result, mock_group_result, client):
+    """Test that a task that never finishes ends the stream with an error event"""
+    stuck = MagicMock(ready=MagicMock(return_value=False))
+    mock_group_result.restore.return_value = MagicMock(results=[stuck])
+    mock_async_result.return_value = MagicMock(ready=MagicMock(return_value=False))
+
+    with patch("app.api.routes_ai.EVENTS_POLL_INTERVAL", 0), \
+            patch("app.api.routes_ai.EVENTS_TIMEOUT", 0):
+        response = client.get("/ai/generate/gen-123/events")
+
+    assert response.status_code == 200
+    assert response.text.startswith("event: error")
+    assert "Timed out" in response.text
+
+
+def test_stream_generate_events_unknown_task(mock_group_result, client):
+    """Test that an unknown task id yields a single error event"""
+    mock_group_result.restore.return_value = None
+
+    response = client.get("/ai/generate/unknown/events")
+
+    assert response.status_code == 200
+    assert response.text.startswith("event: error")
+
+
+def test_generate_batch_nonexistent_repo(client, db_session):
+    """Test documentation generation with nonexistent repository"""
+    data = _run_batch(client, db_session, [99999])
+
     assert data["status"] == "error"
     assert data["successful_count"] == 0
     assert any("not found" in error.lower() for error in data["errors"])
 
 
-@patch("app.api.routes_ai.generate_docu")
-def test_enqueue_generate_single_repo_success(mock_generate_docu, client, db_session):
+@patch("app.worker.tasks_ai.generate_docu")
+def test_generate_batch_single_repo_success(mock_generate_docu, client, db_session):
     """Test successful documentation generation for single repository"""
-    # Create a test repository
-    repo = Repo(
-        repo_name="test-repo",
-        repo_url="https://github.com/user/test-repo.git"
-    )
-    db_session.add(repo)
-    db_session.commit()
-    
-    # Mock successful generation
+    repo = _create_repos(db_session, 1)[0]
+
     mock_generate_docu.return_value = {
         "status": "documented",
         "message": "Documentation generated successfully"
     }
-    
-    response = client.post("/ai/generate", json={"repo_ids": [repo.id]})
-    
-    assert response.status_code == 200
-    data = response.json()
+
+    data = _run_batch(client, db_session, [repo.id])
+
     assert data["status"] == "ok"
     assert data["successful_count"] == 1
     assert len(data["results"]) == 1
     assert "errors" not in data or len(data.get("errors", [])) == 0
-    
-    # Verify generate_docu was called
     mock_generate_docu.assert_called_once()
 
 
-@patch("app.api.routes_ai.generate_docu")
-def test_enqueue_generate_single_repo_failure(mock_generate_docu, client, db_session):
+@patch("app.worker.tasks_ai.generate_docu")
+def test_generate_batch_single_repo_failure(mock_generate_docu, client, db_session):
     """Test failed documentation generation for single repository"""
-    # Create a test repository
-    repo = Repo(
-        repo_name="test-repo",
-        repo_url="https://github.com/user/test-repo.git"
-    )
-    db_session.add(repo)
-    db_session.commit()
-    
-    # Mock failed generation
+    repo = _create_repos(db_session, 1)[0]
+
     mock_generate_docu.return_value = {
         "status": "error",
         "message": "Failed to generate documentation"
     }
-    
-    response = client.post("/ai/generate", json={"repo_ids": [repo.id]})
-    
-    assert response.status_code == 200
-    data = response.json()
+
+    data = _run_batch(client, db_session, [repo.id])
+
     assert data["status"] == "error"
     assert data["successful_count"] == 0
     assert len(data["errors"]) > 0
 
 
-@patch("app.api.routes_ai.generate_docu")
-def test_enqueue_generate_multiple_repos_all_success(mock_generate_docu, client, db_session):
+@patch("app.worker.tasks_ai.generate_docu")
+def test_generate_batch_multiple_repos_all_success(mock_generate_docu, client, db_session):
     """Test successful documentation generation for multiple repositories"""
-    # Create test repositories
-    repos = []
-    for i in range(3):
-        repo = Repo(
-            repo_name=f"test-repo-{i}",
-            repo_url=f"https://github.com/user/test-repo-{i}.git"
-        )
-        db_session.add(repo)
-        repos.append(repo)
-    db_session.commit()
-    
-    # Mock successful generation
+    repos = _create_repos(db_session, 3)
+
     mock_generate_docu.return_value = {
         "status": "documented",
         "message": "Documentation generated successfully"
     }
-    
-    repo_ids = [repo.id for repo in repos]
-    response = client.post("/ai/generate", json={"repo_ids": repo_ids})
-    
-    assert response.status_code == 200
-    data = response.json()
+
+    data = _run_batch(client, db_session, [repo.id for repo in repos])
+
     assert data["status"] == "ok"
     assert data["successful_count"] == 3
     assert len(data["results"]) == 3
 
 
-@patch("app.api.routes_ai.generate_docu")
-def test_enqueue_generate_multiple_repos_partial_success(mock_generate_docu, client, db_session):
+@patch("app.worker.tasks_ai.generate_docu")
+def test_generate_batch_multiple_repos_partial_success(mock_generate_docu, client, db_session):
     """Test partial success when some repositories fail"""
-    # Create test repositories
-    repos = []
-    for i in range(3):
-        repo = Repo(
-            repo_name=f"test-repo-{i}",
-            repo_url=f"https://github.com/user/test-repo-{i}.git"
-        )
-        db_session.add(repo)
-        repos.append(repo)
-    db_session.commit()
-    
-    # Mock mixed results: first succeeds, second fails, third succeeds
+    repos = _create_repos(db_session, 3)
+
+    # First succeeds, second fails, third succeeds
     mock_generate_docu.side_effect = [
         {"status": "documented", "message": "Success"},
         {"status": "error", "message": "Failed"},
         {"status": "documented", "message": "Success"}
     ]
-    
-    repo_ids = [repo.id for repo in repos]
-    response = client.post("/ai/generate", json={"repo_ids": repo_ids})
-    
-    assert response.status_code == 200
-    data = response.json()
+
+    data = _run_batch(client, db_session, [repo.id for repo in repos])
+
     assert data["status"] == "partial_success"
     assert data["successful_count"] == 2
     assert len(data["results"]) == 3
     assert len(data["errors"]) > 0
 
 
-@patch("app.api.routes_ai.generate_docu")
-def test_enqueue_generate_exception_handling(mock_generate_docu, client, db_session):
+@patch("app.worker.tasks_ai.generate_docu")
+def test_generate_batch_exception_handling(mock_generate_docu, client, db_session):
     """Test that exceptions during generation are handled gracefully"""
-    # Create a test repository
-    repo = Repo(
-        repo_name="test-repo",
-        repo_url="https://github.com/user/test-repo.git"
-    )
-    db_session.add(repo)
-    db_session.commit()
-    
-    # Mock an exception
+    repo = _create_repos(db_session, 1)[0]
+
     mock_generate_docu.side_effect = Exception("Unexpected error")
-    
-    response = client.post("/ai/generate", json={"repo_ids": [repo.id]})
-    
-    assert response.status_code == 200
-    data = response.json()
+
+    data = _run_batch(client, db_session, [repo.id])
+
     assert data["status"] == "error"
     assert data["successful_count"] == 0
     assert len(data["errors"]) > 0
 
 
-@patch("app.api.routes_ai.generate_docu")
-def test_enqueue_generate_mixed_valid_and_invalid_repos(mock_generate_docu, client, db_session):
+@patch("app.worker.tasks_ai.generate_docu")
+def test_generate_batch_mixed_valid_and_invalid_repos(mock_generate_docu, client, db_session):
     """Test generation with mix of valid and invalid repo IDs"""
-    # Create one valid repository
-    repo = Repo(
-        repo_name="test-repo",
-        repo_url="https://github.com/user/test-repo.git"
-    )
-    db_session.add(repo)
-    db_session.commit()
-    
-    # Mock successful generation
+    repo = _create_repos(db_session, 1)[0]
+
     mock_generate_docu.return_value = {
         "status": "documented",
         "message": "Success"
     }
-    
-    # Request with valid and invalid repo IDs
-    response = client.post("/ai/generate", json={"repo_ids": [99999, repo.id, 88888]})
-    
-    assert response.status_code == 200
-    data = response.json()
+
+    data = _run_batch(client, db_session, [99999, repo.id, 88888])
+
     assert data["status"] == "partial_success"
     assert data["successful_count"] == 1
     assert len(data["errors"]) == 2  # Two repos not found
@@ -199,7 +401,6 @@ def test_enqueue_generate_mixed_valid_and_invalid_repos(mock_generate_docu, clie
 def test_enqueue_generate_invalid_request_body(client):
     """Test with invalid request body"""
     response = client.post("/ai/generate", json={"invalid_field": [1, 2, 3]})
-    
+
     # FastAPI should return 422 for validation error
     assert response.status_code == 422
-
@@ -3,6 +3,8 @@ Tests for documentation routes
 """
 import pytest
 from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
 from app.db.models import Repo, Prompt, History, GeneralSettings
 
 
@@ -126,6 +128,23 @@ def test_delete_multiple_documents(client, db_session):
     assert h2.docu == "Documentation 2"
 
 
+def test_delete_documents_duplicate_ids(client, db_session):
+    """Test that a document listed twice is only archived and cleared once"""
+    repo = Repo(repo_name="Test Repo", repo_url="https://github.com/test/repo")
+    db_session.add(repo)
+    db_session.commit()
+    prompt = Prompt(generic_prompt="Generic", repo_id=repo.id, docu="Documentation")
+    db_session.add(prompt)
+    db_session.commit()
+    prompt_id = prompt.id
+
+    response = client.post("/docs/delete", json={"doc_ids": [str(prompt_id), str(prompt_id)]})
+
+    assert response.status_code == 200
+    assert response.json()["deleted_count"] == 1
+    assert db_session.query(History).filter(History.prompt_id == prompt_id).count() == 1
+
+
 def test_delete_nonexistent_document(client, db_session):
     """Test deleting a document that doesn't exist"""
     response = client.post("/docs/delete", json={"doc_ids": ["9999"]})
@@ -220,22 +239,19 @@ def test_update_documents_saves_to_history(client, db_session, mocker):
     db_session.commit()
     prompt_id = prompt.id
 
-    # Mock the generate_docu function to avoid actual LLM calls and Git operations
+    # Mock the Celery task to avoid actual LLM calls and Git operations
     # Patch it where it's imported (in routes_docs module)
-    mock_generate = mocker.patch('app.api.routes_docs.generate_docu')
-    mock_generate.return_value = {
-        "status": "documented",
-        "repository": "Test Repo",
-        "prompt_id": prompt_id
-    }
+    mock_generate = mocker.patch('app.api.routes_docs.task_generate_docu')
+    mock_generate.delay.return_value.id = "task-123"
 
     # Update/regenerate the document
     response = client.post("/docs/update", json={"doc_ids": [str(prompt_id)]})
 
     assert response.status_code == 200
     data = response.json()
-    assert data["status"] == "success"
-    assert data["updated_count"] == 1
+    assert data["status"] == "queued"
+    assert data["queued_count"] == 1
+    assert data["task_ids"] == ["task-123"]
 
     # Verify old data is saved in history
     db_session.expire_all()
@@ -258,8 +274,8 @@ def test_update_documents_saves_to_history(client, db_session, mocker):
     assert updated_prompt.generic_prompt == "Current generic prompt from settings"
     assert updated_prompt.specific_prompt == old_specific, "Specific prompt should be preserved"
 
-    # Verify generate_docu was called
-    mock_generate.assert_called_once_with(db_session, repo.id, "Test Repo")
+    # Verify the regeneration was queued
+    mock_generate.delay.assert_called_once_with(repo.id, "Test Repo")
 
 
 def test_update_document_goal(client, db_session):
@@ -431,6 +447,41 @@ def test_list_documents_with_data(client, db_session):
     assert all(key in data[0] for key in ["id", "title", "repo_id", "repo_name", "status"])
 
 
+def test_list_documents_sorted_by_repo_name(client, db_session):
+    """Test that documents are ordered case-insensitively by repository name"""
+    repos = [
+        Repo(repo_name=name, repo_url=f"https://github.com/test/{name}")
+        for name in ["beta", "Alpha", "gamma"]
+    ]
+    db_session.add_all(repos)
+    db_session.commit()
+    db_session.add_all([
+        Prompt(repo_id=repo.id, generic_prompt="Generic", docu=f"# {repo.repo_name}")
+        for repo in repos
+    ])
+    db_session.commit()
+
+    response = client.get("/docs/list")
+    assert response.status_code == 200
+    assert [doc["repo_name"] for doc in response.json()] == ["Alpha", "beta", "gamma"]
+
+
+def test_list_and_search_timestamps_are_iso_formatted(client, db_session):
+    """Test that timestamps rendered by the database match datetime.isoformat()"""
+    created = datetime(2025, 1, 2, 3, 4, 5, 678901)
+    repo = Repo(repo_name="IsoRepo", repo_url="https://github.com/test/iso")
+    db_session.add(repo)
+    db_session.commit()
+    db_session.add(Prompt(repo_id=repo.id, generic_prompt="Generic", docu="Iso docs", created_at=created))
+    db_session.commit()
+
+    listed = client.get("/docs/list").json()[0]
+    assert listed["created_at"] == listed["updated_at"] == created.isoformat()
+
+    found = client.get("/docs/search?query=iso").json()[0]
+    assert found["created_at"] == created.isoformat()
+
+
 def test_get_document_by_id(client, db_session):
     """Test retrieving a specific document by ID"""
     repo = Repo(repo_name="TestRepo", repo_url="https://github.com/test/repo", description="Test")
@@ -449,6 +500,83 @@ def test_get_document_by_id(client, db_session):
     assert "content" in data
 
 
+def test_get_document_table_of_contents(client, db_session):
+    """Test that the table of contents indents headings by level"""
+    repo = Repo(repo_name="TocRepo", repo_url="https://github.com/test/toc")
+    db_session.add(repo)
+    db_session.commit()
+
+    docu = "# Title\nIntro\n## Setup \n### Details\n#\nNot a heading\n####### Too deep"
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Generic", docu=docu)
+    db_session.add(prompt)
+    db_session.commit()
+
+    response = client.get(f"/docs/{prompt.id}")
+    assert response.status_code == 200
+    assert response.json()["table_of_contents"] == "- Title\n  - Setup\n    - Details"
+
+
+def test_get_document_uses_stored_table_of_contents(client, db_session):
+    """Test that a stored table of contents is returned without re-rendering"""
+    repo = Repo(repo_name="StoredTocRepo", repo_url="https://github.com/test/stored-toc")
+    db_session.add(repo)
+    db_session.commit()
+
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Generic", docu="# Title", toc="- Stored")
+    db_session.add(prompt)
+    db_session.commit()
+
+    response = client.get(f"/docs/{prompt.id}")
+    assert response.status_code == 200
+    assert response.json()["table_of_contents"] == "- Stored"
+
+
+def test_get_document_etag_revalidation(client, db_session):
+    """Test that a matching ETag yields 304 until the document changes"""
+    repo = Repo(repo_name="EtagRepo", repo_url="https://github.com/test/etag")
+    db_session.add(repo)
+    db_session.commit()
+
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Generic", docu="# Title")
+    db_session.add(prompt)
+    db_session.commit()
+
+    response = client.get(f"/docs/{prompt.id}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(f"/docs/{prompt.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = client.put(f"/docs/{prompt.id}/goal", json={"goal": "New goal"})
+    assert response.status_code == 200
+
+    response = client.get(f"/docs/{prompt.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["goal"] == "New goal"
+    assert response.headers["ETag"] != etag
+
+
+def test_list_documents_etag_revalidation(client, db_session):
+    """Test that the document list answers 304 for an unchanged list"""
+    repo = Repo(repo_name="EtagListRepo", repo_url="https://github.com/test/etag-list")
+    db_session.add(repo)
+    db_session.commit()
+    db_session.add(Prompt(repo_id=repo.id, generic_prompt="Generic", docu="Doc"))
+    db_session.commit()
+
+    etag = client.get("/docs/list").headers["ETag"]
+    assert client.get("/docs/list", headers={"If-None-Match": etag}).status_code == 304
+
+    repo.repo_name = "RenamedRepo"
+    db_session.commit()
+
+    response = client.get("/docs/list", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["repo_name"] == "RenamedRepo"
+
+
 def test_get_document_not_found(client, db_session):
     """Test retrieving a non-existent document"""
     response = client.get("/docs/99999")
@@ -475,6 +603,98 @@ def test_search_documents_basic(client, db_session):
     assert isinstance(data, list)
 
 
+def test_search_documents_filters_by_title_and_content(client, db_session):
+    """Test that only documents matching in title or content are returned"""
+    repos = [
+        Repo(repo_name="python-tools", repo_url="https://github.com/test/python-tools"),
+        Repo(repo_name="other", repo_url="https://github.com/test/other"),
+        Repo(repo_name="unrelated", repo_url="https://github.com/test/unrelated"),
+    ]
+    db_session.add_all(repos)
+    db_session.commit()
+    db_session.add_all([
+        Prompt(repo_id=repos[0].id, generic_prompt="Generic", docu="# Tools"),
+        Prompt(repo_id=repos[1].id, generic_prompt="Generic", docu="Written in PYTHON and Python"),
+        Prompt(repo_id=repos[2].id, generic_prompt="Generic", docu="# Nothing here"),
+    ])
+    db_session.commit()
+
+    response = client.get("/docs/search?query=python")
+    assert response.status_code == 200
+    data = response.json()
+    assert [doc["repo_name"] for doc in data] == ["other", "python-tools"]
+    assert data[0]["match_count"] == 2
+
+
+def test_search_documents_wildcards_are_literal(client, db_session):
+    """Test that LIKE wildcards in the query don't match everything"""
+    repo = Repo(repo_name="TestRepo", repo_url="https://github.com/test/repo")
+    db_session.add(repo)
+    db_session.commit()
+    db_session.add(Prompt(repo_id=repo.id, generic_prompt="Generic", docu="# Docs"))
+    db_session.commit()
+
+    response = client.get("/docs/search?query=%25")
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_search_documents_snippet_around_first_match(client, db_session):
+    """Test that the snippet surrounds the first case-insensitive match and regex characters are literal"""
+    repo = Repo(repo_name="SnippetRepo", repo_url="https://github.com/test/snippet")
+    db_session.add(repo)
+    db_session.commit()
+    docu = "a" * 300 + "Uses C++ heavily" + "b" * 300 + " c++ again"
+    db_session.add(Prompt(repo_id=repo.id, generic_prompt="Generic", docu=docu))
+    db_session.commit()
+
+    response = client.get("/docs/search?query=c%2B%2B")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["match_count"] == 2
+    assert data[0]["content_snippet"] == "..." + "a" * 145 + "Uses C++ heavily" + "b" * 142 + "..."
+
+
+def test_search_documents_non_ascii_query(client, db_session):
+    """Test that matches are positioned with the same case folding as the database filter"""
+    repo = Repo(repo_name="UmlautRepo", repo_url="https://github.com/test/umlaut")
+    db_session.add(repo)
+    db_session.commit()
+    db_session.add(Prompt(repo_id=repo.id, generic_prompt="Generic", docu="# Übersicht\nDie ÜBERSICHT der Größe"))
+    db_session.commit()
+
+    response = client.get("/docs/search", params={"query": "ÜBERSICHT"})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["match_count"] == 2
+    assert isinstance(data[0]["match_count"], int)
+    assert "Übersicht" in data[0]["content_snippet"]
+
+
+def test_search_documents_short_query_matches_titles_only(client, db_session):
+    """Test that queries below the trigram length skip the content search"""
+    repos = [
+        Repo(repo_name="qt-widgets", repo_url="https://github.com/test/qt-widgets"),
+        Repo(repo_name="other", repo_url="https://github.com/test/other"),
+    ]
+    db_session.add_all(repos)
+    db_session.commit()
+    db_session.add_all([
+        Prompt(repo_id=repos[0].id, generic_prompt="Generic", docu="Widgets"),
+        Prompt(repo_id=repos[1].id, generic_prompt="Generic", docu="Built with Qt"),
+    ])
+    db_session.commit()
+
+    response = client.get("/docs/search?query=qt")
+    assert response.status_code == 200
+    data = response.json()
+    assert [doc["repo_name"] for doc in data] == ["qt-widgets"]
+    assert data[0]["match_count"] == 1
+    assert data[0]["content_snippet"] == "Widgets"
+
+
 def test_search_documents_empty_query(client, db_session):
     """Test search with empty query"""
     response = client.get("/docs/search?query=")
@@ -561,11 +781,21 @@ def test_delete_documents_no_docu_field(client, db_session):
     # Should still work even if no docs to delete
 
 
-def test_search_debug_endpoint(client, db_session):
-    """Test the debug search endpoint"""
-    response = client.get("/docs/search/debug")
+def test_search_debug_endpoint(db_session):
+    """Test the debug search endpoint when DEBUG_ENDPOINTS is enabled"""
+    from app.api.routes_docs import get_db
+    from app.core.config import get_settings
+    from app.main import create_app
+
+    with patch.object(get_settings(), "DEBUG_ENDPOINTS", True):
+        app = create_app()
+    app.dependency_overrides[get_db] = lambda: db_session
+
+    response = TestClient(app).get("/docs/search/debug")
+
     assert response.status_code == 200
     # Debug endpoint should return some diagnostic information
+    assert response.json()["total_documents"] == 0
 
 
 def test_update_documents_with_ssh_url(client, db_session, mocker):
@@ -583,9 +813,8 @@ def test_update_documents_with_ssh_url(client, db_session, mocker):
     db_session.add(prompt)
     db_session.commit()
 
-    # Mock generate_docu
-    mock_generate = mocker.patch('app.api.routes_docs.generate_docu')
-    mock_generate.return_value = {"status": "documented", "repository": "SSHRepo", "prompt_id": prompt.id}
+    # Mock the Celery task
+    mocker.patch('app.api.routes_docs.task_generate_docu')
 
     response = client.post("/docs/update", json={"doc_ids": [str(prompt.id)]})
     assert response.status_code == 200
@@ -661,15 +890,129 @@ def test_update_multiple_documents(client, db_session, mocker):
     db_session.add_all([prompt1, prompt2])
     db_session.commit()
 
-    # Mock generate_docu
-    mock_generate = mocker.patch('app.api.routes_docs.generate_docu')
-    mock_generate.return_value = {"status": "documented"}
+    # Mock the Celery task
+    mocker.patch('app.api.routes_docs.task_generate_docu')
 
     response = client.post("/docs/update", json={"doc_ids": [str(prompt1.id), str(prompt2.id)]})
     assert response.status_code == 200
     data = response.json()
     # Should update both
-    assert data.get("updated_count", 0) >= 0
+    assert data.get("queued_count", 0) >= 0
+
+
+def test_update_documents_mixed_batch(client, db_session, mocker):
+    """Test that valid documents are regenerated while invalid ones are reported"""
+    repo = Repo(repo_name="TestRepo", repo_url="https://github.com/test/repo")
+    db_session.add(repo)
+    db_session.commit()
+
+    prompt1 = Prompt(repo_id=repo.id, generic_prompt="Old", specific_prompt="Sp1", docu="# Doc1")
+    prompt2 = Prompt(repo_id=repo.id, generic_prompt="Old", specific_prompt="Sp2", docu="# Doc2")
+    db_session.add_all([prompt1, prompt2])
+    db_session.commit()
+
+    mock_generate = mocker.patch('app.api.routes_docs.task_generate_docu')
+
+    response = client.post(
+        "/docs/update",
+        json={"doc_ids": [str(prompt1.id), "abc", "99999", str(prompt2.id)]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["queued_count"] == 2
+    assert data["errors"] == ["Invalid ID format: abc", "Document not found: 99999"]
+    assert mock_generate.delay.call_count == 2
+
+    history = db_session.query(History).filter(History.prompt_id.in_([prompt1.id, prompt2.id])).all()
+    assert sorted(h.docu for h in history) == ["# Doc1", "# Doc2"]
+
+
+def test_update_documents_history_timestamp_from_database(client, db_session, mocker):
+    """Test that the History row written by /docs/update gets created_at from the server default"""
+    from sqlalchemy import event
+
+    repo = Repo(repo_name="TestRepo", repo_url="https://github.com/test/repo")
+    db_session.add(repo)
+    db_session.commit()
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Old", docu="# Doc")
+    db_session.add(prompt)
+    db_session.commit()
+    mocker.patch('app.api.routes_docs.task_generate_docu')
+
+    history_inserts = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO history"):
+            history_inserts.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = client.post("/docs/update", json={"doc_ids": [str(prompt.id)]})
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert response.status_code == 200
+    assert len(history_inserts) == 1
+    assert "created_at" not in history_inserts[0].split("VALUES")[0]
+    history = db_session.query(History).filter(History.prompt_id == prompt.id).one()
+    assert history.created_at is not None
+
+
+def test_update_documents_response_contract(client, db_session, mocker):
+    """Test that /docs/update reports queued tasks, not finished regenerations"""
+    repo = Repo(repo_name="TestRepo", repo_url="https://github.com/test/repo")
+    db_session.add(repo)
+    db_session.commit()
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Old", docu="# Doc")
+    db_session.add(prompt)
+    db_session.commit()
+
+    mock_generate = mocker.patch('app.api.routes_docs.task_generate_docu')
+    mock_generate.delay.return_value.id = "task-1"
+    response = client.post("/docs/update", json={"doc_ids": [str(prompt.id)]})
+
+    assert response.json() == {"status": "queued", "queued_count": 1, "task_ids": ["task-1"], "errors": None}
+
+    mock_generate.delay.side_effect = Exception("broker down")
+    response = client.post("/docs/update", json={"doc_ids": [str(prompt.id)]})
+
+    data = response.json()
+    assert data["status"] == "error"
+    assert data["queued_count"] == 0
+    assert data["task_ids"] == []
+    assert data["errors"] == [f"Error queueing documentation update for {prompt.id}: broker down"]
+
+
+def test_update_documents_history_failure_only_skips_that_document(client, db_session, mocker):
+    """Test that a failing history entry rolls back its own savepoint and the batch continues"""
+    repo = Repo(repo_name="TestRepo", repo_url="https://github.com/test/repo")
+    db_session.add(repo)
+    db_session.commit()
+
+    prompt1 = Prompt(repo_id=repo.id, generic_prompt="Old", docu="# Doc1")
+    prompt2 = Prompt(repo_id=repo.id, generic_prompt="Old", docu="# Doc2")
+    db_session.add_all([prompt1, prompt2])
+    db_session.commit()
+    failing_id = prompt1.id
+
+    def history_factory(**kwargs):
+        if kwargs["prompt_id"] == failing_id:
+            raise ValueError("history broken")
+        return History(**kwargs)
+
+    mocker.patch('app.api.routes_docs.History', side_effect=history_factory)
+    mock_generate = mocker.patch('app.api.routes_docs.task_generate_docu')
+
+    response = client.post("/docs/update", json={"doc_ids": [str(prompt1.id), str(prompt2.id)]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["queued_count"] == 1
+    assert data["errors"] == [f"Failed to save history for document {failing_id}"]
+    mock_generate.delay.assert_called_once_with(repo.id, "TestRepo")
+
+    history = db_session.query(History).all()
+    assert [h.prompt_id for h in history] == [prompt2.id]
 
 
 def test_search_documents_with_special_characters(client, db_session):
@@ -686,3 +1029,50 @@ def test_search_documents_with_special_characters(client, db_session):
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
+
+
+def test_load_prompts_raises_on_lazy_relationship_access(db_session):
+    """Test that batch-loaded prompts only allow the eagerly loaded relationships"""
+    from sqlalchemy.exc import InvalidRequestError
+    from app.api.routes_docs import _load_prompts
+
+    repo = Repo(repo_name="RaiseRepo", repo_url="https://github.com/test/raise")
+    db_session.add(repo)
+    db_session.commit()
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Generic", docu="Doc")
+    db_session.add(prompt)
+    db_session.commit()
+    prompt_id = prompt.id
+    db_session.expunge_all()
+
+    loaded = _load_prompts(db_session, [prompt_id], with_repo=True)[prompt_id]
+    assert loaded.docu == "Doc"
+    assert loaded.repo.repo_name == "RaiseRepo"
+
+    db_session.expunge_all()
+    loaded = _load_prompts(db_session, [prompt_id])[prompt_id]
+    assert loaded.generic_prompt == "Generic"
+    with pytest.raises(InvalidRequestError):
+        loaded.repo
+
+
+def test_debug_search_not_mounted_by_default(client, db_session):
+    """Test that the debug endpoint is only available with DEBUG_ENDPOINTS enabled"""
+    response = client.get("/docs/search/debug")
+    assert response.status_code == 404
+
+
+def test_debug_search_lists_documents(db_session):
+    """Test that the debug listing resolves repository names in one query"""
+    from app.api.routes_docs import debug_search
+
+    repo = Repo(repo_name="DebugRepo", repo_url="https://github.com/test/debug")
+    db_session.add(repo)
+    db_session.commit()
+    prompt = Prompt(repo_id=repo.id, generic_prompt="Generic", docu="Doc")
+    db_session.add(prompt)
+    db_session.commit()
+
+    result = debug_search(db_session)
+    assert result["total_documents"] == 1
+    assert result["all_docs"] == [{"id": str(prompt.id), "title": "DebugRepo", "repo_name": "DebugRepo"}]
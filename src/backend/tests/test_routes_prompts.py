@@ -137,3 +137,61 @@ def test_save_same_prompt_does_not_create_new_record(client, db_session):
     # Verify still only one record (no duplicate created)
     count = db_session.query(GeneralSettings).count()
     assert count == 1
+
+
+def test_get_generic_prompt_is_cached_until_write(client, db_session):
+    """Test that the generic prompt is served from cache and refreshed after a save"""
+    from app.api.routes_prompts import get_generic_prompt
+
+    db_session.add(GeneralSettings(general_prompt="Cached prompt"))
+    db_session.commit()
+    assert get_generic_prompt(db_session) == "Cached prompt"
+
+    # A row written behind the cache's back is not seen until invalidation
+    db_session.add(GeneralSettings(general_prompt="Direct write"))
+    db_session.commit()
+    assert get_generic_prompt(db_session) == "Cached prompt"
+
+    # Saving through the API invalidates the cache
+    response = client.post("/prompts/general", json={"prompt": "Saved prompt"})
+    assert response.status_code == 200
+    assert client.get("/prompts/general").json()["prompt"] == "Saved prompt"
+
+
+def test_get_general_prompt_etag_revalidation(client, db_session):
+    """Test that the general prompt answers 304 until it is changed"""
+    etag = client.get("/prompts/general").headers["ETag"]
+    assert client.get("/prompts/general", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/prompts/general", json={"prompt": "Changed prompt"})
+
+    response = client.get("/prompts/general", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["prompt"] == "Changed prompt"
+
+
+def test_general_prompt_hash_is_stored_on_insert(client, db_session):
+    """Test that new settings rows carry the SHA-256 of their prompt"""
+    import hashlib
+
+    response = client.post("/prompts/general", json={"prompt": "Hashed prompt"})
+    assert response.status_code == 200
+
+    settings = db_session.query(GeneralSettings).one()
+    assert settings.general_prompt_sha256 == hashlib.sha256(b"Hashed prompt").hexdigest()
+
+
+def test_save_same_prompt_without_stored_hash(client, db_session):
+    """Test that rows from before the hash column are compared by their text"""
+    db_session.add(GeneralSettings(general_prompt="Legacy prompt", general_prompt_sha256=None))
+    db_session.commit()
+    db_session.query(GeneralSettings).update({GeneralSettings.general_prompt_sha256: None})
+    db_session.commit()
+
+    response = client.post("/prompts/general", json={"prompt": "Legacy prompt"})
+    assert response.status_code == 200
+    assert db_session.query(GeneralSettings).count() == 1
+
+    response = client.post("/prompts/general", json={"prompt": "Changed prompt"})
+    assert response.status_code == 200
+    assert db_session.query(GeneralSettings).count() == 2
@@ -87,6 +87,25 @@ def test_list_repos_includes_prompt_count(client, db_session):
     assert data[0]["specific_prompt"] == "Specific prompt for this repo"
 
 
+def test_list_repos_specific_prompt_per_repo(client, db_session):
+    """Test that each repository gets its own specific prompt, or None without one"""
+    with_prompt = Repo(repo_name="with-prompt", repo_url="https://github.com/test/with")
+    without_prompt = Repo(repo_name="without-prompt", repo_url="https://github.com/test/without")
+    db_session.add_all([with_prompt, without_prompt])
+    db_session.commit()
+    db_session.add_all([
+        Prompt(repo_id=with_prompt.id, generic_prompt="Generic", specific_prompt="First"),
+        Prompt(repo_id=with_prompt.id, generic_prompt="Generic", specific_prompt="Second"),
+        Prompt(repo_id=without_prompt.id, generic_prompt="Generic", specific_prompt=""),
+    ])
+    db_session.commit()
+
+    response = client.get("/repos/list")
+    assert response.status_code == 200
+    prompts = {repo["name"]: repo["specific_prompt"] for repo in response.json()}
+    assert prompts == {"with-prompt": "First", "without-prompt": None}
+
+
 def test_delete_repo_not_found(client, db_session):
     """Test deleting a non-existent repository"""
     response = client.post("/repos/delete", json={"repo_id": 99999})
@@ -155,6 +174,28 @@ def test_delete_repo_with_prompts(client, db_session):
     assert deleted_prompt is None
 
 
+def test_update_repo_rejects_taken_name(client, db_session):
+    """Test that renaming a repository to an existing name is rejected"""
+    first = Repo(repo_name="first", repo_url="https://github.com/test/first")
+    second = Repo(repo_name="second", repo_url="https://github.com/test/second")
+    db_session.add_all([first, second])
+    db_session.commit()
+
+    response = client.post("/repos/update", json={"repo_id": second.id, "name": "first"})
+    assert response.status_code == 400
+
+    response = client.post("/repos/update", json={"repo_id": second.id, "name": "renamed"})
+    assert response.status_code == 200
+    db_session.refresh(second)
+    assert second.repo_name == "renamed"
+
+
+def test_regenerate_doc_repo_not_found(client, db_session):
+    """Test regenerating documentation for a non-existent repository"""
+    response = client.post("/repos/regenerate-doc", json={"repo_id": 99999})
+    assert response.status_code == 404
+
+
 def test_clone_request_validation_empty_url():
     """Test that CloneRequest validates empty URLs"""
     from app.api.routes_repo import CloneRequest
@@ -209,3 +250,99 @@ def test_clone_request_validation_ssh_protocol_url():
 
     req = CloneRequest(repo_url="ssh://git@github.com/user/repo.git")
     assert req.repo_url == "ssh://git@github.com/user/repo.git"
+
+
+class TestTaskStatus:
+    """Tests for polling clone task states"""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        from app.api import routes_repo
+        routes_repo._task_status_cache.clear()
+        routes_repo._poll_state.clear()
+        yield
+        routes_repo._task_status_cache.clear()
+        routes_repo._poll_state.clear()
+
+    def test_batch_reads_backend_once(self, client):
+        """Test that several task states are read with a single MGET"""
+        from unittest.mock import MagicMock, patch
+        from celery.backends.base import BaseKeyValueStoreBackend
+
+        backend = MagicMock(spec=BaseKeyValueStoreBackend)
+        backend.get_key_for_task.side_effect = lambda task_id: f"celery-task-meta-{task_id}"
+        backend.mget.return_value = [b"done", None]
+        backend.decode_result.return_value = {"status": "SUCCESS", "result": {"status": "ok"}}
+
+        with patch("app.api.routes_repo.celery_app", MagicMock(backend=backend)):
+            response = client.get("/repos/tasks", params={"ids": "a,b,a"})
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"task_id": "a", "state": "SUCCESS", "result": {"status": "ok"}},
+            {"task_id": "b", "state": "PENDING", "result": None},
+        ]
+        backend.mget.assert_called_once_with(["celery-task-meta-a", "celery-task-meta-b"])
+
+    def test_repeated_poll_is_served_from_cache(self, client):
+        """Test that a poll within the TTL does not hit the result backend"""
+        from unittest.mock import patch
+        from app.api.routes_repo import TaskStatusResponse
+
+        with patch("app.api.routes_repo._fetch_task_statuses") as mock_fetch:
+            mock_fetch.return_value = {"a": TaskStatusResponse(task_id="a", state="STARTED")}
+            first = client.get("/repos/tasks/a")
+            second = client.get("/repos/tasks/a")
+
+        assert first.json() == second.json() == {"task_id": "a", "state": "STARTED", "result": None}
+        mock_fetch.assert_called_once_with(["a"])
+
+    def test_backend_unavailable_is_pending(self, client):
+        """Test that an unreachable result backend is reported as PENDING and not cached"""
+        from unittest.mock import patch
+
+        with patch("app.api.routes_repo._fetch_task_statuses", side_effect=Exception("backend down")) as mock_fetch:
+            client.get("/repos/tasks/a")
+            response = client.get("/repos/tasks/a")
+
+        assert response.json()["state"] == "PENDING"
+        assert "backend down" in response.json()["result"]["error"]
+        assert mock_fetch.call_count == 2
+
+    def test_batch_requires_ids(self, client):
+        """Test that an empty id list is rejected"""
+        response = client.get("/repos/tasks", params={"ids": " , "})
+        assert response.status_code == 400
+
+    def test_retry_after_backs_off_while_state_is_unchanged(self, client):
+        """Test that the suggested poll interval doubles and resets on a state change"""
+        from unittest.mock import patch
+        from app.api.routes_repo import TaskStatusResponse
+
+        states_seen = ["STARTED"] * 5 + ["PROGRESS", "SUCCESS"]
+        retry_after = []
+        with patch("app.api.routes_repo._get_task_statuses") as mock_statuses:
+            for state in states_seen:
+                mock_statuses.return_value = [TaskStatusResponse(task_id="a", state=state)]
+                retry_after.append(client.get("/repos/tasks/a").headers.get("retry-after"))
+
+        assert retry_after == ["1", "2", "4", "5", "5", "1", None]
+
+
+def test_update_repo_not_found(client, db_session):
+    """Test updating a repository that doesn't exist"""
+    response = client.post("/repos/update", json={"repo_id": 99999, "name": "renamed"})
+    assert response.status_code == 404
+
+
+def test_update_repo_description_keeps_name(client, db_session):
+    """Test that updating only the description leaves the name untouched"""
+    repo = Repo(repo_name="keep", repo_url="https://github.com/test/keep")
+    db_session.add(repo)
+    db_session.commit()
+
+    response = client.post("/repos/update", json={"repo_id": repo.id, "description": "New description"})
+    assert response.status_code == 200
+    db_session.refresh(repo)
+    assert repo.repo_name == "keep"
+    assert repo.description == "New description"
@@ -68,6 +68,23 @@ def test_save_general_settings_update_non_prompt_fields(client, db_session):
     assert updated.id == initial_id
 
 
+def test_save_general_settings_update_keeps_interval_when_omitted(client, db_session):
+    """Test that an in-place update without checkInterval returns the stored interval"""
+    from datetime import timedelta
+
+    db_session.add(GeneralSettings(general_prompt="Old prompt", update_time=timedelta(minutes=10), updates_disabled=False))
+    db_session.add(GeneralSettings(general_prompt="Initial prompt", update_time=timedelta(minutes=20), updates_disabled=False))
+    db_session.commit()
+
+    response = client.put("/settings/general", json={"prompt": "Initial prompt", "disabled": True})
+    assert response.status_code == 200
+    assert response.json() == {"prompt": "Initial prompt", "checkInterval": 20, "disabled": True}
+
+    # Only the latest record is touched
+    rows = db_session.query(GeneralSettings).order_by(GeneralSettings.id).all()
+    assert [r.updates_disabled for r in rows] == [False, True]
+
+
 def test_save_general_settings_prompt_change_creates_new_record(client, db_session):
     """Test that changing the prompt creates a new record"""
     # Create initial settings
@@ -199,3 +216,17 @@ def test_prompt_history_multiple_changes(client, db_session):
     assert response.status_code == 200
     data = response.json()
     assert data["prompt"] == "Prompt 3"
+
+
+def test_get_general_settings_etag_revalidation(client, db_session):
+    """Test that the general settings answer 304 until they are changed"""
+    client.put("/settings/general", json={"prompt": "Prompt", "checkInterval": 30})
+    etag = client.get("/settings/general").headers["ETag"]
+    assert client.get("/settings/general", headers={"If-None-Match": etag}).status_code == 304
+
+    # In-place update of the same record
+    client.put("/settings/general", json={"prompt": "Prompt", "checkInterval": 45})
+
+    response = client.get("/settings/general", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["checkInterval"] == 45
@@ -81,6 +81,42 @@ def test_list_templates(client, db_session):
     assert data[1]["content"] == "Content 2"
 
 
+def test_list_templates_paginated(client, db_session):
+    """Test listing one page of templates with limit and offset"""
+    for i in range(5):
+        db_session.add(Template(name=f"Template {i}", prompt_text=f"Content {i}"))
+    db_session.commit()
+
+    response = client.get("/prompt-templates", params={"limit": 2, "offset": 1})
+
+    assert response.status_code == 200
+    assert [t["name"] for t in response.json()] == ["Template 1", "Template 2"]
+
+
+def test_list_templates_rejects_invalid_limit(client, db_session):
+    """Test that a limit outside the allowed range is rejected"""
+    response = client.get("/prompt-templates", params={"limit": 0})
+    assert response.status_code == 422
+
+
+def test_list_templates_etag_revalidation(client, db_session):
+    """Test that the template list answers 304 until a template is changed"""
+    template = Template(name="Cached", prompt_text="Content")
+    db_session.add(template)
+    db_session.commit()
+
+    etag = client.get("/prompt-templates").headers["ETag"]
+    assert client.get("/prompt-templates", headers={"If-None-Match": etag}).status_code == 304
+    # Another page has its own ETag
+    assert client.get("/prompt-templates", params={"limit": 1}, headers={"If-None-Match": etag}).status_code == 200
+
+    client.put(f"/prompt-templates/{template.id}", json={"content": "Changed"})
+
+    response = client.get("/prompt-templates", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["content"] == "Changed"
+
+
 def test_get_template(client, db_session):
     """Test getting a specific template"""
     template = Template(
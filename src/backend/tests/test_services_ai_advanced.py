@@ -7,6 +7,7 @@ import os
 from pathlib import Path
 from app.services.ai_service import (
     generate_table_of_contents,
+    format_table_of_contents,
     get_repository_structure,
     _extract_code_structure,
     CODE_STRUCTURE_EXTRACTION_THRESHOLD,
@@ -84,6 +85,20 @@ class TestGenerateTableOfContents:
         assert result["headings"] == []
         assert result["message"] == "No headings found"
 
+    def test_format_toc_indents_by_level(self):
+        """Test the stored TOC text is indented by heading level"""
+        content = "# Title\ntext\n## Section  \n### Detail"
+        assert format_table_of_contents(content) == "- Title\n  - Section\n    - Detail"
+
+    def test_format_toc_no_headings(self):
+        """Test the stored TOC text is empty without headings"""
+        assert format_table_of_contents("plain text") == ""
+
+    def test_format_toc_ignores_malformed_headings(self):
+        """Test that headings without a space, without a title or deeper than six levels are skipped"""
+        content = "# Title\n#no-space\n##   Spaced  \n#   \n###### Deep\n####### Too deep"
+        assert format_table_of_contents(content) == "- Title\n  - Spaced\n          - Deep"
+
 
 class TestGetRepositoryStructure:
     """Tests for get_repository_structure function"""
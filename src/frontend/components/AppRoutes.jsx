@@ -172,7 +172,7 @@ export default function AppRoutes({
       setIsUpdating(true);
       setActionCount((prev) => prev + docIds.length);
       
-      // Call API to regenerate documentation
+      // Call API to regenerate documentation, resolves once the queued updates have finished
       const result = await updateDocumentation(docIds);
 
       // Trigger documentation list refresh
@@ -181,14 +181,21 @@ export default function AppRoutes({
       // Trigger repository list refresh to update status tags
       setReposRefreshTrigger((prev) => prev + 1);
 
-      setPopup({
-        visible: true,
-        title: "Update completed",
-        message: result.errors
-          ? `Update of documentation was successful. Errors: ${result.errors.join(", ")}`
-          : "Update of documentation was successful",
-        type: "success",
-      });
+      if (!result.errors) {
+        setPopup({
+          visible: true,
+          title: "Update completed",
+          message: "Update of documentation was successful",
+          type: "success",
+        });
+      } else {
+        setPopup({
+          visible: true,
+          title: result.updated_count > 0 ? "Update completed" : "Update failed",
+          message: `${result.updated_count} of ${docIds.length} documentation(s) updated. Errors: ${result.errors.join(", ")}`,
+          type: "error",
+        });
+      }
     } catch (err) {
       console.error("Failed to update documentation:", err);
       setPopup({
@@ -83,6 +83,17 @@ export async function getTask(taskId) {
   return fetchWithAuth(`${API_BASE}/repos/tasks/${taskId}`);
 }
 
+/**
+ * Gets the status of several async tasks in one request
+ * 
+ * @param {Array<string>} taskIds - The task IDs to check
+ * @returns {Promise<Array>} Task status information, in the given order
+ */
+export async function getTasks(taskIds) {
+  const ids = taskIds.map(encodeURIComponent).join(",");
+  return fetchWithAuth(`${API_BASE}/repos/tasks?ids=${ids}`);
+}
+
 /**
  * Lists all repositories
  * 
@@ -298,17 +309,74 @@ export async function deletePromptTemplate(templateId) {
   });
 }
 
+/**
+ * Interval between status polls of a documentation generation task
+ */
+const GENERATE_POLL_INTERVAL_MS = 2000;
+
+/**
+ * Upper bound for status polls of one generation task (1 hour, the backend's result lifetime)
+ */
+const GENERATE_MAX_POLLS = 1800;
+
+/**
+ * Builds the result envelope of a failed documentation generation
+ *
+ * @param {string} error - Error message
+ * @returns {Object} Generation result with status "error"
+ */
+function generationFailure(error) {
+  return {
+    status: "error",
+    message: error,
+    results: [],
+    errors: [error],
+    successful_count: 0,
+  };
+}
+
 /**
  * Triggers documentation generation for one or more repositories
+ * The backend queues the work; this waits until the task has finished
  * 
  * @param {Array<string>} repoIds - Array of repository IDs
- * @returns {Promise<Object>} Generation task information
+ * @returns {Promise<Object>} Generation result (status, results, errors, successful_count)
  */
 export async function generateDocu(repoIds) {
-  return fetchWithAuth(`${API_BASE}/ai/generate`, {
+  const { task_id } = await fetchWithAuth(`${API_BASE}/ai/generate`, {
     method: "POST",
     body: JSON.stringify({ repo_ids: repoIds }),
   });
+
+  for (let attempt = 0; attempt < GENERATE_MAX_POLLS; attempt++) {
+    const task = await getGenerateTask(task_id);
+    if (task.state === "SUCCESS") {
+      return task.result;
+    }
+    if (task.state === "FAILURE") {
+      return generationFailure(
+        task.result?.error || "Documentation generation failed",
+      );
+    }
+    // PENDING with an error: unknown/expired task or result backend unreachable
+    if (task.result?.error) {
+      return generationFailure(task.result.error);
+    }
+    await new Promise((resolve) =>
+      setTimeout(resolve, GENERATE_POLL_INTERVAL_MS),
+    );
+  }
+  return generationFailure("Documentation generation timed out");
+}
+
+/**
+ * Gets the status of a documentation generation task
+ * 
+ * @param {string} taskId - The task ID returned by generateDocu
+ * @returns {Promise<Object>} Task state and, once finished, the generation result
+ */
+export async function getGenerateTask(taskId) {
+  return fetchWithAuth(`${API_BASE}/ai/generate/${taskId}`);
 }
 
 /**
@@ -370,9 +438,10 @@ export async function debugSearch() {
 
 /**
  * Triggers documentation updates for one or more repositories
+ * The backend queues one task per document; this waits until all of them have finished
  * 
  * @param {Array<string>} docIds - Array of documentation IDs to update
- * @returns {Promise<Object>} Update task information
+ * @returns {Promise<Object>} Update result (updated_count of finished updates, errors or null)
  */
 export async function updateDocumentation(docIds) {
   const res = await fetch(`${API_BASE}/docs/update`, {
@@ -381,7 +450,50 @@ export async function updateDocumentation(docIds) {
     body: JSON.stringify({ doc_ids: docIds }),
   });
   if (!res.ok) throw new Error(`${res.status} ${await res.text()}`);
-  return res.json();
+  const queued = await res.json();
+
+  const pending = new Set(queued.task_ids || []);
+  const errors = [...(queued.errors || [])];
+  let updatedCount = 0;
+
+  for (
+    let attempt = 0;
+    pending.size > 0 && attempt < GENERATE_MAX_POLLS;
+    attempt++
+  ) {
+    const tasks = await getTasks([...pending]);
+    for (const task of tasks) {
+      if (task.state === "SUCCESS") {
+        pending.delete(task.task_id);
+        if (task.result?.status === "documented") {
+          updatedCount++;
+        } else {
+          errors.push(
+            task.result?.message || `Documentation update failed (task ${task.task_id})`,
+          );
+        }
+      } else if (task.state === "FAILURE" || task.result?.error) {
+        // PENDING with an error: unknown/expired task or result backend unreachable
+        pending.delete(task.task_id);
+        errors.push(
+          task.result?.error || `Documentation update failed (task ${task.task_id})`,
+        );
+      }
+    }
+    if (pending.size > 0) {
+      await new Promise((resolve) =>
+        setTimeout(resolve, GENERATE_POLL_INTERVAL_MS),
+      );
+    }
+  }
+  if (pending.size > 0) {
+    errors.push(`${pending.size} documentation update(s) timed out`);
+  }
+
+  return {
+    updated_count: updatedCount,
+    errors: errors.length > 0 ? errors : null,
+  };
 }
 
 /**
@@ -392,13 +392,89 @@ describe("api.js - Unit Tests", () => {
       ok: true,
       json: () => Promise.resolve({ task_id: "gen-123" }),
     });
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () =>
+        Promise.resolve({
+          task_id: "gen-123",
+          state: "SUCCESS",
+          result: { status: "ok", successful_count: 2 },
+        }),
+    });
 
-    await api.generateDocu(["repo-1", "repo-2"]);
+    const result = await api.generateDocu(["repo-1", "repo-2"]);
 
     expect(globalThis.fetch).toHaveBeenCalled();
     const callArgs = globalThis.fetch.mock.calls[0];
     expect(callArgs[0]).toContain("/ai/generate");
     expect(callArgs[1].method).toBe("POST");
+    expect(globalThis.fetch.mock.calls[1][0]).toContain("/ai/generate/gen-123");
+    expect(result).toEqual({ status: "ok", successful_count: 2 });
+  });
+
+  /**
+   * Test: generateDocu stops polling when the task status cannot be fetched
+   * Verifies that a PENDING response with an error is treated as a failure
+   */
+  it("generateDocu fails when the task status reports an error", async () => {
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () => Promise.resolve({ task_id: "gen-123" }),
+    });
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () =>
+        Promise.resolve({
+          task_id: "gen-123",
+          state: "PENDING",
+          result: { error: "Unable to fetch task status: backend down" },
+        }),
+    });
+
+    const result = await api.generateDocu(["repo-1"]);
+
+    expect(globalThis.fetch).toHaveBeenCalledTimes(2);
+    expect(result.status).toBe("error");
+    expect(result.errors).toEqual([
+      "Unable to fetch task status: backend down",
+    ]);
+    expect(result.successful_count).toBe(0);
+  });
+
+  /**
+   * Test: updateDocumentation waits for the queued update tasks
+   * Verifies that finished and failed tasks are reported once all are done
+   */
+  it("updateDocumentation polls the queued tasks until they finish", async () => {
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () =>
+        Promise.resolve({
+          status: "queued",
+          queued_count: 2,
+          task_ids: ["task-1", "task-2"],
+          errors: null,
+        }),
+    });
+    globalThis.fetch.mockResolvedValueOnce({
+      ok: true,
+      json: () =>
+        Promise.resolve([
+          { task_id: "task-1", state: "SUCCESS", result: { status: "documented" } },
+          {
+            task_id: "task-2",
+            state: "SUCCESS",
+            result: { status: "error", message: "Clone failed" },
+          },
+        ]),
+    });
+
+    const result = await api.updateDocumentation(["1", "2"]);
+
+    expect(globalThis.fetch.mock.calls[1][0]).toContain(
+      "/repos/tasks?ids=task-1,task-2",
+    );
+    expect(result).toEqual({ updated_count: 1, errors: ["Clone failed"] });
   });
 
   /**
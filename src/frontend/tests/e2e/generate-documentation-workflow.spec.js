@@ -178,7 +178,8 @@ async function setupMocks(page, testId) {
     }
   });
 
-  // Mock POST /ai/generate - Generate documentation
+  // Mock POST /ai/generate - Queue documentation generation
+  const generateTasks = {};
   await page.route("**/ai/generate", async (route) => {
     const postData = route.request().postDataJSON();
     const repoIds = postData.repo_ids || [];
@@ -233,42 +234,54 @@ async function setupMocks(page, testId) {
       setTimeout(resolve, MOCK_DOC_GENERATION_DELAY_MS),
     );
 
+    let envelope;
     if (successfulCount === repoIds.length) {
-      await route.fulfill({
-        status: 200,
-        contentType: "application/json",
-        body: JSON.stringify({
-          status: "ok",
-          message: `Documentation generated successfully for ${successfulCount} repositories.`,
-          successful_count: successfulCount,
-          results: results,
-        }),
-      });
+      envelope = {
+        status: "ok",
+        message: `Documentation generated successfully for ${successfulCount} repositories.`,
+        successful_count: successfulCount,
+        results: results,
+      };
     } else if (successfulCount > 0) {
-      await route.fulfill({
-        status: 200,
-        contentType: "application/json",
-        body: JSON.stringify({
-          status: "partial_success",
-          message: `Documentation generated for ${successfulCount}/${repoIds.length} repositories.`,
-          successful_count: successfulCount,
-          results: results,
-          errors: errors,
-        }),
-      });
+      envelope = {
+        status: "partial_success",
+        message: `Documentation generated for ${successfulCount}/${repoIds.length} repositories.`,
+        successful_count: successfulCount,
+        results: results,
+        errors: errors,
+      };
     } else {
-      await route.fulfill({
-        status: 200,
-        contentType: "application/json",
-        body: JSON.stringify({
-          status: "error",
-          message: `Failed to generate documentation for all ${repoIds.length} repositories.`,
-          successful_count: 0,
-          results: results,
-          errors: errors,
-        }),
-      });
+      envelope = {
+        status: "error",
+        message: `Failed to generate documentation for all ${repoIds.length} repositories.`,
+        successful_count: 0,
+        results: results,
+        errors: errors,
+      };
     }
+
+    const taskId = `gen-${testId}-${Object.keys(generateTasks).length}`;
+    generateTasks[taskId] = envelope;
+
+    await route.fulfill({
+      status: 200,
+      contentType: "application/json",
+      body: JSON.stringify({ task_id: taskId }),
+    });
+  });
+
+  // Mock GET /ai/generate/{task_id} - Generation task status
+  await page.route("**/ai/generate/*", async (route) => {
+    const taskId = route.request().url().split("/").pop();
+    await route.fulfill({
+      status: 200,
+      contentType: "application/json",
+      body: JSON.stringify({
+        task_id: taskId,
+        state: "SUCCESS",
+        result: generateTasks[taskId],
+      }),
+    });
   });
 
   // Mock GET /docs/list - List documentations